@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import glob
 import os
 import sys
@@ -6,14 +7,26 @@ import datetime
 import argparse
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
-from ils.strategy import run_strategy
-from ils.backtest import TradeManager
-from ils.metrics import calculate_metrics, generate_monthly_returns
+from ils.strategy import prepare_features, score_signals
+from ils.backtest import TradeManager, TickExitResolver
+from ils.metrics import calculate_metrics, generate_monthly_returns, monte_carlo
+from ils.store import BarStore, TickStore
+from ils.cache import FeatureCache
+from ils.profiling import span, profiling, cprofile
 
-def load_data(data_dir, instrument, start_date, end_date, timeframe="1h"):
+def load_data(data_dir, instrument, start_date, end_date, timeframe="1h", arrays=False):
     """
     Load and filter data files for specific timeframe.
+    Reads the columnar bar store when present, else the per-day CSV layout.
+    arrays=True returns bar store data as memory-mapped BarArrays instead of a frame.
     """
+    store = BarStore(data_dir)
+    if store.has_data(instrument, timeframe):
+        print(f"Reading bar store ({timeframe}) for range {start_date} to {end_date}...")
+        if arrays:
+            return store.read_arrays(instrument, timeframe, start_date, end_date)
+        return store.read(instrument, timeframe, start_date, end_date)
+        
     # Pattern: INSTRUMENT_{tf_label}_YYYYMMDD.csv
     tf_label = timeframe.replace('h', 'hour').replace('min', 'min')
     pattern = os.path.join(data_dir, f"{instrument}_{tf_label}_*.csv")
@@ -54,6 +67,13 @@ def load_daily_bias(data_dir, instrument):
     """
     Load daily bars and create a date->bias map.
     """
+    store = BarStore(data_dir)
+    if store.has_data(instrument, '1D'):
+        daily = store.read(instrument, '1D', columns=['Open', 'Close'])
+        # Simple Logic: Close > Open = Bullish
+        bias = np.where(daily['Close'] > daily['Open'], 'Bullish', 'Bearish')
+        return dict(zip(daily.index.date, bias.tolist()))
+        
     daily_dir = os.path.join(data_dir, 'daily')
     pattern = os.path.join(daily_dir, f"{instrument}_daily_*.csv")
     files = glob.glob(pattern)
@@ -78,12 +98,30 @@ def load_daily_bias(data_dir, instrument):
             
     return bias_map
 
-def run_backtest_engine(instrument, start_date, end_date, data_dir, initial_balance=25000.0, timeframe="1h"):
-    print(f"=== Backtest Runner: {instrument} ===")
-    print(f"Range: {start_date} -> {end_date} [{timeframe}]")
-    
+def map_daily_bias(index, bias_map):
+    """
+    Bias per bar. Bias for Day T is determined by Day T-1 (Previous Day).
+    """
+    bias_series = []
+    for idx in index:
+        prev_day = (idx.date() - datetime.timedelta(days=1))
+        b = bias_map.get(prev_day, 'Neutral')
+        bias_series.append(b)
+    return bias_series
+
+def simulate_instrument(instrument, start_date, end_date, data_dir, initial_balance=25000.0, timeframe="1h", tick_exits=False, equity_sizing=True, feature_cache=None, arrays=False):
+    """
+    Load bars, run the strategy and simulate trades for one instrument.
+    equity_sizing=True sizes each trade at fill from running equity with the
+    drawdown circuit breaker; False keeps every trade sized from initial_balance.
+    feature_cache: optional FeatureCache; on a hit the indicator and SMC
+    features are read back instead of recomputed.
+    arrays=True reads the bars as memory-mapped BarArrays (see load_data).
+    Returns the closed trades frame, or None if there is no data.
+    """
     # 1. Load Data
-    df = load_data(data_dir, instrument, start_date, end_date, timeframe)
+    with span('load'):
+        df = load_data(data_dir, instrument, start_date, end_date, timeframe, arrays)
     if df.empty:
         print("No data found for specified parameters.")
         return None
@@ -91,43 +129,91 @@ def run_backtest_engine(instrument, start_date, end_date, data_dir, initial_bala
     print(f"Loaded {len(df)} bars.")
     
     # 2. Daily Bias
-    bias_map = load_daily_bias(data_dir, instrument)
-    
-    # Map Bias to Bar
-    # Bias for Day T is determined by Day T-1 (Previous Day)
-    bias_series = []
-    for idx in df.index:
-        prev_day = (idx.date() - datetime.timedelta(days=1))
-        b = bias_map.get(prev_day, 'Neutral')
-        bias_series.append(b)
+    with span('bias'):
+        bias_map = load_daily_bias(data_dir, instrument)
+        bias_series = map_daily_bias(df.index, bias_map)
         
     # 3. Strategy Execution
     print("Running Strategy Engine...")
-    results = run_strategy(df, account_equity=initial_balance, htf_bias=bias_series)
+    with span('strategy'):
+        features = None
+        if feature_cache is not None:
+            with span('cache_read'):
+                cache_key = feature_cache.key(instrument, timeframe, start_date, end_date, df)
+                features = feature_cache.get(cache_key)
+            print("Feature cache hit." if features is not None else "Feature cache miss.")
+        if features is None:
+            with span('features'):
+                features = prepare_features(df)
+            if feature_cache is not None:
+                with span('cache_write'):
+                    feature_cache.put(cache_key, features)
+        with span('scoring'):
+            results = score_signals(features, account_equity=initial_balance, htf_bias=bias_series)
     
     # 4. Trade Simulation
     print("Simulating Trades...")
-    manager = TradeManager()
+    resolver = None
+    if tick_exits:
+        # Bars touching both SL and TP are resolved from stored ticks
+        tick_store = TickStore(data_dir)
+        if tick_store.has_ticks(instrument):
+            resolver = TickExitResolver(tick_store, instrument, timeframe)
+        else:
+            print("No stored ticks found. Ambiguous bars assume SL first.")
+    manager = TradeManager(tick_resolver=resolver, initial_equity=initial_balance if equity_sizing else None)
+    with span('simulate'):
+        manager.simulate(results)
     
-    for timestamp, row in results.iterrows():
-        manager.update(row)
-        if pd.notnull(row['Signal']):
-            manager.add_trade(row)
-            
-    trades_df = manager.get_results_df()
+    return manager.get_results_df()
+
+def feature_cache_from_config(config):
+    """
+    FeatureCache from the backtest.feature_cache config section, or None if disabled.
+    """
+    cache_cfg = config.get('backtest', {}).get('feature_cache') or {}
+    if not cache_cfg.get('enabled', False):
+        return None
+    return FeatureCache(cache_cfg.get('dir', 'data/feature_cache'), int(cache_cfg.get('max_mb', 2048) * 2**20))
+
+def monte_carlo_from_config(config):
+    """
+    monte_carlo() options (n_sims, method, seed) from the backtest.monte_carlo config section, or None if disabled.
+    """
+    mc_cfg = config.get('backtest', {}).get('monte_carlo') or {}
+    if not mc_cfg.get('enabled', False):
+        return None
+    return {'n_sims': int(mc_cfg.get('n_sims', 10000)), 'method': mc_cfg.get('method', 'shuffle'), 'seed': mc_cfg.get('seed', 42)}
+
+def run_backtest_engine(instrument, start_date, end_date, data_dir, initial_balance=25000.0, timeframe="1h", tick_exits=False, feature_cache=None, monte_carlo_options=None, arrays=False):
+    print(f"=== Backtest Runner: {instrument} ===")
+    print(f"Range: {start_date} -> {end_date} [{timeframe}]")
+    
+    trades_df = simulate_instrument(instrument, start_date, end_date, data_dir, initial_balance, timeframe, tick_exits, feature_cache=feature_cache, arrays=arrays)
+    if trades_df is None:
+        return None
     
     # 5. Metrics & Output
     if not trades_df.empty:
         print("\n--- Performance Metrics ---")
-        metrics = calculate_metrics(trades_df, initial_balance)
+        with span('metrics'):
+            metrics = calculate_metrics(trades_df, initial_balance)
         for k, v in metrics.items():
             print(f"{k}: {v}")
             
         # Monthly Returns
         print("\n--- Monthly Returns ---")
-        monthly = generate_monthly_returns(trades_df)
+        with span('metrics'):
+            monthly = generate_monthly_returns(trades_df)
         print(monthly)
         
+        # Monte Carlo (opt-in): options for metrics.monte_carlo
+        if monte_carlo_options:
+            print(f"\n--- Monte Carlo ({monte_carlo_options.get('n_sims', 10000)} x {monte_carlo_options.get('method', 'shuffle')}) ---")
+            with span('monte_carlo'):
+                mc = monte_carlo(trades_df, initial_balance, **monte_carlo_options)
+            print(mc.round(2))
+        
         # Return results for master script usage
         return trades_df, metrics
         
@@ -143,6 +229,11 @@ if __name__ == "__main__":
     parser.add_argument("--data-dir", help="Data Directory")
     parser.add_argument("--initial-balance", type=float, help="Starting Equity")
     parser.add_argument("--config", default="config.yml", help="Path to config file")
+    parser.add_argument("--tick-exits", action="store_true", help="Resolve bars touching both SL and TP from stored ticks")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute features even if the feature cache is enabled")
+    parser.add_argument("--monte-carlo", type=int, metavar="N_SIMS", help="Run a Monte Carlo of the trades with N_SIMS simulations (overrides config)")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage timing report and save it as JSON")
+    parser.add_argument("--cprofile", action="store_true", help="Also dump cProfile stats (with --profile)")
     
     args = parser.parse_args()
     
@@ -189,14 +280,29 @@ if __name__ == "__main__":
         print("Error: Instrument or Data Directory not specified and could not be inferred from config.")
         sys.exit(1)
         
+    mc_options = monte_carlo_from_config(config)
+    if args.monte_carlo:
+        mc_options = {**(mc_options or {}), 'n_sims': args.monte_carlo}
+        
     # Save CSV locally if run directly
-    trades_df, metrics = run_backtest_engine(
-        instrument, 
-        start_date, 
-        end_date, 
-        data_dir, 
-        initial_balance
-    )
+    with profiling(instrument, enabled=args.profile) as prof, cprofile(f"profile_{instrument}.prof" if args.profile and args.cprofile else None):
+        trades_df, metrics = run_backtest_engine(
+            instrument, 
+            start_date, 
+            end_date, 
+            data_dir, 
+            initial_balance,
+            tick_exits=args.tick_exits or backtest_cfg.get('tick_exits', False),
+            feature_cache=None if args.no_cache else feature_cache_from_config(config),
+            monte_carlo_options=mc_options,
+            arrays=config.get('data', {}).get('mmap_arrays', False)
+        )
+    
+    if prof is not None:
+        print("\n--- Stage Timings ---")
+        print(prof.summary().to_string())
+        prof.save(f"profile_{instrument}.json")
+        print(f"Saved profile to profile_{instrument}.json")
     
     if not trades_df.empty:
         out_file = f"backtest_results_{instrument}.csv"
@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from ils.engine import ReplayEngine, TickReplayer
+from ils.store import TickStore
+from benchmarks.synthetic import synthetic_ticks
+
+def replay(make_replayer, timeframe, with_strategy):
+    engine = ReplayEngine(timeframe, strategy='default' if with_strategy else None)
+    replayer = make_replayer()
+    start = time.perf_counter()
+    engine.run(replayer)
+    elapsed = time.perf_counter() - start
+    return replayer.ticks, elapsed, engine
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the event-driven tick replay engine")
+    parser.add_argument("--ticks", type=int, default=2000000, help="Synthetic ticks to generate")
+    parser.add_argument("--timeframe", default="5min", help="Strategy bar timeframe")
+    parser.add_argument("--batch-size", type=int, default=100000, help="Ticks per replay batch")
+    parser.add_argument("--store", help="Replay a processed tick store directory instead of synthetic ticks")
+    parser.add_argument("--instrument", help="Instrument in the tick store")
+    args = parser.parse_args()
+
+    if args.store:
+        store = TickStore(args.store)
+        make_replayer = lambda: TickReplayer.from_store(store, args.instrument, batch_size=args.batch_size)
+        source = f"{args.store} ({args.instrument})"
+    else:
+        times, bid, ask = synthetic_ticks(args.ticks)
+        make_replayer = lambda: TickReplayer.from_arrays(times, bid, ask, batch_size=args.batch_size)
+        source = f"{args.ticks} synthetic ticks"
+
+    print(f"=== Replay Benchmark: {source} [{args.timeframe}] ===")
+    for label, with_strategy in [("Replay + bars", False), ("Full engine", True)]:
+        ticks, elapsed, engine = replay(make_replayer, args.timeframe, with_strategy)
+        bars = len(engine.bars_df())
+        trades = len(engine.get_results_df())
+        print(f"{label:<14} {ticks / elapsed:>12,.0f} ticks/s  ({ticks} ticks, {bars} bars, {trades} trades, {elapsed:.2f}s)")
@@ -0,0 +1,231 @@
+import os
+import sys
+import gc
+import io
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import datetime
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'src'))
+from benchmarks.synthetic import synthetic_bars, synthetic_ticks, write_tick_csv
+from ils.indicators import IndicatorContext
+from ils.smc import detect_fvg, detect_order_blocks
+from ils.strategy import run_strategy
+from ils.backtest import TradeManager
+from ils.engine import ReplayEngine, TickReplayer
+from ils.profiling import rss_mb, peak_rss_mb
+from process_data import process_single_file
+
+# Pipeline benchmark suite.
+# Every (stage, rows) case runs in a fresh process: inputs are generated
+# from the seed (not timed), then the stage is timed once. Peak RSS is the
+# high-water mark during the stage alone where the kernel allows resetting
+# it (Linux /proc/self/clear_refs), else the process lifetime peak.
+
+# --- Stages: setup(rows, seed, workdir) -> ctx (untimed), run(ctx) (timed) ---
+
+def _setup_bars(rows, seed, workdir, timeframe):
+    return {'bars': synthetic_bars(rows, timeframe, seed=seed)}
+
+def _run_indicators(ctx):
+    indicators = IndicatorContext(ctx['bars'])
+    indicators.atr(period=14)
+    indicators.chop()
+    indicators.adx()
+    indicators.swings()
+
+def _setup_order_blocks(rows, seed, workdir, timeframe):
+    bars = synthetic_bars(rows, timeframe, seed=seed)
+    indicators = IndicatorContext(bars)
+    bars['ATR'] = indicators.atr(period=14)
+    return {'bars': bars, 'fvg': detect_fvg(bars, atr_col='ATR'), 'swings': indicators.swings()}
+
+def _run_order_blocks(ctx):
+    detect_order_blocks(ctx['bars'], ctx['fvg'], ctx['swings'])
+
+def _bias(rows, seed):
+    return list(np.random.default_rng(seed).choice(['Bullish', 'Bearish', 'Neutral'], rows))
+
+def _setup_strategy(rows, seed, workdir, timeframe):
+    return {'bars': synthetic_bars(rows, timeframe, seed=seed), 'bias': _bias(rows, seed)}
+
+def _run_strategy(ctx):
+    run_strategy(ctx['bars'], account_equity=25000.0, htf_bias=ctx['bias'], engine='vectorized')
+
+def _setup_simulate(rows, seed, workdir, timeframe):
+    bars = synthetic_bars(rows, timeframe, seed=seed)
+    return {'results': run_strategy(bars, account_equity=25000.0, htf_bias=_bias(rows, seed), engine='vectorized')}
+
+def _run_simulate(ctx):
+    TradeManager(initial_equity=25000.0).simulate(ctx['results'])
+
+def _setup_tick_file(rows, seed, workdir, timeframe):
+    path = write_tick_csv(os.path.join(workdir, 'SYN_ticks.csv'), rows, seed=seed)
+    return {'path': path, 'out': os.path.join(workdir, 'processed'), 'timeframes': [timeframe, '1h', '1D']}
+
+def _run_process_ticks(ctx):
+    process_single_file(ctx['path'], ctx['out'], 'SYN', ctx['timeframes'])
+
+def _setup_ticks(rows, seed, workdir, timeframe):
+    times, bid, ask = synthetic_ticks(rows, seed=seed)
+    return {'times': times, 'bid': bid, 'ask': ask, 'timeframe': timeframe}
+
+def _run_replay(ctx):
+    engine = ReplayEngine(ctx['timeframe'], strategy=None)
+    engine.run(TickReplayer.from_arrays(ctx['times'], ctx['bid'], ctx['ask']))
+
+# name: (row unit, setup, run)
+STAGES = {
+    'process_ticks': ('ticks', _setup_tick_file, _run_process_ticks),
+    'indicators': ('bars', _setup_bars, _run_indicators),
+    'detect_order_blocks': ('bars', _setup_order_blocks, _run_order_blocks),
+    'run_strategy': ('bars', _setup_strategy, _run_strategy),
+    'simulate': ('bars', _setup_simulate, _run_simulate),
+    'replay': ('ticks', _setup_ticks, _run_replay),
+}
+
+# --- Memory ---
+
+def _status_mb(field):
+    """
+    A /proc/self/status memory field (e.g. VmHWM) in MB (None if unavailable).
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _release_free_memory():
+    """
+    Return freed heap pages to the OS (glibc only) so a stage cannot hide
+    its allocations in memory its setup already freed.
+    """
+    try:
+        import ctypes
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def run_case(stage, rows, seed=42, timeframe='5min', workdir=None):
+    """
+    Time one stage on `rows` generated rows in the current process.
+    Returns a result record (seconds, rows/sec and RSS in MB).
+    """
+    unit, setup, run = STAGES[stage]
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        ctx = setup(rows, seed, tmp, timeframe)
+        gc.collect()
+        _release_free_memory()
+        rss_before = rss_mb()
+        stage_scope = _reset_peak_rss()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run(ctx)
+            elapsed = time.perf_counter() - start
+
+        peak = _status_mb('VmHWM') if stage_scope else peak_rss_mb()
+    return {
+        'stage': stage,
+        'rows': rows,
+        'unit': unit,
+        'seconds': round(elapsed, 6),
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed > 0 else None,
+        'rss_before_mb': round(rss_before, 1) if rss_before is not None else None,
+        'peak_rss_mb': round(peak, 1) if peak is not None else None,
+        'peak_delta_mb': round(peak - rss_before, 1) if peak is not None and rss_before is not None else None,
+        'peak_scope': 'stage' if stage_scope else 'process'
+    }
+
+def run_isolated(stage, rows, seed=42, timeframe='5min', workdir=None):
+    """
+    run_case in a freshly spawned process so no earlier case affects its memory.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_case, stage, rows, seed, timeframe, workdir).result()
+
+def environment(seed):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'seed': seed,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def compare(results: pd.DataFrame, baseline_path: str) -> pd.DataFrame:
+    """
+    Throughput ratio and peak memory change against an earlier results file.
+    """
+    with open(baseline_path) as f:
+        baseline = pd.DataFrame(json.load(f)['results'])
+    merged = results.merge(baseline, on=['stage', 'rows'], suffixes=('', '_base'))
+    return pd.DataFrame({
+        'stage': merged['stage'],
+        'rows': merged['rows'],
+        'speedup': (merged['rows_per_sec'] / merged['rows_per_sec_base']).round(2),
+        'peak_delta_mb_base': merged['peak_delta_mb_base'],
+        'peak_delta_mb': merged['peak_delta_mb']
+    })
+
+def main(stages, sizes, seed=42, timeframe='5min', output=None, baseline=None, workdir=None):
+    records = []
+    for stage in stages:
+        for rows in sizes:
+            record = run_isolated(stage, rows, seed, timeframe, workdir)
+            records.append(record)
+            print(f"{stage:<20} {rows:>12,} {record['unit']:<6} {record['rows_per_sec']:>14,.0f} rows/s  "
+                  f"{record['seconds']:>9.3f}s  peak +{record['peak_delta_mb']} MB")
+
+    results = pd.DataFrame(records)
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'environment': environment(seed), 'results': records}, f, indent=2)
+        print(f"\nSaved benchmark results to {output}")
+    if baseline:
+        print(f"\n--- Against {baseline} ---")
+        print(compare(results, baseline).to_string(index=False))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on seeded synthetic data")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES), help="Stages to run (default: all)")
+    parser.add_argument("--rows", nargs="+", type=float, default=[1e4, 1e5], help="Input sizes in rows, e.g. 1e4 1e6 (ticks or bars per stage)")
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic data seed")
+    parser.add_argument("--timeframe", default="5min", help="Bar timeframe")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--workdir", help="Directory for temporary tick files (default: system temp)")
+    args = parser.parse_args()
+
+    main(args.stages, [int(r) for r in args.rows], args.seed, args.timeframe, args.output, args.compare, args.workdir)
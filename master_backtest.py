@@ -4,23 +4,46 @@ import sys
 import pandas as pd
 import glob
 import shutil
+import json
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from process_data import process_data
-from backtest_runner import run_backtest_engine
+from process_data import process_data, pending_sources
+from backtest_runner import run_backtest_engine, feature_cache_from_config, monte_carlo_from_config
 from visualize_stats import generate_dashboard
+from ils.store import BarStore
+from ils.profiling import span, profiling, cprofile, summarize
 
 def load_config(config_path="config.yml"):
     with open(config_path, "r") as f:
         return yaml.safe_load(f)
 
-def check_data_exists(processed_dir, start_date, end_date, timeframe="1h"):
+def check_data_exists(processed_dir, start_date, end_date, timeframe="1h", instrument=None):
     """
     Check if processed files exist covering the requested date range with valid schema.
     """
+    store = BarStore(processed_dir)
+    if instrument and store.has_data(instrument, timeframe):
+        coverage = store.coverage(instrument, timeframe)
+        if coverage is None:
+            return False
+        min_found, max_found = coverage[0].date(), coverage[1].date()
+        req_start = pd.to_datetime(start_date).date()
+        req_end = pd.to_datetime(end_date).date()
+        
+        if req_start < min_found or req_end > max_found:
+            print(f"Coverage Gap: Found {min_found} to {max_found}. Need {req_start} to {req_end}.")
+            return False
+            
+        columns = store.columns(instrument, timeframe)
+        if 'Bid_Open' not in columns:
+            print(f"Data in {processed_dir} is outdated (missing Bid/Ask). Reprocessing...")
+            return False
+        return 'Volume' in columns
+        
     tf_label = timeframe.replace('h', 'hour').replace('min', 'min')
     pattern = os.path.join(processed_dir, f"*_{tf_label}_*.csv")
     files = glob.glob(pattern)
@@ -104,7 +127,129 @@ def archive_previous_results(output_dir):
         except Exception as e:
             print(f"Failed to move {item}: {e}")
 
-def main(force_process=False):
+def run_instrument(inst, start_date, end_date, initial_balance, timeframe, base_output_dir, charts_dir, force_process=False, tick_exits=False, profile_dir=None, cprofile_stats=False, feature_cache=None, monte_carlo_options=None, arrays=False):
+    """
+    Data check, processing, backtest and charts for one instrument.
+    Returns the metrics dict for the summary, or None if the instrument was skipped.
+    profile_dir: save per-stage timings to <profile_dir>/<symbol>.json
+    (plus <symbol>.prof cProfile stats with cprofile_stats=True).
+    """
+    if profile_dir is None:
+        return _run_instrument(inst, start_date, end_date, initial_balance, timeframe, base_output_dir, charts_dir, force_process, tick_exits, feature_cache, monte_carlo_options, arrays)
+        
+    symbol = inst['symbol']
+    stats_path = os.path.join(profile_dir, f"{symbol}.prof") if cprofile_stats else None
+    with profiling(symbol) as prof, cprofile(stats_path):
+        metrics = _run_instrument(inst, start_date, end_date, initial_balance, timeframe, base_output_dir, charts_dir, force_process, tick_exits, feature_cache, monte_carlo_options, arrays)
+    prof.save(os.path.join(profile_dir, f"{symbol}.json"))
+    return metrics
+
+def _run_instrument(inst, start_date, end_date, initial_balance, timeframe, base_output_dir, charts_dir, force_process=False, tick_exits=False, feature_cache=None, monte_carlo_options=None, arrays=False):
+    symbol = inst['symbol']
+    input_file = inst['input_file']
+    processed_dir = inst['processed_dir']
+    
+    print(f"\n--- Instrument: {symbol} ---")
+    
+    # 1. Data Processing Check
+    # New or changed source files are picked up via the processing manifest
+    timeframes = [timeframe, '1D']
+    with span('data_check'):
+        needs_processing = force_process or not check_data_exists(processed_dir, start_date, end_date, timeframe, symbol)
+        if not needs_processing and pending_sources(input_file, processed_dir, timeframes, store_ticks=tick_exits):
+            print(f"New source files for {symbol}.")
+            needs_processing = True
+        
+    if needs_processing:
+        print(f"Data missing or incomplete in {processed_dir}. Processing source...")
+        
+        # Check if input_file exists (file or dir) or pattern
+        has_input = False
+        if os.path.exists(input_file):
+             has_input = True
+        elif glob.glob(input_file):
+             has_input = True
+             
+        if not has_input:
+            print(f"CRITICAL: Input source {input_file} not found. Skipping {symbol}.")
+            return None
+            
+        with span('processing'):
+            process_data(input_file, processed_dir, symbol, timeframes, force=force_process, store_ticks=tick_exits)
+    else:
+        print(f"Data found in {processed_dir}. Skipping processing.")
+        
+    # 2. Run Backtest
+    print(f"Running Backtest ({start_date} to {end_date})...")
+    with span('backtest'):
+        trades_df, metrics = run_backtest_engine(
+            instrument=symbol,
+            start_date=start_date,
+            end_date=end_date,
+            data_dir=processed_dir,
+            initial_balance=initial_balance,
+            timeframe=timeframe,
+            tick_exits=tick_exits,
+            feature_cache=feature_cache,
+            monte_carlo_options=monte_carlo_options,
+            arrays=arrays
+        )
+
+    if not trades_df.empty:
+        # Save results to centralized folder
+        out_csv = os.path.join(base_output_dir, f"{symbol}_trades.csv")
+        with span('save'):
+            trades_df.to_csv(out_csv, index=False)
+        print(f"Saved trades to {out_csv}")
+        
+        # Generate Visualization
+        print(f"Generating charts for {symbol}...")
+        inst_chart_dir = os.path.join(charts_dir, symbol)
+        with span('charts'):
+            generate_dashboard(trades_df, inst_chart_dir, initial_balance, instrument=symbol)
+    else:
+        print(f"No trades generated for {symbol}.")
+        # Initialize empty metrics for report
+        metrics = {
+            'Total Trades': 0, 
+            'Win Rate (%)': 0, 'Total PnL ($)': 0, 'Return (%)': 0, 
+            'Max Drawdown (%)': 0, 'Sharpe Ratio': 0,
+            'Avg Score': 0, 'Tier 1 Trades': 0, 'Tier 2 Trades': 0,
+            'Avg HTF': 0, 'Avg Disp': 0, 'Avg Liq': 0, 'Avg Ctxt': 0
+        }
+        
+    # Add to Summary
+    metrics['Instrument'] = symbol
+    return metrics
+
+def report_profiles(profile_dir, symbols):
+    """
+    Combine the per-instrument stage timings into one table (stages summed
+    over instruments) and save it as profile_summary.json.
+    """
+    records = []
+    totals = {}
+    for symbol in symbols:
+        path = os.path.join(profile_dir, f"{symbol}.json")
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            report = json.load(f)
+        records.extend(report['spans'])
+        totals[symbol] = report['elapsed']
+        
+    summary = summarize(records)
+    print("\n=== STAGE TIMINGS (all instruments) ===")
+    print(summary.to_string())
+    print("\n" + "\n".join(f"{symbol}: {seconds:.2f}s" for symbol, seconds in totals.items()))
+    
+    out_path = os.path.join(profile_dir, "profile_summary.json")
+    with open(out_path, "w") as f:
+        json.dump({'instruments': totals, 'summary': summary.reset_index().to_dict(orient='records')}, f, indent=2)
+    print(f"\nSaved stage timings to {profile_dir}")
+    return summary
+
+def main(force_process=False, workers=None, profile=False, cprofile_stats=False):
     print("=== Master Backtest Orchestrator ===")
     config = load_config()
     
@@ -116,6 +261,9 @@ def main(force_process=False):
     end_date = global_settings.get('end_date')
     initial_balance = global_settings.get('initial_balance', 25000.0)
     base_output_dir = global_settings.get('output_base_dir', 'data/backtest_results')
+    if workers is None:
+        workers = global_settings.get('workers', 1)
+    tick_exits = global_settings.get('tick_exits', False)
     
     # Archive previous runs before starting new one
     archive_previous_results(base_output_dir)
@@ -127,72 +275,22 @@ def main(force_process=False):
     os.makedirs(base_output_dir, exist_ok=True)
     os.makedirs(charts_dir, exist_ok=True)
     
-    summary_results = []
+    enabled = [inst for inst in instruments if inst.get('enabled', True)]
+    profile_dir = os.path.join(base_output_dir, "profile") if profile else None
+    # Features are rebuilt anyway when reprocessing is forced
+    feature_cache = None if force_process else feature_cache_from_config(config)
+    job_args = (start_date, end_date, initial_balance, timeframe, base_output_dir, charts_dir, force_process, tick_exits, profile_dir, cprofile_stats, feature_cache, monte_carlo_from_config(config), data_settings.get('mmap_arrays', False))
     
-    for inst in instruments:
-        if not inst.get('enabled', True):
-            continue
-
-        symbol = inst['symbol']
-        input_file = inst['input_file']
-        processed_dir = inst['processed_dir']
-        
-        print(f"\n--- Instrument: {symbol} ---")
+    if workers and workers > 1 and len(enabled) > 1:
+        # One process per instrument; results are collected in config order
+        print(f"Running {len(enabled)} instruments on {workers} workers...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_instrument, inst, *job_args) for inst in enabled]
+            instrument_metrics = [f.result() for f in futures]
+    else:
+        instrument_metrics = [run_instrument(inst, *job_args) for inst in enabled]
         
-        # 1. Data Processing Check
-        if force_process or not check_data_exists(processed_dir, start_date, end_date, timeframe):
-            print(f"Data missing or incomplete in {processed_dir}. Processing source...")
-            
-            # Check if input_file exists (file or dir) or pattern
-            has_input = False
-            if os.path.exists(input_file):
-                 has_input = True
-            elif glob.glob(input_file):
-                 has_input = True
-                 
-            if not has_input:
-                print(f"CRITICAL: Input source {input_file} not found. Skipping {symbol}.")
-                continue
-                
-            process_data(input_file, processed_dir, symbol, [timeframe, '1D'])
-        else:
-            print(f"Data found in {processed_dir}. Skipping processing.")
-            
-        # 2. Run Backtest
-        print(f"Running Backtest ({start_date} to {end_date})...")
-        trades_df, metrics = run_backtest_engine(
-            instrument=symbol,
-            start_date=start_date,
-            end_date=end_date,
-            data_dir=processed_dir,
-            initial_balance=initial_balance,
-            timeframe=timeframe
-        )
-
-        if not trades_df.empty:
-            # Save results to centralized folder
-            out_csv = os.path.join(base_output_dir, f"{symbol}_trades.csv")
-            trades_df.to_csv(out_csv, index=False)
-            print(f"Saved trades to {out_csv}")
-            
-            # Generate Visualization
-            print(f"Generating charts for {symbol}...")
-            inst_chart_dir = os.path.join(charts_dir, symbol)
-            generate_dashboard(trades_df, inst_chart_dir, initial_balance, instrument=symbol)
-        else:
-            print(f"No trades generated for {symbol}.")
-            # Initialize empty metrics for report
-            metrics = {
-                'Total Trades': 0, 
-                'Win Rate (%)': 0, 'Total PnL ($)': 0, 'Return (%)': 0, 
-                'Max Drawdown (%)': 0, 'Sharpe Ratio': 0,
-                'Avg Score': 0, 'Tier 1 Trades': 0, 'Tier 2 Trades': 0,
-                'Avg HTF': 0, 'Avg Disp': 0, 'Avg Liq': 0, 'Avg Ctxt': 0
-            }
-            
-        # Add to Summary
-        metrics['Instrument'] = symbol
-        summary_results.append(metrics)
+    summary_results = [m for m in instrument_metrics if m is not None]
             
     # 3. Final Report
     if summary_results:
@@ -222,11 +320,17 @@ def main(force_process=False):
         print(f"\nSaved analysis to {analysis_csv}")
     else:
         print("\nNo results to summarize.")
+        
+    if profile_dir:
+        report_profiles(profile_dir, [inst['symbol'] for inst in enabled])
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--force-process", action="store_true", help="Force reprocessing of data")
+    parser.add_argument("--workers", type=int, help="Parallel instrument workers (overrides config)")
+    parser.add_argument("--profile", action="store_true", help="Per-stage timing report per instrument (saved under <output_base_dir>/profile)")
+    parser.add_argument("--cprofile", action="store_true", help="Also dump cProfile stats per instrument (with --profile)")
     args = parser.parse_args()
     
-    main(force_process=args.force_process)
+    main(force_process=args.force_process, workers=args.workers, profile=args.profile, cprofile_stats=args.cprofile)
@@ -0,0 +1,81 @@
+import yaml
+import os
+import sys
+import argparse
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+from backtest_runner import load_data, load_daily_bias, map_daily_bias
+from ils.sweep import SharedFeatures, param_grid, run_sweep
+
+# Metrics shown in the console summary (all are saved)
+SUMMARY_COLUMNS = ['Total Trades', 'Win Rate (%)', 'Return (%)', 'Max Drawdown (%)', 'Profit Factor', 'Sharpe Ratio']
+
+def sweep_instrument(symbol, data_dir, start_date, end_date, initial_balance, timeframe, grid, workers, mmap_arrays=False):
+    """
+    Sweep one instrument: load and prepare the bars once, then score and
+    simulate every grid point from the shared features.
+    """
+    print(f"\n=== Parameter Sweep: {symbol} ({len(grid)} points) ===")
+    df = load_data(data_dir, symbol, start_date, end_date, timeframe, arrays=mmap_arrays)
+    if df.empty:
+        print("No data found for specified parameters.")
+        return pd.DataFrame()
+    print(f"Loaded {len(df)} bars.")
+
+    bias_series = map_daily_bias(df.index, load_daily_bias(data_dir, symbol))
+    shared = SharedFeatures(df)
+    table = run_sweep(shared, grid, bias_series, initial_balance, workers)
+    table.insert(0, 'instrument', symbol)
+    return table
+
+def main(config_path="config.yml", instrument=None, workers=None):
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+
+    backtest_cfg = config.get('backtest', {})
+    timeframe = config.get('data', {}).get('timeframe', '1h')
+    mmap_arrays = config.get('data', {}).get('mmap_arrays', False)
+    if workers is None:
+        workers = backtest_cfg.get('workers', 1)
+
+    # sweep: {field: [values]}; unlisted fields keep the spec defaults
+    values = config.get('sweep', {})
+    grid = param_grid(**values)
+    varied = list(values)
+
+    tables = []
+    for inst in config.get('instruments', []):
+        if instrument and inst['symbol'] != instrument:
+            continue
+        if not instrument and not inst.get('enabled', True):
+            continue
+        tables.append(sweep_instrument(
+            inst['symbol'], inst['processed_dir'],
+            backtest_cfg.get('start_date'), backtest_cfg.get('end_date'),
+            backtest_cfg.get('initial_balance', 25000.0), timeframe, grid, workers, mmap_arrays
+        ))
+
+    results = pd.concat(tables) if tables else pd.DataFrame()
+    if results.empty:
+        print("\nNo results.")
+        return results
+
+    print("\n--- Sweep Results ---")
+    print(results[['instrument'] + varied + SUMMARY_COLUMNS].to_string())
+
+    out_dir = os.path.join(backtest_cfg.get('output_base_dir', 'data/backtest_results'), 'sweep')
+    os.makedirs(out_dir, exist_ok=True)
+    out_file = os.path.join(out_dir, 'sweep_results.csv')
+    results.to_csv(out_file)
+    print(f"\nSaved sweep results to {out_file}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest a grid of strategy parameter perturbations")
+    parser.add_argument("--config", default="config.yml", help="Path to config file")
+    parser.add_argument("--instrument", help="Only this instrument (default: all enabled)")
+    parser.add_argument("--workers", type=int, help="Parallel grid workers (overrides config)")
+    args = parser.parse_args()
+
+    main(config_path=args.config, instrument=args.instrument, workers=args.workers)
@@ -0,0 +1,96 @@
+import yaml
+import os
+import sys
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+from backtest_runner import simulate_instrument, feature_cache_from_config
+from ils.portfolio import run_portfolio
+from ils.metrics import calculate_metrics
+from ils.store import BarStore
+
+def instrument_trades(symbol, start_date, end_date, data_dir, initial_balance, timeframe, tick_exits=False, feature_cache=None, arrays=False):
+    """
+    Closed trades of one instrument, all sized from initial_balance (empty frame if no data).
+    The shared account re-sizes them in run_portfolio.
+    Only the trades are kept; the bars are released when this returns.
+    """
+    print(f"\n--- Instrument: {symbol} ---")
+    trades_df = simulate_instrument(symbol, start_date, end_date, data_dir, initial_balance, timeframe, tick_exits, equity_sizing=False, feature_cache=feature_cache, arrays=arrays)
+    return trades_df if trades_df is not None else pd.DataFrame()
+
+def main(config_path="config.yml", workers=None):
+    print("=== Portfolio Backtest ===")
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+
+    backtest_cfg = config.get('backtest', {})
+    start_date = backtest_cfg.get('start_date')
+    end_date = backtest_cfg.get('end_date')
+    initial_balance = backtest_cfg.get('initial_balance', 25000.0)
+    base_output_dir = backtest_cfg.get('output_base_dir', 'data/backtest_results')
+    tick_exits = backtest_cfg.get('tick_exits', False)
+    timeframe = config.get('data', {}).get('timeframe', '1h')
+    mmap_arrays = config.get('data', {}).get('mmap_arrays', False)
+    if workers is None:
+        workers = backtest_cfg.get('workers', 1)
+
+    enabled = [inst for inst in config.get('instruments', []) if inst.get('enabled', True)]
+    job_args = (start_date, end_date)
+    feature_cache = feature_cache_from_config(config)
+    if mmap_arrays:
+        # Consolidate up front so workers only ever map finished arrays
+        for inst in enabled:
+            store = BarStore(inst['processed_dir'])
+            if store.has_data(inst['symbol'], timeframe) and not store.has_arrays(inst['symbol'], timeframe):
+                store.write_arrays(inst['symbol'], timeframe)
+
+    # 1. Per-instrument trade streams (bars never leave the worker)
+    if workers and workers > 1 and len(enabled) > 1:
+        print(f"Simulating {len(enabled)} instruments on {workers} workers...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                inst['symbol']: pool.submit(instrument_trades, inst['symbol'], *job_args, inst['processed_dir'], initial_balance, timeframe, tick_exits, feature_cache, mmap_arrays)
+                for inst in enabled
+            }
+            trade_frames = {symbol: f.result() for symbol, f in futures.items()}
+    else:
+        trade_frames = {
+            inst['symbol']: instrument_trades(inst['symbol'], *job_args, inst['processed_dir'], initial_balance, timeframe, tick_exits, feature_cache, mmap_arrays)
+            for inst in enabled
+        }
+
+    # 2. Shared account: merged in time order, sized from current equity
+    trades_df, equity_df = run_portfolio(trade_frames, initial_equity=initial_balance)
+    if trades_df.empty:
+        print("\nNo trades executed.")
+        return trades_df, equity_df, {}
+
+    print("\n=== PORTFOLIO METRICS ===")
+    metrics = calculate_metrics(trades_df, initial_balance)
+    for k, v in metrics.items():
+        print(f"{k}: {v}")
+    print(f"Peak Exposure: {equity_df['Exposure'].max():.2f}")
+    print(f"Max Open Trades: {int(equity_df['Open_Trades'].max())}")
+
+    print("\n--- Contribution by Instrument ---")
+    contribution = trades_df.groupby('instrument', sort=False)['pnl'].agg(['count', 'sum'])
+    contribution.columns = ['Trades', 'PnL ($)']
+    print(contribution.to_string())
+
+    out_dir = os.path.join(base_output_dir, 'portfolio')
+    os.makedirs(out_dir, exist_ok=True)
+    trades_df.to_csv(os.path.join(out_dir, 'portfolio_trades.csv'), index=False)
+    equity_df.to_csv(os.path.join(out_dir, 'portfolio_equity.csv'))
+    print(f"\nSaved portfolio results to {out_dir}")
+    return trades_df, equity_df, metrics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest all enabled instruments against one shared account")
+    parser.add_argument("--config", default="config.yml", help="Path to config file")
+    parser.add_argument("--workers", type=int, help="Parallel instrument workers (overrides config)")
+    args = parser.parse_args()
+
+    main(config_path=args.config, workers=args.workers)
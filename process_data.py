@@ -4,9 +4,14 @@ import os
 import sys
 import argparse
 import glob
+import json
+import hashlib
+from pandas.tseries.frequencies import to_offset
 
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+from ils.store import BarStore, TickStore
+from ils.profiling import span, profiling, cprofile
 
 def categorize_session(row):
     h = row.hour
@@ -19,22 +24,34 @@ def categorize_session(row):
         sessions.append('NY')
     return ",".join(sessions)
 
-def process_single_file(input_file, output_dir, instrument, timeframes):
-    print(f"Reading {input_file}...")
-    try:
-        df = pd.read_csv(input_file)
-    except Exception as e:
-        print(f"Error reading input file: {e}")
-        return
+def write_bars_csv(out_df, output_dir, instrument, tf, date_str):
+    """
+    Export one day of bars in the per-day CSV layout.
+    """
+    tf_label = tf.replace('h', 'hour').replace('min', 'min')
+    
+    if tf == '1D': 
+        tf_label = 'daily'
+        daily_dir = os.path.join(output_dir, 'daily')
+        os.makedirs(daily_dir, exist_ok=True)
+        out_filename = os.path.join(daily_dir, f"{instrument}_{tf_label}_{date_str}.csv")
+    else:
+        out_filename = os.path.join(output_dir, f"{instrument}_{tf_label}_{date_str}.csv")
+    
+    out_df.to_csv(out_filename)
 
-    print("Processing timestamps...")
+def clean_ticks(df):
+    """
+    Timestamp, de-duplicate and validate raw ticks (Rules 16.2-16.3).
+    Returns a date-indexed frame with Mid/bidPrice/askPrice/Spread/Volume, or None.
+    """
     if 'timestamp' in df.columns:
         df['date'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
     elif 'Date' in df.columns:
          df['date'] = pd.to_datetime(df['Date'], utc=True)
     else:
         print("Error: No 'timestamp' or 'Date' column found.")
-        return
+        return None
 
     # De-duplication (Keep last) - Rule 16.3
     df.drop_duplicates(subset=['date'], keep='last', inplace=True)
@@ -60,7 +77,7 @@ def process_single_file(input_file, output_dir, instrument, timeframes):
         df['Spread'] = 0.0
     else:
         print("Error: Could not determine price columns.")
-        return
+        return None
         
     # Volume
     if 'askVolume' in df.columns and 'bidVolume' in df.columns:
@@ -69,91 +86,421 @@ def process_single_file(input_file, output_dir, instrument, timeframes):
         pass
     else:
         df['Volume'] = 1.0 
+        
+    return df
 
-    # Group by Day
-    grouped = df.groupby(pd.Grouper(freq='D'))
-    
-    # Reuse output dir structure
-    
-    for date, group in grouped:
-        if group.empty:
-            continue
-            
-        date_str = date.strftime('%Y%m%d')
+class UnsortedTicksError(ValueError):
+    """
+    A tick chunk starts at or before the end of the previous one.
+    """
+
+def iter_tick_chunks(input_file, chunksize=None):
+    """
+    Yield cleaned, chronologically sorted tick chunks.
+    Raises ValueError if the file has no usable timestamp or price columns,
+    and UnsortedTicksError if the file is not in time order across chunks
+    (each chunk is sorted on its own, so only a whole-file read can fix that).
+    Ticks sharing the last timestamp of a chunk are carried into the next one
+    so de-duplication (keep last) holds across chunk boundaries.
+    chunksize=None reads the whole file as a single chunk.
+    """
+    if chunksize is None:
+        reader = [pd.read_csv(input_file)]
+    else:
+        reader = pd.read_csv(input_file, chunksize=chunksize)
         
-        for tf in timeframes:
-            agg_dict = {
-                'Mid': ['first', 'max', 'min', 'last', 'count'],
-                'bidPrice': ['first', 'max', 'min', 'last'],
-                'askPrice': ['first', 'max', 'min', 'last'],
-                'Volume': 'sum',
-                'Spread': 'mean'
-            }
-            
-            resampled = group.resample(tf).agg(agg_dict)
-            
-            m_open = resampled[('Mid', 'first')]
-            m_high = resampled[('Mid', 'max')]
-            m_low = resampled[('Mid', 'min')]
-            m_close = resampled[('Mid', 'last')]
-            tick_count = resampled[('Mid', 'count')]
+    carry = None
+    last_time = None
+    for raw in reader:
+        if carry is not None:
+            raw = pd.concat([carry, raw], ignore_index=True)
             
-            b_open = resampled[('bidPrice', 'first')]
-            b_high = resampled[('bidPrice', 'max')]
-            b_low = resampled[('bidPrice', 'min')]
-            b_close = resampled[('bidPrice', 'last')]
+        # Hold back the rows of the final timestamp
+        key = 'timestamp' if 'timestamp' in raw.columns else 'Date'
+        if key in raw.columns and chunksize is not None:
+            last_mask = (raw[key] == raw[key].iloc[-1]).values
+            carry = raw[last_mask]
+            raw = raw[~last_mask]
             
-            a_open = resampled[('askPrice', 'first')]
-            a_high = resampled[('askPrice', 'max')]
-            a_low = resampled[('askPrice', 'min')]
-            a_close = resampled[('askPrice', 'last')]
+        ticks = clean_ticks(raw.copy())
+        if ticks is None:
+            raise ValueError(f"Could not read ticks from {input_file}")
+        if not ticks.empty:
+            if last_time is not None and ticks.index[0] <= last_time:
+                raise UnsortedTicksError(f"Ticks in {input_file} are not in time order")
+            last_time = ticks.index[-1]
+            yield ticks
             
-            vol = resampled[('Volume', 'sum')]
-            spread_avg = resampled[('Spread', 'mean')]
-            
-            out_df = pd.DataFrame({
-                'Open': m_open,
-                'High': m_high,
-                'Low': m_low,
-                'Close': m_close,
-                'Volume': vol,
-                'Tick_Count': tick_count,
-                'Spread_Avg': spread_avg,
-                'Bid_Open': b_open,
-                'Bid_High': b_high,
-                'Bid_Low': b_low,
-                'Bid_Close': b_close,
-                'Ask_Open': a_open,
-                'Ask_High': a_high,
-                'Ask_Low': a_low,
-                'Ask_Close': a_close
-            })
-            
-            out_df.dropna(subset=['Open'], inplace=True)
-            
-            if out_df.empty:
-                continue
-                
-            if tf not in ['1D', '1W']:
-                out_df['Session'] = out_df.index.map(categorize_session)
-            else:
-                out_df['Session'] = 'Daily'
-            
-            tf_label = tf.replace('h', 'hour').replace('min', 'min')
-            
-            if tf == '1D': 
-                tf_label = 'daily'
-                daily_dir = os.path.join(output_dir, 'daily')
-                os.makedirs(daily_dir, exist_ok=True)
-                out_filename = os.path.join(daily_dir, f"{instrument}_{tf_label}_{date_str}.csv")
-            else:
-                out_filename = os.path.join(output_dir, f"{instrument}_{tf_label}_{date_str}.csv")
-            
-            out_df.to_csv(out_filename)
+    if carry is not None and not carry.empty:
+        ticks = clean_ticks(carry.copy())
+        if ticks is None:
+            raise ValueError(f"Could not read ticks from {input_file}")
+        if not ticks.empty:
+            if last_time is not None and ticks.index[0] <= last_time:
+                raise UnsortedTicksError(f"Ticks in {input_file} are not in time order")
+            yield ticks
 
-def process_data(input_source, output_dir, instrument, timeframes):
-    os.makedirs(output_dir, exist_ok=True)
+# Partial bar columns: prices merge as first/max/min/last, counters as sums
+BAR_FIRST = ['Open', 'Bid_Open', 'Ask_Open']
+BAR_MAX = ['High', 'Bid_High', 'Ask_High']
+BAR_MIN = ['Low', 'Bid_Low', 'Ask_Low']
+BAR_LAST = ['Close', 'Bid_Close', 'Ask_Close']
+BAR_SUM = ['Volume', 'Tick_Count', 'Spread_Sum']
+
+def bar_period(tf):
+    """
+    Fixed bar length of a timeframe that tiles a UTC day exactly, else None.
+    """
+    offset = to_offset(tf)
+    if isinstance(offset, pd.offsets.Tick):
+        period = pd.Timedelta(offset)
+    elif isinstance(offset, pd.offsets.Day) and offset.n == 1:
+        period = pd.Timedelta(days=1)
+    else:
+        return None
+    return period if pd.Timedelta(days=1) % period == pd.Timedelta(0) else None
+
+def resample_by_day(frame, tf, agg_dict):
+    """
+    Resample without letting bars span a UTC day boundary.
+    Timeframes that tile the day align with midnight already, so they are
+    resampled in one pass; others are resampled day by day.
+    """
+    if bar_period(tf) is not None:
+        return frame.resample(tf).agg(agg_dict)
+    frames = [group.resample(tf).agg(agg_dict) for date, group in frame.groupby(pd.Grouper(freq='D')) if not group.empty]
+    return pd.concat(frames) if frames else pd.DataFrame()
+
+def aggregate_ticks(ticks, tf):
+    """
+    Resample ticks into (possibly partial) bars for one timeframe.
+    Bars never span a UTC day boundary.
+    """
+    agg_dict = {
+        'Mid': ['first', 'max', 'min', 'last', 'count'],
+        'bidPrice': ['first', 'max', 'min', 'last'],
+        'askPrice': ['first', 'max', 'min', 'last'],
+        'Volume': 'sum',
+        'Spread': 'sum'
+    }
+    
+    resampled = resample_by_day(ticks, tf, agg_dict)
+    if resampled.empty:
+        return pd.DataFrame()
+        
+    out_df = pd.DataFrame({
+        'Open': resampled[('Mid', 'first')],
+        'High': resampled[('Mid', 'max')],
+        'Low': resampled[('Mid', 'min')],
+        'Close': resampled[('Mid', 'last')],
+        'Volume': resampled[('Volume', 'sum')],
+        'Tick_Count': resampled[('Mid', 'count')],
+        'Spread_Sum': resampled[('Spread', 'sum')],
+        'Bid_Open': resampled[('bidPrice', 'first')],
+        'Bid_High': resampled[('bidPrice', 'max')],
+        'Bid_Low': resampled[('bidPrice', 'min')],
+        'Bid_Close': resampled[('bidPrice', 'last')],
+        'Ask_Open': resampled[('askPrice', 'first')],
+        'Ask_High': resampled[('askPrice', 'max')],
+        'Ask_Low': resampled[('askPrice', 'min')],
+        'Ask_Close': resampled[('askPrice', 'last')]
+    })
+    
+    out_df.dropna(subset=['Open'], inplace=True)
+    return out_df
+
+def aggregate_bars(bars, tf):
+    """
+    Derive coarser bars from finer (partial) bars.
+    Spread is carried as a sum with the tick count, so the coarse
+    Spread_Avg stays tick-weighted.
+    """
+    agg_dict = {}
+    agg_dict.update({c: 'first' for c in BAR_FIRST})
+    agg_dict.update({c: 'max' for c in BAR_MAX})
+    agg_dict.update({c: 'min' for c in BAR_MIN})
+    agg_dict.update({c: 'last' for c in BAR_LAST})
+    agg_dict.update({c: 'sum' for c in BAR_SUM})
+    
+    out_df = resample_by_day(bars, tf, agg_dict)
+    if out_df.empty:
+        return pd.DataFrame()
+    out_df = out_df[bars.columns]
+    out_df.dropna(subset=['Open'], inplace=True)
+    return out_df
+
+def aggregate_timeframes(ticks, timeframes):
+    """
+    Build bars for all timeframes in one cascade: the finest timeframe is
+    aggregated from ticks, each coarser one from the coarsest already-built
+    timeframe that tiles it exactly.
+    Returns {tf: partial bars}.
+    """
+    def sort_key(tf):
+        period = bar_period(tf)
+        return (period is None, period if period is not None else pd.Timedelta(0))
+        
+    built = {}
+    for tf in sorted(timeframes, key=sort_key):
+        period = bar_period(tf)
+        source = None
+        if period is not None:
+            for prev in reversed(list(built)):
+                prev_period = bar_period(prev)
+                if prev_period is not None and period % prev_period == pd.Timedelta(0):
+                    source = prev
+                    break
+                    
+        if source is not None and not built[source].empty:
+            built[tf] = aggregate_bars(built[source], tf)
+        elif source is not None:
+            built[tf] = pd.DataFrame()
+        else:
+            built[tf] = aggregate_ticks(ticks, tf)
+    return built
+
+def merge_partial_bar(held, bars):
+    """
+    Fold a bar held back from the previous chunk into the first bar of the
+    next chunk when both cover the same period.
+    """
+    if held is None or held.empty:
+        return bars
+    if bars.empty:
+        return held
+    if bars.index[0] != held.index[0]:
+        return pd.concat([held, bars])
+        
+    first = bars.iloc[[0]].copy()
+    for c in BAR_FIRST:
+        first[c] = held[c].values
+    for c in BAR_MAX:
+        first[c] = np.maximum(first[c].values, held[c].values)
+    for c in BAR_MIN:
+        first[c] = np.minimum(first[c].values, held[c].values)
+    for c in BAR_SUM:
+        first[c] = first[c].values + held[c].values
+    return pd.concat([first, bars.iloc[1:]])
+
+def finalize_bars(bars, tf):
+    """
+    Convert completed partial bars to the output schema (Rule 16.8).
+    """
+    out_df = bars.copy()
+    spread_avg = out_df.pop('Spread_Sum') / out_df['Tick_Count']
+    out_df.insert(out_df.columns.get_loc('Tick_Count') + 1, 'Spread_Avg', spread_avg)
     
+    if tf not in ['1D', '1W']:
+        out_df['Session'] = out_df.index.map(categorize_session)
+    else:
+        out_df['Session'] = 'Daily'
+    return out_df
+
+class BarSink:
+    """
+    Collects completed bars per timeframe and writes them out,
+    either to the BarStore or as per-day CSV files.
+    One sink can serve several source files (begin_file()), so a store
+    partition is rewritten once per flush rather than once per file.
+    Bars are only written between files (once flush_rows are pending) or on
+    close(), so a file's bars can always be dropped with discard_file().
+    """
+    def __init__(self, output_dir, instrument, output_format="store", flush_rows=200000):
+        self.output_dir = output_dir
+        self.instrument = instrument
+        self.output_format = output_format
+        self.flush_rows = flush_rows
+        self.store = BarStore(output_dir)
+        self.pending = {}
+        self.days = set()
+        self._mark = {}
+
+    def begin_file(self):
+        """
+        Start a source file: days restart and the pending bars are marked for discard_file().
+        """
+        for tf in list(self.pending):
+            if sum(len(b) for b in self.pending[tf]) >= self.flush_rows:
+                self.flush(tf, final=False)
+        self.days = set()
+        self._mark = {tf: len(frames) for tf, frames in self.pending.items()}
+
+    def discard_file(self):
+        """
+        Drop the current file's bars that have not been written yet.
+        """
+        for tf in list(self.pending):
+            self.pending[tf] = self.pending[tf][:self._mark.get(tf, 0)]
+        self.days = set()
+
+    def emit(self, tf, bars):
+        if bars.empty:
+            return
+        self.days.update(bars.index.strftime('%Y%m%d'))
+        self.pending.setdefault(tf, []).append(finalize_bars(bars, tf))
+
+    def flush(self, tf, final=True):
+        frames = self.pending.pop(tf, [])
+        if not frames:
+            return
+        out_df = pd.concat(frames)
+        
+        if self.output_format == 'csv':
+            # A day file is only written once the day is complete
+            days = out_df.index.normalize()
+            if not final:
+                last_day = days[-1]
+                self.pending[tf] = [out_df[days == last_day]]
+                out_df = out_df[days != last_day]
+                days = days[days != last_day]
+            for date, day_df in out_df.groupby(days):
+                write_bars_csv(day_df, self.output_dir, self.instrument, tf, date.strftime('%Y%m%d'))
+        else:
+            self.store.write(self.instrument, tf, out_df)
+
+    def close(self):
+        for tf in list(self.pending):
+            self.flush(tf, final=True)
+
+def process_single_file(input_file, output_dir, instrument, timeframes, output_format="store", chunksize=1000000, store_ticks=False, sink=None):
+    """
+    Build bars from one tick file.
+    Ticks are streamed in chunks of `chunksize` rows; the last (possibly
+    incomplete) bar of each timeframe is carried into the next chunk, so peak
+    tick memory is bounded by the chunk size rather than the file size.
+    Streaming needs the file in time order; otherwise the file is re-read
+    whole and sorted, and those bars replace the streamed ones.
+    output_format: 'store' (columnar BarStore under output_dir) or 'csv' (one file per day).
+    store_ticks=True also keeps the cleaned ticks in a TickStore under output_dir
+    (used for tick-resolution exits).
+    sink: a BarSink shared across files, closed by the caller; by default the
+    file gets its own, written out before returning.
+    Returns the sorted list of days (YYYYMMDD) built, or None on error.
+    """
+    print(f"Reading {input_file}...")
+    own_sink = sink is None
+    if own_sink:
+        sink = BarSink(output_dir, instrument, output_format)
+    tick_store = TickStore(output_dir) if store_ticks else None
+    
+    try:
+        sink.begin_file()
+        try:
+            _build_bars(input_file, sink, instrument, timeframes, chunksize, tick_store)
+        except UnsortedTicksError as e:
+            if chunksize is None:
+                raise
+            print(f"{e}. Re-reading the whole file.")
+            sink.discard_file()
+            _build_bars(input_file, sink, instrument, timeframes, None, tick_store)
+        if own_sink:
+            with span('write'):
+                sink.close()
+    except Exception as e:
+        sink.discard_file()
+        print(f"Error reading input file: {e}")
+        return None
+    return sorted(sink.days)
+
+def _build_bars(input_file, sink, instrument, timeframes, chunksize, tick_store):
+    """
+    Stream one file's ticks into bars on sink (see process_single_file).
+    """
+    held = {tf: None for tf in timeframes}
+    chunks = iter_tick_chunks(input_file, chunksize)
+    while True:
+        with span('read'):
+            ticks = next(chunks, None)
+        if ticks is None:
+            break
+        if tick_store is not None:
+            with span('store_ticks'):
+                tick_store.write_ticks(instrument, ticks)
+        with span('aggregate'):
+            chunk_bars = aggregate_timeframes(ticks, timeframes)
+        with span('write'):
+            for tf in timeframes:
+                bars = merge_partial_bar(held[tf], chunk_bars[tf])
+                if bars.empty:
+                    continue
+                held[tf] = bars.iloc[[-1]]
+                sink.emit(tf, bars.iloc[:-1])
+        
+    with span('write'):
+        for tf in timeframes:
+            if held[tf] is not None:
+                sink.emit(tf, held[tf])
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class ProcessingManifest:
+    """
+    Record of which source tick files produced which days in a processed_dir,
+    stored as {output_dir}/_manifest.json.
+    A source is current when its size and mtime match the record (or, if only
+    the mtime moved, its content hash does) and it was built for every
+    requested timeframe.
+    """
+    FILENAME = '_manifest.json'
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, self.FILENAME)
+        self.sources = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.sources = json.load(f).get('sources', {})
+            except (OSError, ValueError):
+                print(f"Warning: Unreadable manifest {self.path}. Rebuilding.")
+                self.sources = {}
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    def is_current(self, path, timeframes):
+        entry = self.sources.get(self._key(path))
+        if entry is None or not set(timeframes) <= set(entry['timeframes']):
+            return False
+        stat = os.stat(path)
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        # Touched but possibly unchanged
+        if file_hash(path) == entry['sha1']:
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return True
+        return False
+
+    def record(self, path, timeframes, days):
+        stat = os.stat(path)
+        self.sources[self._key(path)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': file_hash(path),
+            'timeframes': sorted(timeframes),
+            'days': days
+        }
+
+    def reset(self):
+        self.sources = {}
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': 1, 'sources': self.sources}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+def resolve_input_files(input_source):
+    """
+    Expand a file, directory or glob pattern into a sorted list of files.
+    """
     files = []
     if isinstance(input_source, list):
         files = input_source
@@ -164,14 +511,59 @@ def process_data(input_source, output_dir, instrument, timeframes):
              files = sorted(glob.glob(input_source))
         else:
              files = [input_source]
-             
+    return files
+
+def manifest_targets(timeframes, store_ticks=False):
+    """
+    Outputs recorded in the manifest: the timeframes, plus the tick store.
+    """
+    return list(timeframes) + ([TickStore.TIMEFRAME] if store_ticks else [])
+
+def pending_sources(input_source, output_dir, timeframes, store_ticks=False):
+    """
+    Source files that are new or changed since they were last processed.
+    """
+    manifest = ProcessingManifest(output_dir)
+    targets = manifest_targets(timeframes, store_ticks)
+    return [f for f in resolve_input_files(input_source) if not manifest.is_current(f, targets)]
+
+def process_data(input_source, output_dir, instrument, timeframes, output_format="store", chunksize=1000000, force=False, store_ticks=False):
+    """
+    Process new or changed source files into bars.
+    force=True ignores the manifest and rebuilds from every source file.
+    store_ticks=True also stores the cleaned ticks (see process_single_file).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    
+    files = resolve_input_files(input_source)
     if not files:
         print(f"Warning: No input files found matching {input_source}")
         return
 
-    print(f"Processing {len(files)} files for {instrument}...")
-    for f in files:
-        process_single_file(f, output_dir, instrument, timeframes)
+    manifest = ProcessingManifest(output_dir)
+    if force:
+        manifest.reset()
+    targets = manifest_targets(timeframes, store_ticks)
+    with span('manifest'):
+        todo = [f for f in files if not manifest.is_current(f, targets)]
+    
+    print(f"Processing {len(todo)} of {len(files)} files for {instrument}...")
+    # One sink for the run: store partitions are rewritten per flush, not per source file
+    sink = BarSink(output_dir, instrument, output_format)
+    done = []
+    for f in todo:
+        with span('source'):
+            days = process_single_file(f, output_dir, instrument, timeframes, output_format, chunksize, store_ticks, sink)
+        if days is not None:
+            done.append((f, days))
+    with span('write'):
+        sink.close()
+        
+    # Sources are recorded once their bars are written
+    with span('manifest'):
+        for f, days in done:
+            manifest.record(f, targets, days)
+        manifest.save()
     print("Processing complete.")
 
 if __name__ == "__main__":
@@ -180,8 +572,22 @@ if __name__ == "__main__":
     parser.add_argument("--output", required=True, help="Output directory path")
     parser.add_argument("--instrument", required=True, help="Instrument Name (e.g. XAUUSD)")
     parser.add_argument("--timeframes", default="5min,15min,1h,4h,1D", help="Comma-separated timeframes")
+    parser.add_argument("--format", default="store", choices=["store", "csv"], help="Output layout: columnar bar store or per-day CSV export")
+    parser.add_argument("--chunksize", type=int, default=1000000, help="Ticks read per chunk (bounds peak memory)")
+    parser.add_argument("--force", action="store_true", help="Rebuild from all source files, ignoring the manifest")
+    parser.add_argument("--ticks", action="store_true", help="Also store cleaned ticks for tick-resolution exits")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage timing report and save it as JSON")
+    parser.add_argument("--cprofile", action="store_true", help="Also dump cProfile stats (with --profile)")
     
     args = parser.parse_args()
     tf_list = [t.strip() for t in args.timeframes.split(',')]
     
-    process_data(args.input, args.output, args.instrument, tf_list)
+    profile_base = os.path.join(args.output, f"profile_{args.instrument}")
+    with profiling(args.instrument, enabled=args.profile) as prof, cprofile(profile_base + ".prof" if args.profile and args.cprofile else None):
+        process_data(args.input, args.output, args.instrument, tf_list, args.format, args.chunksize, args.force, args.ticks)
+        
+    if prof is not None:
+        print("\n--- Stage Timings ---")
+        print(prof.summary().to_string())
+        prof.save(profile_base + ".json")
+        print(f"Saved profile to {profile_base}.json")
@@ -0,0 +1,190 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import shutil
+import tempfile
+import contextlib
+
+def encode_labels(values: np.ndarray):
+    """
+    int32 codes (-1 where missing) and the label list of a string/object column.
+    """
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int32), [str(u) for u in uniques]
+
+def decode_labels(codes: np.ndarray, labels: list) -> np.ndarray:
+    """
+    Object array of the labels, NaN where the code is -1.
+    """
+    return np.asarray(pd.Categorical.from_codes(codes, labels), dtype=object)
+
+class BarArrays:
+    """
+    A bar (or feature) series as flat column arrays: the timestamps as int64
+    ns UTC plus one contiguous array per column.
+
+    save() writes the arrays as .npy files and open() memory-maps them
+    read-only, so every process that opens the same directory shares one
+    physical copy through the page cache. A memory-mapped instance pickles
+    as its path and row range, so sending it to pool workers is free.
+    frame() wraps the arrays in a DataFrame without copying the numeric columns.
+    String columns are held as int32 label codes (see encode_labels), so
+    missing values survive; values() and frame() decode them.
+    """
+    INDEX = 'date'
+    SCHEMA_FILE = '_schema.json'
+
+    def __init__(self, times: np.ndarray, columns: dict, tz='UTC', labels=None):
+        self.times = times
+        self.data = columns
+        self.tz = tz
+        # {column: label list} of the label-coded columns
+        self.labels = labels or {}
+        # Set when memory-mapped from a directory: (path, lo, hi, columns)
+        self.source = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=None):
+        """
+        Column arrays of a DatetimeIndex frame. dtype (e.g. np.float32) is
+        applied to the float columns; strings are label-coded.
+        """
+        from .store import _index_to_ns
+        data = {}
+        labels = {}
+        for c in df.columns:
+            values = df[c].to_numpy()
+            if values.dtype.kind == 'f' and dtype is not None:
+                values = values.astype(dtype)
+            elif values.dtype == object:
+                values, labels[str(c)] = encode_labels(values)
+            data[str(c)] = values
+        tz = str(df.index.tz) if df.index.tz is not None else None
+        return cls(_index_to_ns(df.index), data, tz, labels)
+
+    @classmethod
+    def open(cls, path: str, mmap: bool = True, columns=None):
+        """
+        Arrays saved under path (optionally only some columns), memory-mapped
+        read-only unless mmap=False.
+        """
+        with open(os.path.join(path, cls.SCHEMA_FILE)) as f:
+            schema = json.load(f)
+        mode = 'r' if mmap else None
+        times = np.load(os.path.join(path, f"{cls.INDEX}.npy"), mmap_mode=mode)
+        data = {
+            c: np.load(os.path.join(path, f"{k}.npy"), mmap_mode=mode)
+            for k, c in enumerate(schema['columns']) if columns is None or c in columns
+        }
+        labels = {c: v for c, v in schema.get('labels', {}).items() if c in data}
+        arrays = cls(times, data, schema['tz'], labels)
+        if mmap:
+            arrays.source = (path, 0, len(times), columns)
+        return arrays
+
+    def save(self, path: str):
+        """
+        Write the arrays under path (replacing it) and return them memory-mapped.
+        """
+        # Write to a sibling directory and swap in, so readers never see a half-written series
+        tmp_dir = f"{path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, f"{self.INDEX}.npy"), np.ascontiguousarray(self.times))
+        for k, values in enumerate(self.data.values()):
+            np.save(os.path.join(tmp_dir, f"{k}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(tmp_dir, self.SCHEMA_FILE), 'w') as f:
+            json.dump({'columns': list(self.data), 'tz': self.tz, 'rows': len(self), 'labels': self.labels}, f)
+        # Readers holding maps of the old files keep them until they close
+        old_dir = f"{tmp_dir}.old"
+        if os.path.exists(path):
+            os.replace(path, old_dir)
+        os.replace(tmp_dir, path)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return BarArrays.open(path)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.data[column]
+
+    def values(self, column: str) -> np.ndarray:
+        """
+        A column's values, with label-coded columns decoded.
+        """
+        if column in self.labels:
+            return decode_labels(self.data[column], self.labels[column])
+        return self.data[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self.data
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def columns(self) -> list:
+        return list(self.data)
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(self.times.view(np.ndarray).view('datetime64[ns]'), name=self.INDEX)
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return index
+
+    def slice(self, lo: int, hi: int):
+        """
+        Rows [lo, hi) as views of the same arrays.
+        """
+        sliced = BarArrays(self.times[lo:hi], {c: v[lo:hi] for c, v in self.data.items()}, self.tz, self.labels)
+        if self.source is not None:
+            path, start, end, columns = self.source
+            lo, hi, _ = slice(lo, hi).indices(end - start)
+            sliced.source = (path, start + lo, start + max(lo, hi), columns)
+        return sliced
+
+    def between(self, start=None, end=None):
+        """
+        Bars in [start, end) by binary search on the timestamps.
+        """
+        from .store import _to_utc_timestamp
+        lo = 0 if start is None else int(np.searchsorted(self.times, _to_utc_timestamp(start).value, side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.times, _to_utc_timestamp(end).value, side='left'))
+        return self.slice(lo, hi)
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        """
+        DataFrame over the arrays. Numeric columns are not copied (memory-mapped
+        ones stay read-only); label-coded columns become pandas strings.
+        """
+        names = self.columns if columns is None else [c for c in self.columns if c in columns]
+        # Plain ndarray views, so pandas results are not memmap subclasses
+        data = {c: self.values(c) if c in self.labels else self.data[c].view(np.ndarray) for c in names}
+        return pd.DataFrame(data, index=self.index, copy=False)
+
+    def __getstate__(self):
+        if self.source is not None:
+            return {'source': self.source}
+        return self.__dict__
+
+    def __setstate__(self, state):
+        if 'source' in state and len(state) == 1:
+            path, lo, hi, columns = state['source']
+            arrays = BarArrays.open(path, columns=columns).slice(lo, hi)
+            self.__dict__.update(arrays.__dict__)
+        else:
+            self.__dict__.update(state)
+
+@contextlib.contextmanager
+def shared_frame(df: pd.DataFrame, dir: str = None):
+    """
+    Spill a frame to memory-mapped arrays in a temporary directory for the
+    duration of the block. Yields the BarArrays; pass it to pool workers
+    and call .frame() there so all of them read one copy.
+    """
+    with tempfile.TemporaryDirectory(dir=dir) as tmp:
+        yield BarArrays.from_frame(df).save(os.path.join(tmp, 'arrays'))
@@ -1,11 +1,250 @@
 import pandas as pd
 import numpy as np
+from pandas.tseries.frequencies import to_offset
+from .risk import get_risk_percentage, calculate_position_size, update_circuit_breaker
+from .arrays import BarArrays
+
+# Trade record schema (field, kind), in output column order
+TRADE_FIELDS = [
+    ('id', 'int'),
+    ('entry_time', 'time'),
+    ('signal', 'category'),
+    ('tier_type', 'category'),
+    ('tier_score', 'int'),
+    ('score_htf', 'int'),
+    ('score_disp', 'int'),
+    ('score_liq', 'int'),
+    ('score_context', 'int'),
+    ('entry_price', 'float'), # Actual fill
+    ('planned_entry', 'float'), # Signal price
+    ('stop_loss', 'float'),
+    ('take_profit', 'float'),
+    ('risk_units', 'float'),
+    ('htf_bias', 'category'),
+    ('atr', 'float'),
+    ('status', 'category'),
+    ('slippage_entry', 'float'),
+    ('spread_cost_unit', 'float'),
+    ('exit_time', 'time'),
+    ('exit_price', 'float'),
+    ('result', 'category'),
+    ('slippage_exit', 'float'),
+    ('pnl', 'float'),
+    ('slippage_cost', 'float'),
+    ('circuit_breaker', 'int') # 1 if sized with the drawdown breaker active
+]
+
+_STORAGE = {'int': np.int64, 'float': np.float64, 'time': np.int64, 'category': np.int16}
+_EMPTY = {'int': 0, 'float': np.nan, 'time': pd.NaT.value, 'category': -1}
+
+class TradeBook:
+    """
+    Preallocated columnar trade store.
+    Each field is a typed NumPy array: 'time' fields hold int64 ns, 'category'
+    fields hold int16 codes into a per-field label list. to_frame() wraps the
+    filled prefix of the arrays without copying the numeric columns.
+    """
+    def __init__(self, capacity: int = 1024, fields=TRADE_FIELDS):
+        self.fields = fields
+        self.kinds = dict(fields)
+        self._size = 0
+        self._cols = {name: np.empty(max(capacity, 1), dtype=_STORAGE[kind]) for name, kind in fields}
+        self._labels = {name: [] for name, kind in fields if kind == 'category'}
+        self._codes = {name: {} for name, kind in fields if kind == 'category'}
+        self._tz = None
+        self._datetime = True
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        for name, arr in self._cols.items():
+            grown = np.empty(2 * len(arr), dtype=arr.dtype)
+            grown[:self._size] = arr[:self._size]
+            self._cols[name] = grown
+
+    def _encode(self, name, value):
+        kind = self.kinds[name]
+        if kind == 'category':
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                return -1
+            codes = self._codes[name]
+            if value not in codes:
+                codes[value] = len(self._labels[name])
+                self._labels[name].append(value)
+            return codes[value]
+        if kind == 'time':
+            if value is None or value is pd.NaT:
+                return pd.NaT.value
+            if isinstance(value, (pd.Timestamp, np.datetime64)):
+                ts = pd.Timestamp(value)
+                if ts.tzinfo is not None:
+                    self._tz = ts.tzinfo
+                return ts.as_unit('ns').value
+            # Non-datetime index (e.g. positional)
+            self._datetime = False
+            return int(value)
+        return value
+
+    def _decode(self, name, stored):
+        kind = self.kinds[name]
+        if kind == 'category':
+            return self._labels[name][stored] if stored >= 0 else None
+        if kind == 'time':
+            if not self._datetime:
+                return int(stored)
+            if stored == pd.NaT.value:
+                return pd.NaT
+            ts = pd.Timestamp(int(stored))
+            return ts.tz_localize('UTC').tz_convert(self._tz) if self._tz is not None else ts
+        return stored.item()
+
+    def append(self, record: dict) -> int:
+        """
+        Append a trade; fields not in record are left empty (NaN/NaT/0).
+        Returns the row number.
+        """
+        if self._size == len(self._cols['id']):
+            self._grow()
+        row = self._size
+        for name, kind in self.fields:
+            self._cols[name][row] = self._encode(name, record[name]) if name in record else _EMPTY[kind]
+        self._size += 1
+        return row
+
+    def append_from(self, other, row: int) -> int:
+        """
+        Copy one row of another book.
+        """
+        if self._size == len(self._cols['id']):
+            self._grow()
+        new_row = self._size
+        for name, kind in self.fields:
+            stored = other._cols[name][row]
+            if kind == 'category':
+                stored = self._encode(name, other._decode(name, stored))
+            self._cols[name][new_row] = stored
+        if other._tz is not None:
+            self._tz = other._tz
+        self._datetime = self._datetime and other._datetime
+        self._size += 1
+        return new_row
+
+    def get(self, row: int, name: str):
+        return self._decode(name, self._cols[name][row])
+
+    def set(self, row: int, name: str, value):
+        self._cols[name][row] = self._encode(name, value)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Raw storage of a field (view of the filled rows).
+        """
+        return self._cols[name][:self._size]
+
+    def remove(self, rows):
+        """
+        Drop rows, keeping the order of the remaining ones.
+        """
+        keep = np.ones(self._size, dtype=bool)
+        keep[list(rows)] = False
+        n = int(keep.sum())
+        for name, arr in self._cols.items():
+            arr[:n] = arr[:self._size][keep]
+        self._size = n
+
+    def record(self, row: int) -> dict:
+        return {name: self.get(row, name) for name, kind in self.fields}
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        One row per trade, columns in TRADE_FIELDS order. Category codes stay
+        internal: those fields come back as object columns (None where unset),
+        like the per-trade dicts. circuit_breaker is 1 for trades sized while
+        the drawdown breaker was active.
+        """
+        if self._size == 0:
+            return pd.DataFrame()
+        data = {}
+        for name, kind in self.fields:
+            arr = self.column(name)
+            if kind == 'category':
+                # Code -1 picks the trailing None
+                labels = np.array(self._labels[name] + [None], dtype=object)
+                data[name] = pd.Series(labels[arr], dtype=object, copy=False)
+            elif kind == 'time' and self._datetime:
+                times = pd.DatetimeIndex(arr.view('datetime64[ns]'))
+                data[name] = times.tz_localize('UTC').tz_convert(self._tz) if self._tz is not None else times
+            else:
+                data[name] = arr
+        return pd.DataFrame(data, copy=False)
+
+class TickExitResolver:
+    """
+    Decides which of SL and TP was hit first inside a bar where both were
+    touched, by replaying that bar's ticks from a TickStore.
+    Only the ambiguous bars' ticks are read (see TickStore.locate/window).
+    """
+    def __init__(self, store, instrument: str, timeframe: str):
+        self.store = store
+        self.instrument = instrument
+        self.bar_length = pd.Timedelta(to_offset(timeframe))
+
+    def sl_first(self, bar_times, longs, stop_losses, take_profits) -> np.ndarray:
+        """
+        True where the stop was reached first (or the bar has no ticks,
+        keeping the conservative SL-first assumption).
+        Long: SL on Bid <= stop, TP on Bid >= target.
+        Short: SL on Ask >= stop, TP on Ask <= target.
+        """
+        result = np.ones(len(bar_times), dtype=bool)
+        if len(bar_times) == 0:
+            return result
+        keys, lo, hi = self.store.locate(self.instrument, bar_times, self.bar_length)
+        
+        for i in range(len(result)):
+            if lo[i] >= hi[i]:
+                continue
+            if longs[i]:
+                prices = self.store.window(self.instrument, keys[i], lo[i], hi[i], ['Bid'])['Bid']
+                sl = np.flatnonzero(prices <= stop_losses[i])
+                tp = np.flatnonzero(prices >= take_profits[i])
+            else:
+                prices = self.store.window(self.instrument, keys[i], lo[i], hi[i], ['Ask'])['Ask']
+                sl = np.flatnonzero(prices >= stop_losses[i])
+                tp = np.flatnonzero(prices <= take_profits[i])
+            if len(tp) and (not len(sl) or tp[0] < sl[0]):
+                result[i] = False
+        return result
 
 class TradeManager:
-    def __init__(self):
-        self.active_trades = []
-        self.closed_trades = []
+    def __init__(self, capacity: int = 1024, tick_resolver=None, initial_equity=None):
+        self.open = TradeBook(capacity=64)
+        self.closed = TradeBook(capacity=capacity)
         self.trade_id_counter = 0
+        # Optional TickExitResolver for bars touching both SL and TP
+        self.tick_resolver = tick_resolver
+        # Equity-aware sizing: with initial_equity set, units are computed at
+        # fill time from running equity and the drawdown circuit breaker,
+        # instead of taken from the signal's Risk_Units
+        self.initial_equity = initial_equity
+        self.equity = initial_equity
+        self.high_watermark = initial_equity
+        self.circuit_breaker = False
+
+    @property
+    def active_trades(self):
+        """
+        Open trades as dicts (inspection only).
+        """
+        return [self.open.record(i) for i in range(len(self.open))]
+
+    @property
+    def closed_trades(self):
+        """
+        Closed trades as dicts (inspection only).
+        """
+        return [self.closed.record(i) for i in range(len(self.closed))]
 
     def calculate_slippage(self, atr, min_tick=0.00001):
         # ILS 16.6: Slippage = max(0.1 * ATR_1m, min_tick)
@@ -17,6 +256,23 @@ class TradeManager:
         Open a new trade based on signal.
         Applies Spread and Slippage to Entry Price.
         """
+        row = self._open_trade(signal_row)
+        if self.initial_equity is not None:
+            self._size_trade(row)
+        return row
+
+    def _size_trade(self, row):
+        """
+        Units from current equity at fill time (ILS 12): tier risk, halved
+        while the circuit breaker is active.
+        """
+        book = self.open
+        risk_pct = get_risk_percentage(int(book._cols['tier_score'][row]), self.circuit_breaker)
+        dist = abs(book._cols['planned_entry'][row] - book._cols['stop_loss'][row])
+        book._cols['risk_units'][row] = calculate_position_size(self.equity, risk_pct, dist)
+        book._cols['circuit_breaker'][row] = int(self.circuit_breaker)
+
+    def _open_trade(self, signal_row):
         self.trade_id_counter += 1
         
         # Determine Execution Price (Bid/Ask)
@@ -72,96 +328,211 @@ class TradeManager:
             'slippage_entry': slippage,
             'spread_cost_unit': spread_cost_per_unit
         }
-        self.active_trades.append(trade)
+        return self.open.append(trade)
 
     def update(self, bar_row):
         """
         Update active trades based on current bar (OHLC).
         Check for SL/TP hits.
         """
-        # Iterate backwards to remove safely
-        for i in range(len(self.active_trades) - 1, -1, -1):
-            trade = self.active_trades[i]
-            
-            if bar_row.name <= trade['entry_time']:
+        # If Bid/Ask avail
+        mid_low = bar_row['Low']
+        mid_high = bar_row['High']
+        bid_low = bar_row.get('Bid_Low', mid_low)
+        bid_high = bar_row.get('Bid_High', mid_high)
+        ask_low = bar_row.get('Ask_Low', mid_low)
+        ask_high = bar_row.get('Ask_High', mid_high)
+        bar_time = self.open._encode('entry_time', bar_row.name)
+        
+        closed_rows = []
+        # Most recent trades first, matching the close order of the dict-based loop
+        for i in range(len(self.open) - 1, -1, -1):
+            if bar_time <= self.open._cols['entry_time'][i]:
                 continue
                 
-            # Prices for validation
+            stop_loss = self.open._cols['stop_loss'][i]
+            take_profit = self.open._cols['take_profit'][i]
+            
             # SL triggers on Bid (Long) / Ask (Short)
             # TP triggers on Bid (Long) / Ask (Short) usually
-            
-            # If Bid/Ask avail
-            mid_low = bar_row['Low']
-            mid_high = bar_row['High']
-            bid_low = bar_row.get('Bid_Low', mid_low)
-            bid_high = bar_row.get('Bid_High', mid_high)
-            ask_low = bar_row.get('Ask_Low', mid_low)
-            ask_high = bar_row.get('Ask_High', mid_high)
-            atr = bar_row.get('ATR', trade['atr'])
-            
             sl_hit = False
             tp_hit = False
-            exit_price = 0.0
-            slippage = 0.0
             
-            if trade['signal'] == 'Long':
+            long = self.open.get(i, 'signal') == 'Long'
+            if long:
                 # SL Trigger: If Bid drops to SL
                 # Conservative: check Low of Bid
-                if bid_low <= trade['stop_loss']:
+                if bid_low <= stop_loss:
                     sl_hit = True
-                    # Filled at SL minus Slippage (Market Order)
-                    slippage = self.calculate_slippage(atr)
-                    exit_price = trade['stop_loss'] - slippage
-                    
                 # TP Trigger: If Bid rises to TP
-                elif bid_high >= trade['take_profit']:
+                if bid_high >= take_profit:
                     tp_hit = True
-                    # Filled at TP (Limit Order - No Slippage usually, positive slippage ignored in v1)
-                    exit_price = trade['take_profit']
                     
             else: # Short
                 # SL Trigger: If Ask rises to SL
-                if ask_high >= trade['stop_loss']:
+                if ask_high >= stop_loss:
                     sl_hit = True
-                    slippage = self.calculate_slippage(atr)
-                    exit_price = trade['stop_loss'] + slippage
-                    
                 # TP Trigger: If Ask drops to TP
-                elif ask_low <= trade['take_profit']:
+                if ask_low <= take_profit:
                     tp_hit = True
-                    exit_price = trade['take_profit']
+                    
+            # Both levels inside one bar: SL first unless the ticks say otherwise
+            if sl_hit and tp_hit and self.tick_resolver is not None:
+                sl_hit = bool(self.tick_resolver.sl_first([bar_row.name], [long], [stop_loss], [take_profit])[0])
             
             if sl_hit or tp_hit:
-                trade['exit_time'] = bar_row.name
-                trade['exit_price'] = exit_price
-                trade['result'] = 'Win' if tp_hit else 'Loss'
-                trade['status'] = 'Closed'
-                trade['slippage_exit'] = slippage
-                
-                # Calculate PnL
-                units = trade['risk_units']
-                if trade['signal'] == 'Long':
-                    gross_pnl = (exit_price - trade['entry_price']) * units
-                else:
-                    gross_pnl = (trade['entry_price'] - exit_price) * units
+                atr = bar_row.get('ATR', self.open._cols['atr'][i])
+                self._close_trade(i, bar_row.name, sl_hit, atr)
+                closed_rows.append(i)
                 
-                # Costs
-                # Spread Cost: (Ask-Bid) * Units -> approximated by entry spread + exit spread?
-                # Actually PnL calc using Exec prices (Ask entry, Bid exit) ALREADY includes spread cost!
-                # So we don't deduct it again from PnL, but we can track it.
-                # Slippage Cost: Already in exit_price/entry_price.
-                # We track the components for reporting.
-                
-                total_slippage = (trade['slippage_entry'] + slippage) * units
-                # Spread captured in price
+        if closed_rows:
+            self.open.remove(closed_rows)
+
+    def simulate(self, results: pd.DataFrame, min_tick=0.00001):
+        """
+        Batch equivalent of feeding every bar through update() and add_trade().
+        Each signal's exit is the first later bar where the stop or target is
+        crossed, found by a forward search over the bid/ask arrays, so the
+        cost grows with the number of trades rather than bars x trades.
+        Closed trades are appended in the same order as the per-bar loop.
+        With equity-aware sizing, entries and exits are then replayed in one
+        merged per-trade loop so each entry is sized from the equity at its bar.
+        results may be a BarArrays (e.g. memory-mapped scored bars).
+        """
+        if isinstance(results, BarArrays):
+            results = results.frame()
+        n = len(results)
+        index = results.index
+        mid_low = results['Low'].to_numpy(dtype=float)
+        mid_high = results['High'].to_numpy(dtype=float)
+        bid_low = results['Bid_Low'].to_numpy(dtype=float) if 'Bid_Low' in results.columns else mid_low
+        bid_high = results['Bid_High'].to_numpy(dtype=float) if 'Bid_High' in results.columns else mid_high
+        ask_low = results['Ask_Low'].to_numpy(dtype=float) if 'Ask_Low' in results.columns else mid_low
+        ask_high = results['Ask_High'].to_numpy(dtype=float) if 'Ask_High' in results.columns else mid_high
+        bar_atr = results['ATR'].to_numpy(dtype=float) if 'ATR' in results.columns else None
+        
+        signal_pos = np.flatnonzero(results['Signal'].notna().to_numpy())
+        entries = []
+        exits = []
+        
+        for pos in signal_pos:
+            row = self._open_trade(results.iloc[pos])
+            entries.append((pos, 1, row, False, False))
+            stop_loss = self.open._cols['stop_loss'][row]
+            take_profit = self.open._cols['take_profit'][row]
+            
+            if self.open.get(row, 'signal') == 'Long':
+                # SL on Bid Low, TP on Bid High
+                exit_pos, sl_hit, tp_hit = _first_exit(pos + 1, bid_low, bid_high, stop_loss, take_profit, long=True)
+            else:
+                # SL on Ask High, TP on Ask Low
+                exit_pos, sl_hit, tp_hit = _first_exit(pos + 1, ask_high, ask_low, stop_loss, take_profit, long=False)
                 
-                trade['pnl'] = gross_pnl
-                trade['slippage_cost'] = total_slippage
+            if exit_pos < n:
+                exits.append((exit_pos, 0, -row, sl_hit, tp_hit))
                 
-                self.closed_trades.append(trade)
-                self.active_trades.pop(i)
+        if self.tick_resolver is not None:
+            exits = self._resolve_ambiguous(exits, index)
+            
+        # Per-bar loop closes by bar, and within a bar the most recent trade first.
+        # Exits of a bar settle before that bar's entry is sized.
+        events = exits + entries if self.initial_equity is not None else list(exits)
+        events.sort()
+        for exit_pos, kind, neg_row, sl_hit, tp_hit in events:
+            if kind == 1:
+                self._size_trade(neg_row)
+                continue
+            row = -neg_row
+            atr = bar_atr[exit_pos] if bar_atr is not None else self.open._cols['atr'][row]
+            self._close_trade(row, index[exit_pos], sl_hit, atr, min_tick)
+        self.open.remove([-e[2] for e in exits])
+            
+    def _resolve_ambiguous(self, exits, index):
+        """
+        Re-decide SL vs TP from ticks for exits where both were touched, in one batch.
+        """
+        ambiguous = [k for k, e in enumerate(exits) if e[3] and e[4]]
+        if not ambiguous:
+            return exits
+        rows = [-exits[k][2] for k in ambiguous]
+        sl_first = self.tick_resolver.sl_first(
+            index[[exits[k][0] for k in ambiguous]],
+            [self.open.get(row, 'signal') == 'Long' for row in rows],
+            self.open._cols['stop_loss'][rows],
+            self.open._cols['take_profit'][rows]
+        )
+        exits = list(exits)
+        for k, first in zip(ambiguous, sl_first):
+            exit_pos, kind, neg_row, sl_hit, tp_hit = exits[k]
+            exits[k] = (exit_pos, kind, neg_row, bool(first), tp_hit)
+        return exits
+
+    def _close_trade(self, row, exit_time, sl_hit, atr, min_tick=0.00001):
+        """
+        Fill the exit of an open trade and move it to the closed book.
+        """
+        book = self.open
+        stop_loss = book._cols['stop_loss'][row]
+        long = book.get(row, 'signal') == 'Long'
+        
+        slippage = 0.0
+        if sl_hit:
+            # Filled at SL with adverse Slippage (Market Order)
+            slippage = self.calculate_slippage(atr, min_tick)
+            exit_price = stop_loss - slippage if long else stop_loss + slippage
+        else:
+            # Filled at TP (Limit Order - No Slippage usually, positive slippage ignored in v1)
+            exit_price = book._cols['take_profit'][row]
+            
+        units = book._cols['risk_units'][row]
+        entry_price = book._cols['entry_price'][row]
+        if long:
+            gross_pnl = (exit_price - entry_price) * units
+        else:
+            gross_pnl = (entry_price - exit_price) * units
+            
+        # Costs
+        # PnL calc using Exec prices (Ask entry, Bid exit) already includes spread cost,
+        # slippage is already in exit_price/entry_price. We track the components for reporting.
+        book.set(row, 'exit_time', exit_time)
+        book._cols['exit_price'][row] = exit_price
+        book.set(row, 'result', 'Loss' if sl_hit else 'Win')
+        book.set(row, 'status', 'Closed')
+        book._cols['slippage_exit'][row] = slippage
+        book._cols['pnl'][row] = gross_pnl
+        book._cols['slippage_cost'][row] = (book._cols['slippage_entry'][row] + slippage) * units
+        
+        if self.initial_equity is not None:
+            self.equity += gross_pnl
+            self.circuit_breaker = update_circuit_breaker(self.equity, self.high_watermark, self.circuit_breaker)
+            self.high_watermark = max(self.high_watermark, self.equity)
+        
+        self.closed.append_from(book, row)
 
     def get_results_df(self):
-        if not self.closed_trades:
-            return pd.DataFrame()
-        return pd.DataFrame(self.closed_trades)
+        return self.closed.to_frame()
+
+def _first_exit(start, sl_side, tp_side, stop_loss, take_profit, long=True, window=64):
+    """
+    First bar at or after start where the stop or target is touched.
+    Searches forward in doubling windows. Returns (position, sl_hit, tp_hit);
+    position == len(sl_side) if neither level is reached.
+    SL takes precedence when both are touched in the same bar (both flags set).
+    """
+    n = len(sl_side)
+    lo = start
+    while lo < n:
+        hi = min(n, lo + window)
+        if long:
+            sl = sl_side[lo:hi] <= stop_loss
+            tp = tp_side[lo:hi] >= take_profit
+        else:
+            sl = sl_side[lo:hi] >= stop_loss
+            tp = tp_side[lo:hi] <= take_profit
+        hit = np.flatnonzero(sl | tp)
+        if len(hit):
+            k = hit[0]
+            return lo + k, bool(sl[k]), bool(tp[k])
+        lo = hi
+        window *= 2
+    return n, False, False
@@ -0,0 +1,174 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import time
+import shutil
+import hashlib
+from dataclasses import asdict
+from .strategy import DEFAULT_PARAMS, FEATURE_FIELDS
+from .store import _index_to_ns
+from .arrays import BarArrays
+
+# Source files whose code shapes the feature columns; editing any of them
+# changes the code version and so invalidates every cached entry.
+FEATURE_SOURCES = ['indicators.py', 'smc.py', 'strategy.py']
+
+_code_version = None
+
+def code_version() -> str:
+    """
+    Hash of the feature source files (computed once per process).
+    """
+    global _code_version
+    if _code_version is None:
+        h = hashlib.blake2b(digest_size=8)
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in FEATURE_SOURCES:
+            with open(os.path.join(here, name), 'rb') as f:
+                h.update(f.read())
+        _code_version = h.hexdigest()
+    return _code_version
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Content hash of a bar frame (or BarArrays): timestamps, column names and values.
+    """
+    if isinstance(df, BarArrays):
+        df = df.frame()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_index_to_ns(df.index).tobytes() if isinstance(df.index, pd.DatetimeIndex) else pd.util.hash_pandas_object(df.index).to_numpy().tobytes())
+    for c in df.columns:
+        h.update(str(c).encode())
+        values = df[c].to_numpy()
+        if values.dtype.kind in 'biuf':
+            h.update(np.ascontiguousarray(values).tobytes())
+        else:
+            h.update(pd.util.hash_pandas_object(df[c], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+class FeatureCache:
+    """
+    On-disk cache of prepare_features() frames.
+
+    Layout: {root}/{key}/{column}.npy, one typed array per column as in the
+    bar store, plus the timestamps ('date', int64 ns) and _schema.json.
+    The key hashes instrument, timeframe, date range, the bars' content,
+    the feature parameters and the feature code version, so any change to
+    one of them misses. An entry's directory mtime is its last use; once
+    the cache is over max_bytes the least recently used entries are deleted.
+    """
+    INDEX = 'date'
+    SCHEMA_FILE = '_schema.json'
+
+    def __init__(self, root: str, max_bytes: int = 2 * 2**30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, instrument: str, timeframe: str, start_date, end_date, bars: pd.DataFrame, params=DEFAULT_PARAMS) -> str:
+        feature_params = {f: asdict(params)[f] for f in FEATURE_FIELDS}
+        parts = [instrument, timeframe, str(start_date), str(end_date), frame_fingerprint(bars), json.dumps(feature_params, sort_keys=True), code_version()]
+        return hashlib.blake2b('|'.join(parts).encode(), digest_size=16).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def get(self, key: str):
+        """
+        Cached feature frame for key, or None. A hit marks the entry as recently used.
+        """
+        entry_dir = self._entry_dir(key)
+        schema_path = os.path.join(entry_dir, self.SCHEMA_FILE)
+        if not os.path.exists(schema_path):
+            self.misses += 1
+            return None
+        try:
+            with open(schema_path) as f:
+                schema = json.load(f)
+            index = pd.DatetimeIndex(np.load(os.path.join(entry_dir, f"{self.INDEX}.npy")).view('datetime64[ns]'), name=schema['index_name'])
+            if schema['tz'] is not None:
+                index = index.tz_localize('UTC').tz_convert(schema['tz'])
+            index = index.as_unit(schema['unit'])
+            data = {c: np.load(os.path.join(entry_dir, f"{k}.npy")) for k, c in enumerate(schema['columns'])}
+            df = pd.DataFrame(data, index=index)
+        except (OSError, ValueError, KeyError):
+            # Evicted or replaced by another process mid-read
+            self.misses += 1
+            return None
+        os.utime(entry_dir)
+        self.hits += 1
+        return df
+
+    def put(self, key: str, features: pd.DataFrame):
+        """
+        Store a feature frame, then evict least recently used entries over max_bytes.
+        """
+        entry_dir = self._entry_dir(key)
+        # Write to a sibling directory and swap in, so readers never see a half-written entry
+        tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        index = features.index
+        np.save(os.path.join(tmp_dir, f"{self.INDEX}.npy"), _index_to_ns(index))
+        size = 0
+        for k, c in enumerate(features.columns):
+            values = features[c].to_numpy()
+            if values.dtype == object or values.dtype.kind not in 'biufU':
+                values = values.astype(str)
+            np.save(os.path.join(tmp_dir, f"{k}.npy"), values)
+            size += values.nbytes
+        size += 8 * len(index)
+        with open(os.path.join(tmp_dir, self.SCHEMA_FILE), 'w') as f:
+            json.dump({
+                'columns': [str(c) for c in features.columns],
+                'index_name': index.name,
+                'tz': str(index.tz) if index.tz is not None else None,
+                'unit': index.unit,
+                'bytes': size,
+                'created': time.time()
+            }, f)
+
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Another process stored the same key first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict(keep=key)
+
+    def entries(self) -> list:
+        """
+        (last used, bytes, key) of every complete entry, oldest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for name in os.listdir(self.root):
+            entry_dir = self._entry_dir(name)
+            try:
+                with open(os.path.join(entry_dir, self.SCHEMA_FILE)) as f:
+                    size = json.load(f)['bytes']
+                entries.append((os.path.getmtime(entry_dir), size, name))
+            except (OSError, ValueError, KeyError):
+                continue
+        return sorted(entries)
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep: str = None):
+        """
+        Delete least recently used entries until the cache fits max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(self._entry_dir(name), ignore_errors=True)
+            total -= size
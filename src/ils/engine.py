@@ -0,0 +1,530 @@
+import pandas as pd
+import numpy as np
+import datetime
+from pandas.tseries.frequencies import to_offset
+from .strategy import DEFAULT_PARAMS, killzone_flags
+from .indicators import StreamingIndicators, StreamingSwings
+from .smc import MAX_SWING_LOOKBACK, MAX_ORIGIN_LOOKBACK
+from .zones import OrderBlockZones
+from .risk import get_risk_percentage, calculate_position_size, update_circuit_breaker
+from .backtest import TradeManager
+from .store import TickStore, _index_to_ns, _to_utc_timestamp
+
+# Event-driven backtest (ILS 17.2):
+# Data Replayer -> Bar Aggregator -> Strategy Engine -> Risk Engine
+# -> Execution Simulator -> Portfolio Tracker.
+# Ticks travel as NumPy batches (int64 ns times, bid, ask); Python only
+# loops once per bar, never per tick.
+
+BAR_COLUMNS = [
+    'Open', 'High', 'Low', 'Close', 'Tick_Count', 'Spread_Avg',
+    'Bid_Open', 'Bid_High', 'Bid_Low', 'Bid_Close',
+    'Ask_Open', 'Ask_High', 'Ask_Low', 'Ask_Close'
+]
+
+def _period_ns(timeframe: str) -> int:
+    """
+    Bar length in ns. Only timeframes that tile a UTC day are supported,
+    so bars never span a day boundary (Rule 16.5).
+    """
+    offset = to_offset(timeframe)
+    period = pd.Timedelta(offset) if isinstance(offset, (pd.offsets.Tick, pd.offsets.Day)) else None
+    if period is None or period <= pd.Timedelta(0) or pd.Timedelta(days=1) % period != pd.Timedelta(0):
+        raise ValueError(f"Timeframe {timeframe} does not tile a UTC day")
+    return period.value
+
+class TickReplayer:
+    """
+    Data Replayer: feeds ticks in chronological batches and owns the
+    simulated clock (time of the last tick handed out).
+    """
+    def __init__(self, batches):
+        self._batches = batches
+        self.clock = None
+        self.ticks = 0
+
+    @classmethod
+    def from_arrays(cls, times, bid, ask, batch_size: int = 100000):
+        times = np.asarray(times)
+        if times.dtype != np.int64:
+            times = _index_to_ns(pd.DatetimeIndex(times))
+        bid = np.asarray(bid, dtype=float)
+        ask = np.asarray(ask, dtype=float)
+        def batches():
+            for lo in range(0, len(times), batch_size):
+                yield times[lo:lo + batch_size], bid[lo:lo + batch_size], ask[lo:lo + batch_size]
+        return cls(batches())
+
+    @classmethod
+    def from_frame(cls, ticks: pd.DataFrame, batch_size: int = 100000):
+        """
+        Cleaned ticks (bidPrice/askPrice) or stored ticks (Bid/Ask).
+        """
+        bid = ticks['bidPrice'] if 'bidPrice' in ticks.columns else ticks['Bid']
+        ask = ticks['askPrice'] if 'askPrice' in ticks.columns else ticks['Ask']
+        return cls.from_arrays(_index_to_ns(ticks.index), bid.to_numpy(), ask.to_numpy(), batch_size)
+
+    @classmethod
+    def from_store(cls, store: TickStore, instrument: str, start_date=None, end_date=None, batch_size: int = 100000):
+        """
+        Replay a TickStore one day partition at a time.
+        """
+        first_key = store._partition_keys(pd.DatetimeIndex([_to_utc_timestamp(start_date)]))[0] if start_date is not None else None
+        last_key = store._partition_keys(pd.DatetimeIndex([_to_utc_timestamp(end_date)]))[0] if end_date is not None else None
+        
+        def batches():
+            for key in store.partitions(instrument, store.TIMEFRAME):
+                if first_key is not None and key < first_key:
+                    continue
+                if last_key is not None and key > last_key:
+                    continue
+                part_dir = store._partition_dir(instrument, store.TIMEFRAME, key)
+                times = store._load_index(part_dir)
+                cols = store.window(instrument, key, 0, len(times))
+                for lo in range(0, len(times), batch_size):
+                    hi = lo + batch_size
+                    yield np.array(times[lo:hi]), cols['Bid'][lo:hi], cols['Ask'][lo:hi]
+        return cls(batches())
+
+    def __iter__(self):
+        for times, bid, ask in self._batches:
+            if len(times) == 0:
+                continue
+            self.ticks += len(times)
+            yield times, bid, ask
+            self.clock = int(times[-1])
+
+class BarAggregator:
+    """
+    Bar Aggregator: folds ticks into the current bar and emits it once a
+    tick of a later period arrives. Prices match process_data: Mid OHLC,
+    Bid/Ask OHLC, tick count and average spread.
+    """
+    def __init__(self, timeframe: str):
+        self.timeframe = timeframe
+        self.period = _period_ns(timeframe)
+        self.bar_id = None
+        self._state = None
+
+    def update(self, bar_id: int, bid: np.ndarray, ask: np.ndarray):
+        """
+        Add ticks that all fall into bar period bar_id. The previous bar
+        must have been taken with complete() first.
+        """
+        mid = (bid + ask) / 2.0
+        spread = float(np.sum(ask - bid))
+        if self._state is None:
+            self.bar_id = bar_id
+            self._state = [
+                mid[0], mid.max(), mid.min(), mid[-1], len(mid), spread,
+                bid[0], bid.max(), bid.min(), bid[-1],
+                ask[0], ask.max(), ask.min(), ask[-1]
+            ]
+        else:
+            s = self._state
+            s[1] = max(s[1], mid.max()); s[2] = min(s[2], mid.min()); s[3] = mid[-1]
+            s[4] += len(mid); s[5] += spread
+            s[7] = max(s[7], bid.max()); s[8] = min(s[8], bid.min()); s[9] = bid[-1]
+            s[11] = max(s[11], ask.max()); s[12] = min(s[12], ask.min()); s[13] = ask[-1]
+
+    def complete(self):
+        """
+        Emit the current bar as (time_ns, values) and reset, or None.
+        """
+        if self._state is None:
+            return None
+        values = list(self._state)
+        values[5] = values[5] / values[4]
+        bar = (self.bar_id * self.period, values)
+        self.bar_id = None
+        self._state = None
+        return bar
+
+class StrategyEngine:
+    """
+    Strategy Engine: run_strategy one completed bar at a time.
+
+    Every feature run_strategy derives is carried forward instead of being
+    recomputed: ATR, CHOP and ADX from StreamingIndicators, the fractal
+    swing levels behind sweeps and order blocks, the bar of the last sweep,
+    and the live order blocks in persistent OrderBlockZones. Each bar costs
+    O(1) (amortized for the zones) and its signal equals the last row of
+    run_strategy over all bars completed so far.
+    An order block is only known once the FVG that confirms it has printed;
+    it is then checked against the closes since its origin candle and kept
+    until mitigated. (run_strategy over a longer history also counts blocks
+    confirmed up to MAX_ORIGIN_LOOKBACK bars later towards Near_POI.)
+    Only the newest `window` bars are kept, enough for the order block search.
+    """
+    WARMUP = 100
+    SWEEP_SWING_LOOKBACK = 5
+
+    def __init__(self, window: int = 300, bias_map=None, params=DEFAULT_PARAMS):
+        if window <= MAX_ORIGIN_LOOKBACK:
+            raise ValueError(f"window must exceed the order block origin lookback ({MAX_ORIGIN_LOOKBACK} bars)")
+        self.window = window
+        self.bias_map = bias_map or {}
+        self.params = params
+        self._times = np.empty(2 * window, dtype=np.int64)
+        self._values = np.empty((2 * window, len(BAR_COLUMNS)))
+        self._size = 0
+        self._bars = 0
+        
+        # Indicators plus the 2-bar fractal swings order blocks break
+        self._indicators = StreamingIndicators(swing_lookback=2)
+        self._sweep_swings = StreamingSwings(self.SWEEP_SWING_LOOKBACK)
+        # (bar, price) of the last confirmed 2-bar swing high / low
+        self._swing_high = (-1, np.nan)
+        self._swing_low = (-1, np.nan)
+        # Levels of the last confirmed 5-bar swings, tested by sweeps
+        self._sweep_high = np.nan
+        self._sweep_low = np.nan
+        self._last_sweep_bull = -np.inf
+        self._last_sweep_bear = -np.inf
+        # Origin bar of the last order block per side (an origin counts once)
+        self._last_ob_bull = -1
+        self._last_ob_bear = -1
+        self._bull_zones = OrderBlockZones(bullish=True)
+        self._bear_zones = OrderBlockZones(bullish=False)
+
+    def _append(self, time_ns, values):
+        if self._size == len(self._times):
+            # Keep the newest window - 1 bars
+            keep = self.window - 1
+            self._times[:keep] = self._times[self._size - keep:self._size]
+            self._values[:keep] = self._values[self._size - keep:self._size]
+            self._size = keep
+        self._times[self._size] = time_ns
+        self._values[self._size] = values
+        self._size += 1
+
+    def _bar(self, bar: int) -> np.ndarray:
+        """
+        Open, High, Low, Close of an absolute bar number (NaN before the first bar).
+        """
+        back = self._bars - bar
+        if bar < 0 or back >= self._size:
+            return np.full(4, np.nan)
+        return self._values[self._size - 1 - back, :4]
+
+    def _order_block(self, i: int, bullish: bool):
+        """
+        Origin bar of the order block confirmed by an FVG on bar i, or None
+        (see detect_order_blocks): the FVG's close must break the last swing
+        formed before its move, and the origin is the last opposite candle.
+        """
+        swing, level = self._swing_high if bullish else self._swing_low
+        if swing <= max(0, i - MAX_SWING_LOOKBACK):
+            return None
+        close = self._bar(i)[3]
+        if not (close > level if bullish else close < level):
+            return None
+        for j in range(i - 2, max(0, i - MAX_ORIGIN_LOOKBACK), -1):
+            open_, _, _, close = self._bar(j)
+            if (close < open_) if bullish else (close > open_):
+                return j
+        return None
+
+    def _add_zone(self, origin: int, i: int, bullish: bool):
+        """
+        Start tracking an order block found on bar i, unless a close since
+        its origin already mitigated it (zones are tracked from the warmup on).
+        """
+        if origin < self.WARMUP:
+            return
+        _, high, low, _ = self._bar(origin)
+        closes = np.array([self._bar(j)[3] for j in range(origin, i)])
+        if bullish:
+            if np.all(closes >= low):
+                self._bull_zones.add(high, low)
+        elif np.all(closes <= high):
+            self._bear_zones.add(high, low)
+
+    def _bias(self, time: pd.Timestamp) -> str:
+        # Bias for Day T is determined by Day T-1 (Previous Day)
+        return self.bias_map.get(time.date() - datetime.timedelta(days=1), 'Neutral')
+
+    def on_bar(self, time_ns: int, values, equity: float):
+        """
+        Feed one completed bar. Returns the signal row (pd.Series) or None.
+        """
+        self._append(time_ns, values)
+        i = self._bars
+        p = self.params
+        open_, high, low, close = self._bar(i)
+        
+        ind = self._indicators.update(high, low, close)
+        atr, chop, adx = ind['ATR'], ind['Chop'], ind['ADX']
+        
+        # FVG on the last three bars
+        _, high_2, low_2, _ = self._bar(i - 2)
+        open_1, _, _, close_1 = self._bar(i - 1)
+        gap_bull = low - high_2
+        gap_bear = low_2 - high
+        fvg_bull = bool(gap_bull > 0 and close_1 > open_1 and gap_bull >= 0.5 * atr)
+        fvg_bear = bool(gap_bear > 0 and close_1 < open_1 and gap_bear >= 0.5 * atr)
+        
+        # Displacement
+        candle_range = high - low
+        ratio = abs(close - open_) / candle_range if candle_range != 0 else 0.0
+        strong = candle_range >= p.displacement_atr * atr and ratio >= p.body_ratio
+        disp_bull = bool(strong and close >= high - 0.3 * candle_range)
+        disp_bear = bool(strong and close <= low + 0.3 * candle_range)
+        
+        # Sweeps of the last swing confirmed by this bar
+        swing_high, swing_low = self._sweep_swings.update(high, low)
+        if swing_high == swing_high:
+            self._sweep_high = swing_high
+        if swing_low == swing_low:
+            self._sweep_low = swing_low
+        sweep_bear = bool(high > self._sweep_high and close <= self._sweep_high + p.sweep_tolerance_atr * atr)
+        sweep_bull = bool(low < self._sweep_low and close >= self._sweep_low - p.sweep_tolerance_atr * atr)
+        if sweep_bull:
+            self._last_sweep_bull = i
+        if sweep_bear:
+            self._last_sweep_bear = i
+        
+        # Order blocks confirmed by this bar's FVG, then the swing it decides
+        if i >= 3 and fvg_bull:
+            origin = self._order_block(i, bullish=True)
+            if origin is not None and origin != self._last_ob_bull:
+                self._last_ob_bull = origin
+                self._add_zone(origin, i, bullish=True)
+        if i >= 3 and fvg_bear:
+            origin = self._order_block(i, bullish=False)
+            if origin is not None and origin != self._last_ob_bear:
+                self._last_ob_bear = origin
+                self._add_zone(origin, i, bullish=False)
+        if ind['SwingHigh'] == ind['SwingHigh']:
+            self._swing_high = (i - 2, ind['SwingHigh'])
+        if ind['SwingLow'] == ind['SwingLow']:
+            self._swing_low = (i - 2, ind['SwingLow'])
+        
+        self._bars += 1
+        if i < self.WARMUP:
+            return None
+        
+        self._bull_zones.invalidate(close)
+        self._bear_zones.invalidate(close)
+        near_poi = self._bull_zones.touched(low) or self._bear_zones.touched(high)
+        
+        # Regime filter, then a displacement after a recent sweep (bearish first)
+        if chop > p.chop_threshold and adx < p.adx_threshold:
+            return None
+        if disp_bear and i - self._last_sweep_bear <= p.sweep_lag:
+            direction = 'Short'
+        elif not disp_bear and disp_bull and i - self._last_sweep_bull <= p.sweep_lag:
+            direction = 'Long'
+        else:
+            return None
+        
+        # Confluence score (see calculate_confluence_score); killzones only
+        # score when the bars carry In_Killzone, which replayed bars do not
+        time = pd.Timestamp(time_ns, tz='UTC')
+        bias = self._bias(time)
+        aligned = (bias == 'Bullish' and direction == 'Long') or (bias == 'Bearish' and direction == 'Short')
+        score_htf = (25 if aligned else 0) + (15 if near_poi else 0)
+        score_disp = 10 + (10 if (fvg_bull if direction == 'Long' else fvg_bear) else 0)
+        score_liq = 15 if sweep_bull or sweep_bear else 0
+        score_ctxt = 5 if chop < 50 else 0
+        score = score_htf + score_disp + score_liq + score_ctxt
+        risk_pct = get_risk_percentage(score)
+        if risk_pct <= 0:
+            return None
+        
+        if direction == 'Long':
+            stop_loss = low - p.stop_atr * atr
+            take_profit = close + (close - stop_loss) * p.reward_risk
+        else:
+            stop_loss = high + p.stop_atr * atr
+            take_profit = close - (stop_loss - close) * p.reward_risk
+        
+        row = dict(zip(BAR_COLUMNS, values))
+        row.update({
+            'ATR': atr, 'Chop': chop, 'ADX': adx,
+            'FVG_Bullish': fvg_bull, 'FVG_Bearish': fvg_bear,
+            'Displacement_Bullish': disp_bull, 'Displacement_Bearish': disp_bear,
+            'Sweep_Bullish': sweep_bull, 'Sweep_Bearish': sweep_bear,
+            'Signal': direction, 'Tier_Score': score,
+            'Score_HTF': score_htf, 'Score_Disp': score_disp, 'Score_Liq': score_liq, 'Score_Context': score_ctxt,
+            'Risk_Units': calculate_position_size(equity, risk_pct, abs(close - stop_loss)),
+            'Entry_Price': close, 'Stop_Loss': stop_loss, 'Take_Profit': take_profit,
+            'HTF_Bias': bias, 'In_Killzone': bool(killzone_flags(pd.DatetimeIndex([time]))[0]),
+            'Near_POI': near_poi
+        })
+        return pd.Series(row, name=time)
+
+class RiskEngine:
+    """
+    Risk Engine: re-sizes each signal on current equity (fixed fractional,
+    tier-based risk, halved while the drawdown circuit breaker is active)
+    and rejects signals with no valid stop or size.
+    max_open_trades=None leaves the number of concurrent trades unbounded.
+    """
+    def __init__(self, max_open_trades=None):
+        self.max_open_trades = max_open_trades
+
+    def approve(self, signal_row: pd.Series, equity: float, open_trades: int, circuit_breaker: bool = False):
+        if self.max_open_trades is not None and open_trades >= self.max_open_trades:
+            return None
+        dist = abs(signal_row['Close'] - signal_row['Stop_Loss'])
+        if not np.isfinite(dist) or dist <= 0:
+            return None
+        units = calculate_position_size(equity, get_risk_percentage(int(signal_row['Tier_Score']), circuit_breaker), dist)
+        if units <= 0:
+            return None
+        signal_row = signal_row.copy()
+        signal_row['Risk_Units'] = units
+        return signal_row
+
+class ExecutionSimulator:
+    """
+    Execution Simulator: market entries at bid/ask plus slippage and tick
+    level SL/TP exits, using the TradeManager fill and PnL rules.
+    Exits are found per open trade with a vectorized scan of the tick batch;
+    a tick crossing both levels counts as a stop. Exit slippage uses the
+    ATR recorded at entry.
+    """
+    def __init__(self, manager: TradeManager = None, min_tick: float = 0.00001):
+        self.manager = manager or TradeManager()
+        self.min_tick = min_tick
+
+    def enter(self, signal_row: pd.Series) -> int:
+        return self.manager.add_trade(signal_row)
+
+    def on_ticks(self, times: np.ndarray, bid: np.ndarray, ask: np.ndarray) -> list:
+        """
+        Close trades whose stop or target is reached by these ticks.
+        Returns the PnL of each closed trade.
+        """
+        book = self.manager.open
+        if len(book) == 0:
+            return []
+        exits = []
+        for row in range(len(book)):
+            stop_loss = book._cols['stop_loss'][row]
+            take_profit = book._cols['take_profit'][row]
+            if book.get(row, 'signal') == 'Long':
+                sl = bid <= stop_loss
+                hit = np.flatnonzero(sl | (bid >= take_profit))
+            else:
+                sl = ask >= stop_loss
+                hit = np.flatnonzero(sl | (ask <= take_profit))
+            if len(hit):
+                exits.append((hit[0], -row, bool(sl[hit[0]])))
+
+        pnl = []
+        exits.sort()
+        for k, neg_row, sl_hit in exits:
+            exit_time = pd.Timestamp(int(times[k]), tz='UTC')
+            atr = book._cols['atr'][-neg_row]
+            self.manager._close_trade(-neg_row, exit_time, sl_hit, atr, self.min_tick)
+            pnl.append(self.manager.closed._cols['pnl'][len(self.manager.closed) - 1])
+        book.remove([-e[1] for e in exits])
+        return pnl
+
+class PortfolioTracker:
+    """
+    Portfolio Tracker: equity, high watermark, drawdown and open exposure,
+    snapshotted once per completed bar.
+    """
+    def __init__(self, initial_equity: float = 25000.0, capacity: int = 4096):
+        self.initial_equity = initial_equity
+        self.equity = initial_equity
+        self.peak = initial_equity
+        self.circuit_breaker = False
+        self._times = np.empty(capacity, dtype=np.int64)
+        self._rows = np.empty((capacity, 4))
+        self._size = 0
+
+    @property
+    def drawdown(self) -> float:
+        return (self.equity - self.peak) / self.peak * 100
+
+    def realize(self, pnl: float):
+        self.equity += pnl
+        self.circuit_breaker = update_circuit_breaker(self.equity, self.peak, self.circuit_breaker)
+        self.peak = max(self.peak, self.equity)
+
+    def snapshot(self, time_ns: int, book):
+        """
+        Record equity, drawdown (%), notional exposure and open trade count.
+        """
+        if self._size == len(self._times):
+            self._times = np.concatenate([self._times, np.empty_like(self._times)])
+            self._rows = np.concatenate([self._rows, np.empty_like(self._rows)])
+        exposure = float(np.sum(book.column('risk_units') * book.column('entry_price')))
+        self._times[self._size] = time_ns
+        self._rows[self._size] = (self.equity, self.drawdown, exposure, len(book))
+        self._size += 1
+
+    def equity_curve(self) -> pd.DataFrame:
+        index = pd.DatetimeIndex(self._times[:self._size].view('datetime64[ns]'), name='date').tz_localize('UTC')
+        return pd.DataFrame(self._rows[:self._size], index=index, columns=['Equity', 'Drawdown', 'Exposure', 'Open_Trades'])
+
+class ReplayEngine:
+    """
+    Event-driven tick replay (ILS 17.2).
+
+    Each tick batch is split at bar boundaries. For every slice: a bar
+    completed before it is emitted first (strategy -> risk -> entry at the
+    bar close), then the slice's ticks are checked for exits and folded
+    into the current bar. Trades therefore only ever see ticks after the
+    bar that opened them.
+    strategy=None replays and aggregates only (no signals).
+    """
+    def __init__(self, timeframe: str = '5min', initial_equity: float = 25000.0, strategy='default', risk=None, execution=None):
+        self.aggregator = BarAggregator(timeframe)
+        self.strategy = StrategyEngine() if strategy == 'default' else strategy
+        self.risk = risk or RiskEngine()
+        self.execution = execution or ExecutionSimulator()
+        self.portfolio = PortfolioTracker(initial_equity)
+        self._bar_times = []
+        self._bars = []
+
+    def _on_bar(self, bar):
+        time_ns, values = bar
+        self._bar_times.append(time_ns)
+        self._bars.append(values)
+        if self.strategy is not None:
+            signal = self.strategy.on_bar(time_ns, values, self.portfolio.equity)
+            if signal is not None:
+                approved = self.risk.approve(signal, self.portfolio.equity, len(self.execution.manager.open), self.portfolio.circuit_breaker)
+                if approved is not None:
+                    self.execution.enter(approved)
+        self.portfolio.snapshot(time_ns, self.execution.manager.open)
+
+    def _on_ticks(self, times, bid, ask):
+        for pnl in self.execution.on_ticks(times, bid, ask):
+            self.portfolio.realize(pnl)
+
+    def run(self, replayer: TickReplayer):
+        period = self.aggregator.period
+        for times, bid, ask in replayer:
+            bar_ids = times // period
+            cuts = np.flatnonzero(bar_ids[1:] != bar_ids[:-1]) + 1
+            starts = np.concatenate([[0], cuts])
+            ends = np.concatenate([cuts, [len(times)]])
+            for lo, hi in zip(starts, ends):
+                bar_id = int(bar_ids[lo])
+                if self.aggregator.bar_id is not None and bar_id != self.aggregator.bar_id:
+                    self._on_bar(self.aggregator.complete())
+                self._on_ticks(times[lo:hi], bid[lo:hi], ask[lo:hi])
+                self.aggregator.update(bar_id, bid[lo:hi], ask[lo:hi])
+
+        # End of data completes the last bar
+        last = self.aggregator.complete()
+        if last is not None:
+            self._on_bar(last)
+        return self
+
+    def bars_df(self) -> pd.DataFrame:
+        index = pd.DatetimeIndex(np.array(self._bar_times, dtype=np.int64).view('datetime64[ns]'), name='date').tz_localize('UTC')
+        bars = pd.DataFrame(np.array(self._bars).reshape(len(self._bars), len(BAR_COLUMNS)), index=index, columns=BAR_COLUMNS)
+        return bars.astype({'Tick_Count': np.int64})
+
+    def get_results_df(self) -> pd.DataFrame:
+        return self.execution.manager.get_results_df()
+
+    def equity_curve(self) -> pd.DataFrame:
+        return self.portfolio.equity_curve()
@@ -1,53 +1,143 @@
 import pandas as pd
 import numpy as np
+from collections import deque
 
-def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
+class IndicatorContext:
     """
-    Calculate Average True Range (ATR).
+    Per-frame cache of the building blocks shared by the indicators
+    (previous close, true range, rolling sums/max/min).
+    Each block is computed once per frame and served to every indicator.
     """
-    if len(df) < period:
-        return pd.Series(index=df.index, dtype=float)
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._cache = {}
 
-    high = df['High']
-    low = df['Low']
-    close = df['Close']
-    prev_close = close.shift(1)
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _empty(self) -> pd.Series:
+        return pd.Series(index=self.df.index, dtype=float)
+
+    @property
+    def prev_close(self) -> pd.Series:
+        return self._cached('prev_close', lambda: self.df['Close'].shift(1))
+
+    @property
+    def true_range(self) -> pd.Series:
+        def compute():
+            high = self.df['High']
+            low = self.df['Low']
+            prev_close = self.prev_close
+
+            tr1 = high - low
+            tr2 = (high - prev_close).abs()
+            tr3 = (low - prev_close).abs()
+            # fmax skips NaN like max(axis=1) (first bar has no previous close)
+            return pd.Series(np.fmax(np.fmax(tr1.values, tr2.values), tr3.values), index=self.df.index)
+        return self._cached('true_range', compute)
+
+    def rolling(self, column: str, window: int, how: str) -> pd.Series:
+        """
+        Rolling 'sum', 'mean', 'max' or 'min' of a price column or 'TR'.
+        """
+        def compute():
+            series = self.true_range if column == 'TR' else self.df[column]
+            return getattr(series.rolling(window=window), how)()
+        return self._cached(('rolling', column, window, how), compute)
+
+    def atr(self, period: int = 14) -> pd.Series:
+        """
+        Average True Range (ATR).
+        """
+        if len(self.df) < period:
+            return self._empty()
+        return self.rolling('TR', period, 'mean')
+
+    def chop(self, period: int = 14) -> pd.Series:
+        """
+        Choppiness Index.
+        """
+        if len(self.df) < period:
+            return self._empty()
+
+        def compute():
+            sum_tr = self.rolling('TR', period, 'sum')
+            max_high = self.rolling('High', period, 'max')
+            min_low = self.rolling('Low', period, 'min')
+
+            range_diff = max_high - min_low
+            range_diff = range_diff.replace(0, np.nan)
+
+            return 100 * np.log10(sum_tr / range_diff) / np.log10(period)
+        return self._cached(('chop', period), compute)
+
+    def adx(self, period: int = 14) -> pd.Series:
+        """
+        Average Directional Index (ADX).
+        """
+        if len(self.df) < period:
+            return self._empty()
+
+        def compute():
+            high = self.df['High']
+            low = self.df['Low']
+
+            # directional movement
+            up_move = high - high.shift(1)
+            down_move = low.shift(1) - low
+
+            plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+            minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+            # smooth
+            # alpha = 1/period
+            tr_smooth = self.true_range.ewm(alpha=1/period, adjust=False).mean()
+            plus_di = 100 * (pd.Series(plus_dm, index=self.df.index).ewm(alpha=1/period, adjust=False).mean() / tr_smooth)
+            minus_di = 100 * (pd.Series(minus_dm, index=self.df.index).ewm(alpha=1/period, adjust=False).mean() / tr_smooth)
+
+            dx = 100 * (abs(plus_di - minus_di) / (plus_di + minus_di))
+            return dx.ewm(alpha=1/period, adjust=False).mean()
+        return self._cached(('adx', period), compute)
+
+    def swings(self, lookback: int = 2) -> pd.DataFrame:
+        """
+        Fractal swing highs and lows.
+        """
+        return self._cached(('swings', lookback), lambda: find_swings_fractal(self.df, lookback))
+
+    def adaptive_lookback(self, l_base: int = 5, alpha: float = 0.5) -> pd.Series:
+        """
+        Adaptive Fractal Lookback based on ATR ratio (Market Structure Engine).
+        L_adaptive = round(L_base * (1 + alpha * (ATR_long / ATR_short - 1)))
+        """
+        atr_short = self.atr(period=14)
+        atr_long = self.atr(period=100)
+
+        # Avoid division by zero
+        ratio = atr_long / atr_short.replace(0, np.nan)
+        ratio = ratio.fillna(1.0)
 
-    tr1 = high - low
-    tr2 = (high - prev_close).abs()
-    tr3 = (low - prev_close).abs()
+        l_adaptive = l_base * (1 + alpha * (ratio - 1))
+        l_adaptive = l_adaptive.round().astype(int)
 
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = tr.rolling(window=period).mean() 
-    return atr
+        # Clip logic to sensible bounds? Spec doesn't say, but let's keep it >= 2
+        l_adaptive = l_adaptive.clip(lower=2)
+
+        return l_adaptive
+
+def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
+    """
+    Calculate Average True Range (ATR).
+    """
+    return IndicatorContext(df).atr(period)
 
 def calculate_chop_index(df: pd.DataFrame, period: int = 14) -> pd.Series:
     """
     Calculate Choppiness Index.
     """
-    if len(df) < period:
-        return pd.Series(index=df.index, dtype=float)
-
-    high = df['High']
-    low = df['Low']
-    close = df['Close']
-    
-    prev_close = close.shift(1)
-    tr1 = high - low
-    tr2 = (high - prev_close).abs()
-    tr3 = (low - prev_close).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    
-    sum_tr = tr.rolling(window=period).sum()
-    max_high = high.rolling(window=period).max()
-    min_low = low.rolling(window=period).min()
-    
-    range_diff = max_high - min_low
-    range_diff = range_diff.replace(0, np.nan) 
-    
-    chop = 100 * np.log10(sum_tr / range_diff) / np.log10(period)
-    
-    return chop
+    return IndicatorContext(df).chop(period)
 
 def find_swings_fractal(df: pd.DataFrame, lookback: int = 2) -> pd.DataFrame:
     """
@@ -76,54 +166,253 @@ def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.Series:
     """
     Calculate Average Directional Index (ADX).
     """
-    if len(df) < period:
-        return pd.Series(index=df.index, dtype=float)
-
-    high = df['High']
-    low = df['Low']
-    close = df['Close']
-    
-    # Calculate TR (True Range)
-    prev_close = close.shift(1)
-    tr1 = high - low
-    tr2 = (high - prev_close).abs()
-    tr3 = (low - prev_close).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    
-    # directional movement
-    up_move = high - high.shift(1)
-    down_move = low.shift(1) - low
-    
-    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
-    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
-    
-    # smooth
-    # alpha = 1/period
-    tr_smooth = tr.ewm(alpha=1/period, adjust=False).mean()
-    plus_di = 100 * (pd.Series(plus_dm, index=df.index).ewm(alpha=1/period, adjust=False).mean() / tr_smooth)
-    minus_di = 100 * (pd.Series(minus_dm, index=df.index).ewm(alpha=1/period, adjust=False).mean() / tr_smooth)
-    
-    dx = 100 * (abs(plus_di - minus_di) / (plus_di + minus_di))
-    adx = dx.ewm(alpha=1/period, adjust=False).mean()
-    
-    return adx
+    return IndicatorContext(df).adx(period)
 
 def calculate_adaptive_lookback(df: pd.DataFrame, l_base: int = 5, alpha: float = 0.5) -> pd.Series:
     """
     Calculate Adaptive Fractal Lookback based on ATR ratio (Market Structure Engine).
     L_adaptive = round(L_base * (1 + alpha * (ATR_long / ATR_short - 1)))
     """
-    atr_short = calculate_atr(df, period=14)
-    atr_long = calculate_atr(df, period=100)
-    
-    # Avoid division by zero
-    ratio = atr_long / atr_short.replace(0, np.nan)
-    ratio = ratio.fillna(1.0)
-    
-    l_adaptive = l_base * (1 + alpha * (ratio - 1))
-    l_adaptive = l_adaptive.round().astype(int)
-    
-    # Clip logic to sensible bounds? Spec doesn't say, but let's keep it >= 2
-    l_adaptive = l_adaptive.clip(lower=2)
-    
-    return l_adaptive
+    return IndicatorContext(df).adaptive_lookback(l_base, alpha)
+
+# Streaming (one bar at a time) counterparts of the batch indicators.
+# Each update is O(1) for a fixed period and matches the batch value for the
+# same bar once the frame holds at least `period` bars.
+
+class _RingSum:
+    """
+    Sum of the last `period` values, kept in a ring buffer with a
+    compensated (Neumaier) running sum so it does not drift.
+    NaNs are counted instead of summed, so the sum is NaN only while one is
+    in the window (as with rolling(period).sum()).
+    """
+    def __init__(self, period: int):
+        self.period = period
+        self._buf = np.zeros(period)
+        self._count = 0
+        self._nans = 0
+        self._sum = 0.0
+        self._comp = 0.0
+
+    def _add(self, x: float):
+        t = self._sum + x
+        if abs(self._sum) >= abs(x):
+            self._comp += (self._sum - t) + x
+        else:
+            self._comp += (x - t) + self._sum
+        self._sum = t
+
+    def push(self, x: float) -> float:
+        """
+        Add a value; returns the window sum, NaN until the window is full
+        or while it holds a NaN.
+        """
+        pos = self._count % self.period
+        if self._count >= self.period:
+            old = self._buf[pos]
+            if old != old:
+                self._nans -= 1
+            else:
+                self._add(-old)
+        self._buf[pos] = x
+        if x != x:
+            self._nans += 1
+        else:
+            self._add(x)
+        self._count += 1
+        if self._count < self.period or self._nans:
+            return np.nan
+        return self._sum + self._comp
+
+class _RollingExtreme:
+    """
+    Max (or min) of the last `period` values via a monotonic deque.
+    NaN while the window holds a NaN, as with rolling(period).max().
+    """
+    def __init__(self, period: int, maximum: bool = True):
+        self.period = period
+        self._sign = 1.0 if maximum else -1.0
+        self._deque = deque()
+        self._count = 0
+        self._last_nan = -period
+
+    def push(self, x: float) -> float:
+        """
+        Add a value; returns the window extreme, NaN until the window is full
+        or while it holds a NaN.
+        """
+        if x != x:
+            self._last_nan = self._count
+        else:
+            key = self._sign * x
+            while self._deque and self._deque[-1][1] <= key:
+                self._deque.pop()
+            self._deque.append((self._count, key))
+        if self._deque and self._deque[0][0] <= self._count - self.period:
+            self._deque.popleft()
+        self._count += 1
+        if self._count < self.period or self._last_nan >= self._count - self.period:
+            return np.nan
+        return self._sign * self._deque[0][1]
+
+class _StreamingEWM:
+    """
+    ewm(alpha, adjust=False).mean() one value at a time, following the
+    pandas recursion (including how NaN gaps decay the previous weight).
+    """
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value = np.float64(np.nan)
+        self._old_wt = 1.0
+
+    def push(self, x: float) -> float:
+        if self.value == self.value:
+            self._old_wt *= 1 - self.alpha
+            if x == x:
+                if self.value != x:
+                    self.value = self._old_wt * self.value + self.alpha * x
+                    self.value /= self._old_wt + self.alpha
+                self._old_wt = 1.0
+        elif x == x:
+            self.value = np.float64(x)
+        return self.value
+
+class _TrueRange:
+    def __init__(self):
+        self.prev_close = np.nan
+
+    def push(self, high: float, low: float, close: float) -> float:
+        # fmax skips NaN like the batch version (first bar has no previous close)
+        prev = self.prev_close
+        self.prev_close = close
+        return np.fmax(np.fmax(high - low, abs(high - prev)), abs(low - prev))
+
+class StreamingATR:
+    """
+    Average True Range, one bar at a time (matches calculate_atr).
+    """
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._tr = _TrueRange()
+        self._sum = _RingSum(period)
+        self.value = np.nan
+
+    def _push_tr(self, tr: float) -> float:
+        self.value = self._sum.push(tr) / self.period
+        return self.value
+
+    def update(self, high: float, low: float, close: float) -> float:
+        return self._push_tr(self._tr.push(high, low, close))
+
+class StreamingChop:
+    """
+    Choppiness Index, one bar at a time (matches calculate_chop_index).
+    """
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._tr = _TrueRange()
+        self._sum = _RingSum(period)
+        self._max_high = _RollingExtreme(period, maximum=True)
+        self._min_low = _RollingExtreme(period, maximum=False)
+        self.value = np.nan
+
+    def _push_tr(self, tr: float, high: float, low: float) -> float:
+        sum_tr = self._sum.push(tr)
+        range_diff = self._max_high.push(high) - self._min_low.push(low)
+        if range_diff == 0 or np.isnan(range_diff):
+            self.value = np.nan
+        else:
+            self.value = 100 * np.log10(sum_tr / range_diff) / np.log10(self.period)
+        return self.value
+
+    def update(self, high: float, low: float, close: float) -> float:
+        return self._push_tr(self._tr.push(high, low, close), high, low)
+
+class StreamingADX:
+    """
+    Average Directional Index, one bar at a time (matches calculate_adx).
+    """
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._tr = _TrueRange()
+        alpha = 1 / period
+        self._tr_smooth = _StreamingEWM(alpha)
+        self._plus = _StreamingEWM(alpha)
+        self._minus = _StreamingEWM(alpha)
+        self._dx = _StreamingEWM(alpha)
+        self._prev_high = np.nan
+        self._prev_low = np.nan
+        self.value = np.nan
+
+    def _push_tr(self, tr: float, high: float, low: float) -> float:
+        # directional movement
+        up_move = high - self._prev_high
+        down_move = self._prev_low - low
+        self._prev_high = high
+        self._prev_low = low
+        plus_dm = up_move if (up_move > down_move) and (up_move > 0) else 0.0
+        minus_dm = down_move if (down_move > up_move) and (down_move > 0) else 0.0
+
+        # smooth
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tr_smooth = self._tr_smooth.push(tr)
+            plus_di = 100 * (self._plus.push(plus_dm) / tr_smooth)
+            minus_di = 100 * (self._minus.push(minus_dm) / tr_smooth)
+            dx = 100 * (abs(plus_di - minus_di) / (plus_di + minus_di))
+        self.value = self._dx.push(dx)
+        return self.value
+
+    def update(self, high: float, low: float, close: float) -> float:
+        return self._push_tr(self._tr.push(high, low, close), high, low)
+
+class StreamingSwings:
+    """
+    Fractal swings, one bar at a time (matches find_swings_fractal).
+    A swing needs `lookback` bars on each side, so the bar `lookback` bars
+    back is decided on each update.
+    """
+    def __init__(self, lookback: int = 2):
+        self.lookback = lookback
+        self._highs = deque(maxlen=2 * lookback + 1)
+        self._lows = deque(maxlen=2 * lookback + 1)
+
+    def update(self, high: float, low: float):
+        """
+        Returns (swing_high, swing_low) for the bar `lookback` bars back:
+        the price if it is a swing, else NaN (NaN, NaN until enough bars).
+        """
+        self._highs.append(high)
+        self._lows.append(low)
+        if len(self._highs) < self._highs.maxlen:
+            return np.nan, np.nan
+        c = self.lookback
+        center_high = self._highs[c]
+        center_low = self._lows[c]
+        is_high = all(center_high > self._highs[j] for j in range(len(self._highs)) if j != c)
+        is_low = all(center_low < self._lows[j] for j in range(len(self._lows)) if j != c)
+        return (center_high if is_high else np.nan), (center_low if is_low else np.nan)
+
+class StreamingIndicators:
+    """
+    Streaming counterpart of IndicatorContext: one true range per bar shared
+    by ATR(14), ATR(100), CHOP and ADX, plus fractal swings.
+    """
+    def __init__(self, period: int = 14, long_period: int = 100, swing_lookback: int = 2):
+        self._tr = _TrueRange()
+        self.atr = StreamingATR(period)
+        self.atr_long = StreamingATR(long_period)
+        self.chop = StreamingChop(period)
+        self.adx = StreamingADX(period)
+        self.swings = StreamingSwings(swing_lookback)
+
+    def update(self, high: float, low: float, close: float) -> dict:
+        tr = self._tr.push(high, low, close)
+        swing_high, swing_low = self.swings.update(high, low)
+        return {
+            'ATR': self.atr._push_tr(tr),
+            'ATR_Long': self.atr_long._push_tr(tr),
+            'Chop': self.chop._push_tr(tr, high, low),
+            'ADX': self.adx._push_tr(tr, high, low),
+            'SwingHigh': swing_high,
+            'SwingLow': swing_low
+        }
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
 def calculate_metrics(trades_df, initial_balance=25000.0):
     """
@@ -113,3 +114,60 @@ def generate_monthly_returns(trades_df):
     pivot['Total'] = pivot.sum(axis=1)
     
     return pivot
+
+# Monte Carlo (ILS 17.5): trade reshuffling and bootstrap resampling.
+# Simulations run as 2D arrays (one row per path) in chunks of at most
+# MC_MAX_CELLS values. Chunk k always draws from the k-th child of the
+# seed, so results do not depend on which worker runs which chunk.
+MC_MAX_CELLS = 4000000
+
+def _mc_chunk(pnl, initial_balance, n_paths, method, seed_seq):
+    """
+    Max drawdown (%) and return (%) of n_paths resampled trade sequences.
+    """
+    rng = np.random.default_rng(seed_seq)
+    if method == 'shuffle':
+        paths = rng.permuted(np.broadcast_to(pnl, (n_paths, len(pnl))), axis=1)
+    else:
+        paths = pnl[rng.integers(0, len(pnl), size=(n_paths, len(pnl)))]
+        
+    # Same drawdown definition as calculate_metrics
+    equity = initial_balance + np.cumsum(paths, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    max_dd = ((equity - peak) / peak * 100).min(axis=1)
+    ret = (equity[:, -1] - initial_balance) / initial_balance * 100
+    return max_dd, ret
+
+def monte_carlo(trades_df, initial_balance=25000.0, n_sims=10000, method='shuffle',
+                quantiles=(0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99), seed=42, workers=1):
+    """
+    Monte Carlo of the trade PnL sequence.
+    method: 'shuffle' (reorder the realized trades; same total, different path)
+    or 'bootstrap' (draw trades with replacement).
+    Returns a DataFrame indexed by quantile with 'Max Drawdown (%)' and
+    'Return (%)'. Reproducible for a given seed, whatever `workers`.
+    """
+    if method not in ('shuffle', 'bootstrap'):
+        raise ValueError(f"Unknown Monte Carlo method: {method}")
+    pnl = trades_df['pnl'].to_numpy(dtype=float) if isinstance(trades_df, pd.DataFrame) else np.asarray(trades_df, dtype=float)
+    if len(pnl) == 0 or n_sims <= 0:
+        return pd.DataFrame(columns=['Max Drawdown (%)', 'Return (%)'])
+        
+    chunk = max(1, min(n_sims, MC_MAX_CELLS // len(pnl)))
+    sizes = [min(chunk, n_sims - lo) for lo in range(0, n_sims, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(pnl, initial_balance, size, method, s) for size, s in zip(sizes, seeds)]
+    
+    if workers and workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_mc_chunk, *zip(*args)))
+    else:
+        parts = [_mc_chunk(*a) for a in args]
+        
+    max_dd = np.concatenate([p[0] for p in parts])
+    ret = np.concatenate([p[1] for p in parts])
+    q = list(quantiles)
+    return pd.DataFrame({
+        'Max Drawdown (%)': np.quantile(max_dd, q),
+        'Return (%)': np.quantile(ret, q)
+    }, index=pd.Index(q, name='Quantile'))
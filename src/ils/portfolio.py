@@ -0,0 +1,107 @@
+import pandas as pd
+import numpy as np
+import heapq
+from .risk import update_circuit_breaker
+
+# Event kinds: at equal timestamps exits settle before entries are sized,
+# as in the per-bar loop (update() before add_trade()).
+EXIT = 0
+ENTRY = 1
+
+# Trade fields that scale with position size
+SIZE_FIELDS = ['risk_units', 'pnl', 'slippage_cost']
+
+def trade_events(trades: pd.DataFrame, source: int):
+    """
+    Time-ordered (time_ns, kind, source, row) events for one instrument's
+    closed trades: one ENTRY and one EXIT per trade.
+    """
+    if trades.empty:
+        return iter(())
+    entry = trades['entry_time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    exit_ = trades['exit_time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    rows = np.arange(len(trades))
+
+    times = np.concatenate([exit_, entry])
+    kinds = np.concatenate([np.full(len(rows), EXIT), np.full(len(rows), ENTRY)])
+    rows = np.concatenate([rows, rows])
+    order = np.lexsort((rows, kinds, times))
+    return ((int(times[k]), int(kinds[k]), source, int(rows[k])) for k in order)
+
+def run_portfolio(trade_frames: dict, initial_equity: float = 25000.0, sizing_equity: float = None):
+    """
+    Replay the trades of several instruments against one shared account.
+
+    trade_frames: {instrument: closed trades} as returned by
+    TradeManager.get_results_df(), each sized from sizing_equity
+    (default initial_equity). The per-instrument event streams are k-way
+    merged in time order; every entry is re-sized from the account equity
+    at that moment (fixed fractional sizing is linear in equity), halved
+    while the drawdown circuit breaker is active, and every exit books its
+    re-scaled PnL.
+
+    Returns (trades, equity):
+    - trades: all trades with an 'instrument' column, re-sized, in exit order
+    - equity: Equity, Drawdown (%), Exposure (open notional) and Open_Trades
+      after each event
+    """
+    sizing_equity = sizing_equity or initial_equity
+    names = list(trade_frames)
+    frames = [trade_frames[name] for name in names]
+    pnl = [f['pnl'].to_numpy(dtype=float) if not f.empty else np.empty(0) for f in frames]
+    notional = [(f['risk_units'] * f['entry_price']).abs().to_numpy(dtype=float) if not f.empty else np.empty(0) for f in frames]
+    scale = [np.zeros(len(f)) for f in frames]
+    equity_at_entry = [np.zeros(len(f)) for f in frames]
+    breaker_at_entry = [np.zeros(len(f), dtype=np.int64) for f in frames]
+    exit_seq = [np.zeros(len(f), dtype=np.int64) for f in frames]
+
+    n_events = 2 * sum(len(f) for f in frames)
+    times = np.empty(n_events, dtype=np.int64)
+    curve = np.empty((n_events, 4))
+
+    equity = initial_equity
+    peak = initial_equity
+    breaker = False
+    exposure = 0.0
+    open_trades = 0
+    n_exits = 0
+    streams = [trade_events(f, k) for k, f in enumerate(frames)]
+    for i, (time_ns, kind, source, row) in enumerate(heapq.merge(*streams)):
+        if kind == ENTRY:
+            s = equity / sizing_equity * (0.5 if breaker else 1.0)
+            scale[source][row] = s
+            equity_at_entry[source][row] = equity
+            breaker_at_entry[source][row] = int(breaker)
+            exposure += notional[source][row] * s
+            open_trades += 1
+        else:
+            s = scale[source][row]
+            equity += pnl[source][row] * s
+            breaker = update_circuit_breaker(equity, peak, breaker)
+            peak = max(peak, equity)
+            exposure -= notional[source][row] * s
+            open_trades -= 1
+            exit_seq[source][row] = n_exits
+            n_exits += 1
+        times[i] = time_ns
+        curve[i] = (equity, (equity - peak) / peak * 100, max(exposure, 0.0), open_trades)
+
+    parts = []
+    for k, f in enumerate(frames):
+        if f.empty:
+            continue
+        part = f.copy()
+        for col in SIZE_FIELDS:
+            part[col] = part[col].to_numpy(dtype=float) * scale[k]
+        part.insert(0, 'instrument', names[k])
+        part['circuit_breaker'] = breaker_at_entry[k]
+        part['equity_at_entry'] = equity_at_entry[k]
+        part['_seq'] = exit_seq[k]
+        parts.append(part)
+
+    index = pd.DatetimeIndex(times.view('datetime64[ns]'), name='date').tz_localize('UTC')
+    equity_df = pd.DataFrame(curve, index=index, columns=['Equity', 'Drawdown', 'Exposure', 'Open_Trades'])
+    if not parts:
+        return pd.DataFrame(), equity_df
+    trades = pd.concat(parts, ignore_index=True).sort_values('_seq', kind='stable')
+    return trades.drop(columns='_seq').reset_index(drop=True), equity_df
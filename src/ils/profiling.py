@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import contextlib
+import pandas as pd
+
+# Per-stage profiling spans.
+# Off by default: span() then returns one shared no-op context manager, so
+# instrumented code pays a single global lookup per stage. profiling()
+# switches a Profiler on for the duration of a run.
+
+_NULL_SPAN = contextlib.nullcontext()
+_active = None
+
+def rss_mb():
+    """
+    Current resident set size in MB (None where /proc is unavailable).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def peak_rss_mb():
+    """
+    Peak resident set size of the process so far in MB.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+class Profiler:
+    """
+    Collects nested timing spans for one run. Each closed span records its
+    path ('strategy/features/indicators'), wall and CPU seconds, and the
+    RSS change and process peak RSS at its end.
+    """
+    def __init__(self, name: str = 'run'):
+        self.name = name
+        self.records = []
+        self._stack = []
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        self._stack.append(name)
+        path = '/'.join(self._stack)
+        rss_start = rss_mb()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            rss_end = rss_mb()
+            self._stack.pop()
+            self.records.append({
+                'span': path,
+                'depth': len(self._stack),
+                'start': round(start - self._start, 6),
+                'seconds': round(end - start, 6),
+                'cpu_seconds': round(time.process_time() - cpu_start, 6),
+                'rss_mb': rss_end,
+                'rss_delta_mb': rss_end - rss_start if rss_end is not None and rss_start is not None else None,
+                'peak_rss_mb': peak_rss_mb()
+            })
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def summary(self) -> pd.DataFrame:
+        return summarize(self.records)
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'elapsed': round(self.elapsed(), 6), 'spans': self.records}
+
+    def save(self, path: str):
+        """
+        Write the spans and their per-stage summary as JSON.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        report = self.to_dict()
+        report['summary'] = self.summary().reset_index().to_dict(orient='records')
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+def summarize(records: list) -> pd.DataFrame:
+    """
+    Per-stage table from span records: calls, total/mean/CPU seconds, share
+    of the top-level time, largest RSS growth and highest peak RSS.
+    Stages keep their first-seen order.
+    """
+    columns = ['Calls', 'Total (s)', 'Mean (s)', 'CPU (s)', '% of Run', 'Max RSS +MB', 'Peak RSS MB']
+    if not records:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(records)
+    top_level = df.loc[df['depth'] == 0, 'seconds'].sum()
+    grouped = df.groupby('span', sort=False)
+    table = pd.DataFrame({
+        'Calls': grouped.size(),
+        'Total (s)': grouped['seconds'].sum(),
+        'Mean (s)': grouped['seconds'].mean(),
+        'CPU (s)': grouped['cpu_seconds'].sum(),
+        '% of Run': grouped['seconds'].sum() / top_level * 100 if top_level > 0 else 0.0,
+        'Max RSS +MB': grouped['rss_delta_mb'].max(),
+        'Peak RSS MB': grouped['peak_rss_mb'].max()
+    })
+    # Spans are recorded as they close (children first); list stages by start
+    order = grouped['start'].min().sort_values(kind='stable').index
+    return table.loc[order].round(3)
+
+def span(name: str):
+    """
+    Timing span around a pipeline stage. A no-op unless profiling is on.
+    """
+    if _active is None:
+        return _NULL_SPAN
+    return _active.span(name)
+
+def active():
+    return _active
+
+@contextlib.contextmanager
+def profiling(name: str = 'run', enabled: bool = True):
+    """
+    Collect spans into a new Profiler for the duration of the block.
+    Yields the Profiler (None when not enabled).
+    """
+    global _active
+    if not enabled:
+        yield None
+        return
+    previous = _active
+    _active = Profiler(name)
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+@contextlib.contextmanager
+def cprofile(path: str = None):
+    """
+    Run the block under cProfile and dump the stats to path (no-op if path is None).
+    Inspect with `python -m pstats <path>`.
+    """
+    if path is None:
+        yield
+        return
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        prof.dump_stats(path)
@@ -1,3 +1,8 @@
+# Base Risk Unit (R) as a fraction of equity
+BASE_RISK_UNIT = 0.01
+# Drawdown (in R) that trips the circuit breaker
+CIRCUIT_BREAKER_R = 5
+
 def calculate_position_size(equity: float, risk_percentage: float, stop_loss_distance: float) -> float:
     """
     Calculate position size using Fixed Fractional Sizing.
@@ -16,7 +21,7 @@ def get_risk_percentage(tier_score: int, circuit_breaker_active: bool = False) -
     Tier 2 (65-84): 0.5R (0.5%)
     Circuit Breaker: Reduces R by 50% if active.
     """
-    base_unit = 0.01 # 1%
+    base_unit = BASE_RISK_UNIT # 1%
     
     if circuit_breaker_active:
         base_unit *= 0.5
@@ -30,6 +35,18 @@ def get_risk_percentage(tier_score: int, circuit_breaker_active: bool = False) -
     else:
         return 0.0
 
+def update_circuit_breaker(equity: float, high_watermark: float, active: bool = False) -> bool:
+    """
+    Drawdown Circuit Breaker (ILS 12).
+    Trips at a -5R drawdown from the equity high watermark (R = 1% of the
+    high watermark) and is restored only at a new high watermark.
+    """
+    if equity >= high_watermark:
+        return False
+    if high_watermark - equity >= CIRCUIT_BREAKER_R * BASE_RISK_UNIT * high_watermark:
+        return True
+    return active
+
 def apply_correlation_filter(new_trade_asset: str, open_trades: list) -> bool:
     return True
 
@@ -2,11 +2,15 @@ import pandas as pd
 import numpy as np
 from .indicators import calculate_atr, find_swings_fractal
 
-def validate_displacement(df: pd.DataFrame, atr_col: str = 'ATR') -> pd.DataFrame:
+# Order block search ranges (bars before the FVG bar), see detect_order_blocks
+MAX_SWING_LOOKBACK = 50
+MAX_ORIGIN_LOOKBACK = 10
+
+def validate_displacement(df: pd.DataFrame, atr_col: str = 'ATR', range_atr: float = 1.5, body_ratio: float = 0.6) -> pd.DataFrame:
     """
     Validate Displacement Candles based on 3.0 spec:
-    - Body / Range >= 0.6
-    - Range >= 1.5 * ATR
+    - Body / Range >= 0.6 (body_ratio)
+    - Range >= 1.5 * ATR (range_atr)
     - Bearish: Close in bottom 30%
     - Bullish: Close in top 30%
     """
@@ -20,10 +24,10 @@ def validate_displacement(df: pd.DataFrame, atr_col: str = 'ATR') -> pd.DataFram
     body_size = (close - open_).abs()
     
     # Avoid zero division
-    body_ratio = body_size / candle_range.replace(0, np.inf)
+    ratio = body_size / candle_range.replace(0, np.inf)
     
-    range_condition = candle_range >= (1.5 * atr)
-    body_condition = body_ratio >= 0.6
+    range_condition = candle_range >= (range_atr * atr)
+    body_condition = ratio >= body_ratio
     
     # Directional close
     # High - Low is range. 
@@ -73,63 +77,102 @@ def detect_fvg(df: pd.DataFrame, atr_threshold_multiplier: float = 0.5, atr_col:
     
     return result
 
-def detect_liquidity_sweeps(df: pd.DataFrame, swing_lookback: int = 5, atr_col: str = 'ATR') -> pd.DataFrame:
+def _sweeps_from_levels(df: pd.DataFrame, swing_high_level: np.ndarray, swing_low_level: np.ndarray, atr_col: str = 'ATR', tolerance_atr: float = 0.2) -> pd.DataFrame:
+    """
+    Flag sweeps of the last confirmed swing levels (NaN where none yet).
+    """
+    atr = df[atr_col].values if atr_col in df.columns else np.zeros(len(df))
+    high = df['High'].values
+    low = df['Low'].values
+    close = df['Close'].values
+    
+    with np.errstate(invalid='ignore'):
+        # Bearish Sweep Logic
+        res_bear = (high > swing_high_level) & (close <= swing_high_level + (tolerance_atr * atr))
+        # Bullish Sweep Logic
+        res_bull = (low < swing_low_level) & (close >= swing_low_level - (tolerance_atr * atr))
+    
+    sweeps = pd.DataFrame(index=df.index)
+    sweeps['Sweep_Bullish'] = res_bull
+    sweeps['Sweep_Bearish'] = res_bear
+    return sweeps
+
+def swing_levels(df: pd.DataFrame, swing_lookback: int = 5):
+    """
+    (swing high level, swing low level) arrays of the last confirmed fractal swings.
+    A fractal swing is confirmed swing_lookback bars after it forms, so the
+    active level is the forward-filled swing column shifted by the lookback.
+    """
+    swings = find_swings_fractal(df, lookback=swing_lookback)
+    swing_high_level = swings['SwingHigh'].ffill().shift(swing_lookback).values
+    swing_low_level = swings['SwingLow'].ffill().shift(swing_lookback).values
+    return swing_high_level, swing_low_level
+
+def detect_liquidity_sweeps(df: pd.DataFrame, swing_lookback: int = 5, atr_col: str = 'ATR', tolerance_atr: float = 0.2, levels=None) -> pd.DataFrame:
     """
     Detect Liquidity Sweeps (Turtle Soup).
     Bearish Sweep:
       - High > SwingHigh
-      - Close <= SwingHigh + 0.2 * ATR
+      - Close <= SwingHigh + 0.2 * ATR (tolerance_atr)
     Bullish Sweep:
       - Low < SwingLow
       - Close >= SwingLow - 0.2 * ATR
+    levels: precomputed swing_levels(df, swing_lookback), reused across tolerances.
     """
-    swings = find_swings_fractal(df, lookback=swing_lookback)
-    atr = df[atr_col] if atr_col in df.columns else pd.Series(0, index=df.index)
-    
-    sweeps = pd.DataFrame(index=df.index)
-    sweeps['Sweep_Bullish'] = False
-    sweeps['Sweep_Bearish'] = False
-    
-    last_swing_high = -np.inf
-    last_swing_low = np.inf
-    
-    high = df['High'].values
-    low = df['Low'].values
-    close = df['Close'].values
-    atr_vals = atr.values
-    
-    swing_highs = swings['SwingHigh'].values
-    swing_lows = swings['SwingLow'].values
-    
-    res_bull = np.zeros(len(df), dtype=bool)
-    res_bear = np.zeros(len(df), dtype=bool)
+    swing_high_level, swing_low_level = levels if levels is not None else swing_levels(df, swing_lookback)
+    return _sweeps_from_levels(df, swing_high_level, swing_low_level, atr_col, tolerance_atr)
 
-    for i in range(len(df)):
-        confirmed_idx = i - swing_lookback
-        if confirmed_idx >= 0:
-            if not np.isnan(swing_highs[confirmed_idx]):
-                last_swing_high = swing_highs[confirmed_idx]
-            if not np.isnan(swing_lows[confirmed_idx]):
-                last_swing_low = swing_lows[confirmed_idx]
+def detect_liquidity_sweeps_adaptive(df: pd.DataFrame, lookback: pd.Series, atr_col: str = 'ATR', tolerance_atr: float = 0.2) -> pd.DataFrame:
+    """
+    Detect Liquidity Sweeps with a per-bar fractal lookback
+    (see calculate_adaptive_lookback).
+    Bar i tests against the most recent swing of order lookback[i]
+    confirmed by bar i, i.e. formed at or before i - lookback[i].
+    """
+    n = len(df)
+    lookback = np.asarray(lookback, dtype=np.int64)
+    positions = np.arange(n) - lookback
+    
+    swing_high_level = np.full(n, np.nan)
+    swing_low_level = np.full(n, np.nan)
+    
+    for l in np.unique(lookback):
+        bars = np.flatnonzero((lookback == l) & (positions >= 0))
+        if len(bars) == 0:
+            continue
+        swings = find_swings_fractal(df, lookback=int(l))
+        swing_high_level[bars] = swings['SwingHigh'].ffill().values[positions[bars]]
+        swing_low_level[bars] = swings['SwingLow'].ffill().values[positions[bars]]
         
-        # Bearish Sweep Logic
-        if last_swing_high > -np.inf:
-            threshold = last_swing_high + (0.2 * atr_vals[i])
-            if high[i] > last_swing_high and close[i] <= threshold:
-                res_bear[i] = True
+    return _sweeps_from_levels(df, swing_high_level, swing_low_level, atr_col, tolerance_atr)
+
+def _last_true_index(mask: np.ndarray) -> np.ndarray:
+    """
+    Index of the most recent True at or before each position (-1 if none).
+    """
+    idx = np.where(mask, np.arange(len(mask)), -1)
+    return np.maximum.accumulate(idx) if len(idx) else idx
+
+def _resolve_order_blocks(fvg_idx, last_swing, last_origin, swing_level, close, breaks_up: bool, max_swing_lookback: int, max_origin_lookback: int):
+    """
+    Origin candle index for each FVG bar whose move broke the previous swing.
+    """
+    # Previous swing: most recent swing in (i - max_swing_lookback, i - 3]
+    swing_idx = last_swing[fvg_idx - 3]
+    has_swing = swing_idx > np.maximum(0, fvg_idx - max_swing_lookback)
+    level = swing_level[np.where(has_swing, swing_idx, 0)]
+    if breaks_up:
+        valid_break = has_swing & (close[fvg_idx] > level)
+    else:
+        valid_break = has_swing & (close[fvg_idx] < level)
         
-        # Bullish Sweep Logic
-        if last_swing_low < np.inf:
-            threshold = last_swing_low - (0.2 * atr_vals[i])
-            if low[i] < last_swing_low and close[i] >= threshold:
-                res_bull[i] = True
-                
-    sweeps['Sweep_Bullish'] = res_bull
-    sweeps['Sweep_Bearish'] = res_bear
+    # Origin: most recent opposite candle in (i - max_origin_lookback, i - 2]
+    origin_idx = last_origin[fvg_idx - 2]
+    has_origin = origin_idx > np.maximum(0, fvg_idx - max_origin_lookback)
     
-    return sweeps
+    return origin_idx[valid_break & has_origin]
 
-def detect_order_blocks(df: pd.DataFrame, fvg_df: pd.DataFrame, swings_df: pd.DataFrame) -> pd.DataFrame:
+def detect_order_blocks(df: pd.DataFrame, fvg_df: pd.DataFrame, swings_df: pd.DataFrame, max_swing_lookback: int = MAX_SWING_LOOKBACK, max_origin_lookback: int = MAX_ORIGIN_LOOKBACK) -> pd.DataFrame:
     """
     Detect Order Blocks (OB).
     Bullish OB: Last down-close candle before a move that:
@@ -139,82 +182,31 @@ def detect_order_blocks(df: pd.DataFrame, fvg_df: pd.DataFrame, swings_df: pd.Da
        1. Created a Bearish FVG.
        2. Broke a Swing Low (MSS).
        
+    The previous swing is searched within max_swing_lookback bars and the
+    origin candle within max_origin_lookback bars of the FVG bar.
     Returns DataFrame with 'OB_Bullish', 'OB_Bearish' booleans.
     """
-    ob_bull = pd.Series(False, index=df.index)
-    ob_bear = pd.Series(False, index=df.index)
-    
-    # We need access to values for speed
+    n = len(df)
     close = df['Close'].values
     open_ = df['Open'].values
     high = df['High'].values
     low = df['Low'].values
     
-    # FVG flags
-    has_fvg_bull = fvg_df['FVG_Bullish'].values
-    has_fvg_bear = fvg_df['FVG_Bearish'].values
-    
-    # Swings
-    swing_highs = swings_df['SwingHigh'].values 
-    swing_lows = swings_df['SwingLow'].values 
-    
-    for i in range(3, len(df)):
-        # Check Bullish OB Condition
-        if has_fvg_bull[i]:
-            # This FVG implies a move from i-2 to i.
-            # Did this move break structure?
-            valid_break = False
-            prev_swing_idx = -1
-            
-            # Look back for a swing high
-            for k in range(i-3, max(0, i-50), -1):
-                if not np.isnan(swing_highs[k]):
-                    prev_swing_idx = k
-                    break
-            
-            if prev_swing_idx != -1:
-                # If Close of break candle (i) > Swing High
-                if close[i] > high[prev_swing_idx]:
-                    valid_break = True
-            
-            if valid_break:
-                # Find the Origin Candle (last Down candle before i-2)
-                # Scan back from i-2
-                origin_idx = -1
-                for k in range(i-2, max(0, i-10), -1):
-                     # Down candle
-                     if close[k] < open_[k]:
-                         origin_idx = k
-                         break
-                
-                if origin_idx != -1:
-                    ob_bull.iloc[origin_idx] = True
-
-        # Check Bearish OB Condition
-        if has_fvg_bear[i]:
-            valid_break = False
-            prev_swing_idx = -1
-            
-            for k in range(i-3, max(0, i-50), -1):
-                if not np.isnan(swing_lows[k]):
-                    prev_swing_idx = k
-                    break
-            
-            if prev_swing_idx != -1:
-                # Break Low
-                if close[i] < low[prev_swing_idx]:
-                    valid_break = True
-            
-            if valid_break:
-                # Find Origin (Last Up candle)
-                origin_idx = -1
-                for k in range(i-2, max(0, i-10), -1):
-                    if close[k] > open_[k]:
-                        origin_idx = k
-                        break
-                
-                if origin_idx != -1:
-                    ob_bear.iloc[origin_idx] = True
+    # Most recent swing / opposite candle positions, forward-filled
+    last_swing_high = _last_true_index(~np.isnan(swings_df['SwingHigh'].values))
+    last_swing_low = _last_true_index(~np.isnan(swings_df['SwingLow'].values))
+    last_down = _last_true_index(close < open_)
+    last_up = _last_true_index(close > open_)
+    
+    # FVG bars (the move spans i-2..i, previous swing must be before i-2)
+    bars = np.arange(n)
+    fvg_bull_idx = bars[(bars >= 3) & fvg_df['FVG_Bullish'].values.astype(bool)]
+    fvg_bear_idx = bars[(bars >= 3) & fvg_df['FVG_Bearish'].values.astype(bool)]
+    
+    ob_bull = np.zeros(n, dtype=bool)
+    ob_bear = np.zeros(n, dtype=bool)
+    ob_bull[_resolve_order_blocks(fvg_bull_idx, last_swing_high, last_down, high, close, True, max_swing_lookback, max_origin_lookback)] = True
+    ob_bear[_resolve_order_blocks(fvg_bear_idx, last_swing_low, last_up, low, close, False, max_swing_lookback, max_origin_lookback)] = True
                     
     result = pd.DataFrame(index=df.index)
     result['OB_Bullish'] = ob_bull
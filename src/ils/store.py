@@ -0,0 +1,328 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import shutil
+import contextlib
+from .arrays import BarArrays, encode_labels, decode_labels
+
+try:
+    import fcntl
+except ImportError: # Windows: no advisory locks
+    fcntl = None
+
+class BarStore:
+    """
+    Columnar on-disk bar store.
+
+    Layout: {root}/{instrument}/{timeframe}/{year}/{column}.npy
+    Each year partition holds the bar timestamps ('date', int64 ns UTC)
+    plus one typed array per column, with the column order in _schema.json.
+    String columns are stored as int32 label codes with the labels in the
+    schema, so missing values read back as NaN.
+    Readers only touch the partitions (and columns) they need.
+
+    write_arrays() additionally consolidates a series into contiguous
+    memory-mappable arrays under {root}/{instrument}/{timeframe}/_arrays,
+    which read_arrays() slices without building a DataFrame. Writing new
+    bars to the series drops the consolidated copy. Writes and consolidation
+    of a series hold an exclusive lock on {series}/_lock, so processes
+    sharing a store never consolidate the same series twice or from
+    half-written partitions.
+    """
+    INDEX = 'date'
+    SCHEMA_FILE = '_schema.json'
+    ARRAYS_DIR = '_arrays'
+    LOCK_FILE = '_lock'
+
+    @staticmethod
+    def _partition_keys(index: pd.DatetimeIndex) -> np.ndarray:
+        """
+        Partition of each (UTC) timestamp: the year.
+        """
+        return np.asarray(index.year)
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _series_dir(self, instrument: str, timeframe: str) -> str:
+        return os.path.join(self.root, instrument, timeframe)
+
+    def _partition_dir(self, instrument: str, timeframe: str, key: int) -> str:
+        return os.path.join(self._series_dir(instrument, timeframe), str(key))
+
+    def _arrays_dir(self, instrument: str, timeframe: str) -> str:
+        return os.path.join(self._series_dir(instrument, timeframe), self.ARRAYS_DIR)
+
+    @contextlib.contextmanager
+    def _series_lock(self, instrument: str, timeframe: str):
+        series_dir = self._series_dir(instrument, timeframe)
+        os.makedirs(series_dir, exist_ok=True)
+        with open(os.path.join(series_dir, self.LOCK_FILE), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def partitions(self, instrument: str, timeframe: str) -> list:
+        """
+        Sorted list of partition keys stored for a series.
+        """
+        series_dir = self._series_dir(instrument, timeframe)
+        if not os.path.isdir(series_dir):
+            return []
+        keys = []
+        for name in os.listdir(series_dir):
+            if name.isdigit() and os.path.exists(os.path.join(series_dir, name, self.SCHEMA_FILE)):
+                keys.append(int(name))
+        return sorted(keys)
+
+    def years(self, instrument: str, timeframe: str) -> list:
+        """
+        Sorted list of year partitions stored for a series.
+        """
+        return self.partitions(instrument, timeframe)
+
+    def has_data(self, instrument: str, timeframe: str) -> bool:
+        return bool(self.partitions(instrument, timeframe))
+
+    def columns(self, instrument: str, timeframe: str) -> list:
+        keys = self.partitions(instrument, timeframe)
+        if not keys:
+            return []
+        with open(os.path.join(self._partition_dir(instrument, timeframe, keys[-1]), self.SCHEMA_FILE)) as f:
+            return json.load(f)['columns']
+
+    def coverage(self, instrument: str, timeframe: str):
+        """
+        (first, last) bar timestamps stored for a series, or None.
+        """
+        keys = self.partitions(instrument, timeframe)
+        if not keys:
+            return None
+        first = self._load_index(self._partition_dir(instrument, timeframe, keys[0]))
+        last = self._load_index(self._partition_dir(instrument, timeframe, keys[-1]))
+        if len(first) == 0 or len(last) == 0:
+            return None
+        return pd.Timestamp(first[0], tz='UTC'), pd.Timestamp(last[-1], tz='UTC')
+
+    def _load_index(self, part_dir: str) -> np.ndarray:
+        return np.load(os.path.join(part_dir, f"{self.INDEX}.npy"), mmap_mode='r')
+
+    def _read_partition(self, part_dir: str, columns=None) -> pd.DataFrame:
+        # Mapped, so only the requested columns are read into memory
+        arrays = self._read_arrays_partition(part_dir)
+        names = arrays.columns if columns is None else [c for c in arrays.columns if c in columns]
+        index = pd.DatetimeIndex(np.array(arrays.times).view('datetime64[ns]'), name=self.INDEX).tz_localize('UTC')
+        return pd.DataFrame({c: np.array(arrays.values(c)) for c in names}, index=index)
+
+    def _write_partition(self, part_dir: str, df: pd.DataFrame):
+        # Write to a sibling directory and swap in, so readers never see a half-written partition
+        tmp_dir = part_dir + '.tmp'
+        old_dir = part_dir + '.old'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        np.save(os.path.join(tmp_dir, f"{self.INDEX}.npy"), _index_to_ns(df.index))
+        labels = {}
+        for c in df.columns:
+            values = df[c].to_numpy()
+            if values.dtype == object:
+                values, labels[c] = encode_labels(values)
+            np.save(os.path.join(tmp_dir, f"{c}.npy"), values)
+        with open(os.path.join(tmp_dir, self.SCHEMA_FILE), 'w') as f:
+            json.dump({'columns': list(df.columns), 'labels': labels}, f)
+
+        if os.path.exists(part_dir):
+            os.replace(part_dir, old_dir)
+        os.replace(tmp_dir, part_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def write(self, instrument: str, timeframe: str, df: pd.DataFrame):
+        """
+        Merge bars into the store. Bars with an existing timestamp replace
+        the stored ones (keep last).
+        """
+        if df.empty:
+            return
+        df = df.copy()
+        df.index = _to_utc(df.index)
+        df.index.name = self.INDEX
+
+        with self._series_lock(instrument, timeframe):
+            shutil.rmtree(self._arrays_dir(instrument, timeframe), ignore_errors=True)
+            for key, part in df.groupby(self._partition_keys(df.index)):
+                part_dir = self._partition_dir(instrument, timeframe, key)
+                if os.path.exists(os.path.join(part_dir, self.SCHEMA_FILE)):
+                    part = pd.concat([self._read_partition(part_dir), part])
+                part = part[~part.index.duplicated(keep='last')]
+                part = part.sort_index()
+                self._write_partition(part_dir, part)
+
+    def read(self, instrument: str, timeframe: str, start_date=None, end_date=None, columns=None) -> pd.DataFrame:
+        """
+        Load bars for [start_date, end_date] (inclusive calendar days, UTC).
+        """
+        start = _to_utc_timestamp(start_date) if start_date is not None else None
+        end = _to_utc_timestamp(end_date) + pd.Timedelta(days=1) if end_date is not None else None
+
+        first_key = self._partition_keys(pd.DatetimeIndex([start]))[0] if start is not None else None
+        last_key = self._partition_keys(pd.DatetimeIndex([end]))[0] if end is not None else None
+        
+        frames = []
+        for key in self.partitions(instrument, timeframe):
+            if first_key is not None and key < first_key:
+                continue
+            if last_key is not None and key > last_key:
+                continue
+            part_dir = self._partition_dir(instrument, timeframe, key)
+            index = self._load_index(part_dir)
+            lo = 0 if start is None else int(np.searchsorted(index, start.value, side='left'))
+            hi = len(index) if end is None else int(np.searchsorted(index, end.value, side='left'))
+            if lo >= hi:
+                continue
+            frames.append(self._read_partition(part_dir, columns).iloc[lo:hi])
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+    def has_arrays(self, instrument: str, timeframe: str) -> bool:
+        return os.path.exists(os.path.join(self._arrays_dir(instrument, timeframe), BarArrays.SCHEMA_FILE))
+
+    def write_arrays(self, instrument: str, timeframe: str, dtype=None) -> BarArrays:
+        """
+        Consolidate every partition of a series into one set of contiguous
+        arrays (float columns as dtype, e.g. np.float32; default unchanged).
+        Returns them memory-mapped.
+        """
+        with self._series_lock(instrument, timeframe):
+            return self._consolidate(instrument, timeframe, dtype)
+
+    def _consolidate(self, instrument: str, timeframe: str, dtype=None) -> BarArrays:
+        parts = [self._read_arrays_partition(self._partition_dir(instrument, timeframe, key))
+                 for key in self.partitions(instrument, timeframe)]
+        if not parts:
+            return None
+        columns = [c for c in parts[-1].columns if all(c in p for p in parts)]
+        data = {}
+        labels = {}
+        for c in columns:
+            if any(c in p.labels or p[c].dtype.kind == 'U' for p in parts):
+                # Label codes are per partition: re-code over the whole series
+                data[c], labels[c] = encode_labels(np.concatenate([p.values(c).astype(object) for p in parts]))
+                continue
+            values = np.concatenate([p[c] for p in parts])
+            data[c] = values.astype(dtype) if dtype is not None and values.dtype.kind == 'f' else values
+        arrays = BarArrays(np.concatenate([p.times for p in parts]), data, labels=labels)
+        return arrays.save(self._arrays_dir(instrument, timeframe))
+
+    def read_arrays(self, instrument: str, timeframe: str, start_date=None, end_date=None, columns=None) -> BarArrays:
+        """
+        Bars for [start_date, end_date] (inclusive calendar days, UTC) as
+        views of the memory-mapped consolidated arrays, consolidating the
+        series first if needed. None if the series has no bars.
+        """
+        if not self.has_data(instrument, timeframe):
+            return None
+        if not self.has_arrays(instrument, timeframe):
+            with self._series_lock(instrument, timeframe):
+                # Another process may have consolidated while we waited
+                if not self.has_arrays(instrument, timeframe) and self._consolidate(instrument, timeframe) is None:
+                    return None
+        arrays = BarArrays.open(self._arrays_dir(instrument, timeframe), columns=columns)
+        end = _to_utc_timestamp(end_date) + pd.Timedelta(days=1) if end_date is not None else None
+        return arrays.between(start_date, end)
+
+    def _read_arrays_partition(self, part_dir: str) -> BarArrays:
+        """
+        A partition's raw arrays (string columns still label-coded; partitions
+        written before label coding hold fixed-width strings instead).
+        """
+        with open(os.path.join(part_dir, self.SCHEMA_FILE)) as f:
+            schema = json.load(f)
+        times = self._load_index(part_dir)
+        data = {c: np.load(os.path.join(part_dir, f"{c}.npy"), mmap_mode='r') for c in schema['columns']}
+        return BarArrays(times, data, labels=schema.get('labels', {}))
+
+class TickStore(BarStore):
+    """
+    Cleaned ticks in the BarStore layout, under the 'tick' timeframe and
+    partitioned by UTC day: {root}/{instrument}/tick/{YYYYMMDD}/{column}.npy
+
+    locate() maps bar timestamps to tick offsets with a binary search on the
+    memory-mapped day index, and window() reads just those rows, so looking
+    at a few bars never loads a whole day of ticks.
+    """
+    TIMEFRAME = 'tick'
+    COLUMNS = ['Bid', 'Ask']
+
+    @staticmethod
+    def _partition_keys(index: pd.DatetimeIndex) -> np.ndarray:
+        """
+        Partition of each (UTC) timestamp: the day as YYYYMMDD.
+        """
+        return np.asarray(index.year * 10000 + index.month * 100 + index.day)
+
+    def has_ticks(self, instrument: str) -> bool:
+        return self.has_data(instrument, self.TIMEFRAME)
+
+    def write_ticks(self, instrument: str, ticks: pd.DataFrame):
+        """
+        Store cleaned ticks (bidPrice/askPrice columns, unique timestamps).
+        """
+        if ticks.empty:
+            return
+        self.write(instrument, self.TIMEFRAME, pd.DataFrame({
+            'Bid': ticks['bidPrice'].to_numpy(dtype=float),
+            'Ask': ticks['askPrice'].to_numpy(dtype=float)
+        }, index=ticks.index))
+
+    def read_ticks(self, instrument: str, start_date=None, end_date=None) -> pd.DataFrame:
+        return self.read(instrument, self.TIMEFRAME, start_date, end_date)
+
+    def locate(self, instrument: str, bar_times, bar_length: pd.Timedelta):
+        """
+        Tick offsets of bars [t, t + bar_length).
+        Returns (keys, lo, hi): the day partition of each bar and the row
+        range of its ticks there (lo == hi when no ticks are stored).
+        """
+        starts = _index_to_ns(pd.DatetimeIndex(bar_times))
+        ends = starts + pd.Timedelta(bar_length).value
+        keys = self._partition_keys(_to_utc(pd.DatetimeIndex(bar_times)))
+        lo = np.zeros(len(starts), dtype=np.int64)
+        hi = np.zeros(len(starts), dtype=np.int64)
+        
+        stored = set(self.partitions(instrument, self.TIMEFRAME))
+        for key in np.unique(keys):
+            if key not in stored:
+                continue
+            rows = keys == key
+            index = self._load_index(self._partition_dir(instrument, self.TIMEFRAME, key))
+            lo[rows] = np.searchsorted(index, starts[rows], side='left')
+            hi[rows] = np.searchsorted(index, ends[rows], side='left')
+        return keys, lo, hi
+
+    def window(self, instrument: str, key: int, lo: int, hi: int, columns=None) -> dict:
+        """
+        Rows [lo, hi) of one day partition as {column: array}, read through memory maps.
+        """
+        part_dir = self._partition_dir(instrument, self.TIMEFRAME, key)
+        return {
+            c: np.array(np.load(os.path.join(part_dir, f"{c}.npy"), mmap_mode='r')[lo:hi])
+            for c in (columns or self.COLUMNS)
+        }
+
+def _to_utc(index) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        return index.tz_localize('UTC')
+    return index.tz_convert('UTC')
+
+def _to_utc_timestamp(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        return ts.tz_localize('UTC')
+    return ts.tz_convert('UTC')
+
+def _index_to_ns(index: pd.DatetimeIndex) -> np.ndarray:
+    return _to_utc(index).tz_localize(None).as_unit('ns').asi8
@@ -1,9 +1,36 @@
 import pandas as pd
 import numpy as np
 from datetime import time
-from .indicators import calculate_atr, calculate_chop_index, find_swings_fractal, calculate_adx
+from dataclasses import dataclass
+from .indicators import IndicatorContext
 from .smc import detect_fvg, detect_liquidity_sweeps, detect_order_blocks, validate_displacement
 from .risk import get_risk_percentage, calculate_position_size
+from .zones import OrderBlockZones
+from .arrays import BarArrays
+from .profiling import span
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """
+    Tunable ILS 3.0 thresholds. Defaults are the spec values.
+    Displacement and sweep fields change feature columns (prepare_features);
+    the rest only change signal scoring and execution (score_signals).
+    """
+    displacement_atr: float = 1.5 # Displacement range >= x * ATR
+    body_ratio: float = 0.6 # Displacement body / range
+    sweep_tolerance_atr: float = 0.2 # Sweep close within x * ATR of the swing
+    sweep_lag: int = 5 # Bars a sweep may precede the displacement
+    stop_atr: float = 1.5 # Stop beyond the signal candle, in ATR
+    reward_risk: float = 3.0 # Take profit in R
+    chop_threshold: float = 61.8 # No trading above this CHOP...
+    adx_threshold: float = 20.0 # ...while ADX is below this
+
+DEFAULT_PARAMS = StrategyParams()
+
+# Fields that change feature columns; every other field only changes scoring
+DISPLACEMENT_FIELDS = ('displacement_atr', 'body_ratio')
+SWEEP_FIELDS = ('sweep_tolerance_atr',)
+FEATURE_FIELDS = DISPLACEMENT_FIELDS + SWEEP_FIELDS
 
 def check_killzone(timestamp) -> bool:
     """
@@ -82,61 +109,128 @@ def calculate_confluence_score(row, htf_bias: str = 'Neutral'):
         
     return score, breakdown
 
-def run_strategy(df: pd.DataFrame, account_equity: float = 10000.0, htf_bias = 'Neutral') -> pd.DataFrame:
+def _set_columns(out: pd.DataFrame, part: pd.DataFrame):
     """
-    Run the ILS 3.0 Strategy on a dataframe.
-    htf_bias: str or pd.Series/list aligned with df index.
+    Add a detector's columns to the output frame by position (no index join).
+    """
+    for c in part.columns:
+        out[c] = part[c].to_numpy()
+
+def prepare_features(df: pd.DataFrame, params: StrategyParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    Compute indicators and SMC features used by the signal engines.
+    One pass can be sliced and scored many times (score_signals).
+    df may be a BarArrays; its arrays are used in place, not copied.
+    Returns a new frame; df itself is neither copied nor modified.
     """
-    # 1. Indicators
-    df['ATR'] = calculate_atr(df, period=14)
-    df['Chop'] = calculate_chop_index(df)
-    df['ADX'] = calculate_adx(df)
+    if isinstance(df, BarArrays):
+        df = df.frame()
+    # Shallow copy shares the bar columns (copy-on-write); each feature is added once, in place
+    out = df.copy(deep=False)
+    
+    # 1. Indicators (true range and rolling windows are shared)
+    with span('indicators'):
+        ctx = IndicatorContext(df)
+        out['ATR'] = ctx.atr(period=14)
+        out['Chop'] = ctx.chop()
+        out['ADX'] = ctx.adx()
     
     # 2. SMC Detection
-    fvg_df = detect_fvg(df, atr_col='ATR')
-    df = df.join(fvg_df)
+    with span('fvg'):
+        fvg_df = detect_fvg(out, atr_col='ATR')
+        _set_columns(out, fvg_df)
     
     # Displacement
-    disp_df = validate_displacement(df, atr_col='ATR')
-    df = df.join(disp_df)
+    with span('displacement'):
+        _set_columns(out, validate_displacement(out, atr_col='ATR', range_atr=params.displacement_atr, body_ratio=params.body_ratio))
     
     # Swings needed for OB and Sweeps
-    swings_df = find_swings_fractal(df) # Should ideally be adaptive, using default for now
-    
-    sweeps_df = detect_liquidity_sweeps(df, swing_lookback=5, atr_col='ATR')
-    df = df.join(sweeps_df)
+    with span('swings'):
+        swings_df = ctx.swings() # Should ideally be adaptive, using default for now
     
-    ob_df = detect_order_blocks(df, fvg_df, swings_df)
-    df = df.join(ob_df)
+    with span('sweeps'):
+        _set_columns(out, detect_liquidity_sweeps(out, swing_lookback=5, atr_col='ATR', tolerance_atr=params.sweep_tolerance_atr))
     
+    with span('order_blocks'):
+        _set_columns(out, detect_order_blocks(out, fvg_df, swings_df))
+    return out
+
+def run_strategy(df: pd.DataFrame, account_equity: float = 10000.0, htf_bias = 'Neutral', engine: str = 'loop', params: StrategyParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    Run the ILS 3.0 Strategy on a dataframe.
+    df: bars as a DataFrame or BarArrays (never modified).
+    htf_bias: str or pd.Series/list aligned with df index.
+    engine: 'loop' (per-bar reference) or 'vectorized' (columnar, identical output).
+    """
+    if engine not in ('loop', 'vectorized'):
+        raise ValueError(f"Unknown signal engine: {engine}")
+        
+    with span('features'):
+        df = prepare_features(df, params)
+    with span('scoring'):
+        return score_signals(df, account_equity, htf_bias, engine, params)
+
+def killzone_flags(index) -> np.ndarray:
+    """
+    check_killzone() for every timestamp of an index, on the wall-clock time of day.
+    """
+    if not isinstance(index, pd.DatetimeIndex):
+        try:
+            index = pd.to_datetime(index)
+        except:
+            return np.zeros(len(index), dtype=bool)
+    seconds = (index.hour * 60 + index.minute) * 60 + index.second
+    # Boundaries are inclusive to the nanosecond, as with datetime.time comparison
+    exact = np.asarray((index.microsecond == 0) & (index.nanosecond == 0))
+    seconds = np.asarray(seconds)
+    london = (seconds >= 7 * 3600) & ((seconds < 10 * 3600) | ((seconds == 10 * 3600) & exact))
+    ny_close = (seconds >= 12 * 3600) & ((seconds < 17 * 3600) | ((seconds == 17 * 3600) & exact))
+    return london | ny_close
+
+def score_signals(df: pd.DataFrame, account_equity: float = 10000.0, htf_bias = 'Neutral', engine: str = 'loop', params: StrategyParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    Signals, scores and execution levels from a prepare_features() frame.
+    The first 100 bars of df are warmup and never signal.
+    Returns df's columns plus the score columns; df is not copied or modified.
+    """
+    if engine not in ('loop', 'vectorized'):
+        raise ValueError(f"Unknown signal engine: {engine}")
+    if isinstance(df, BarArrays):
+        df = df.frame()
+        
     # 3. Signals & Scoring
-    results = df.copy()
-    results['Signal'] = None
-    results['Tier_Score'] = 0
-    results['Score_HTF'] = 0
-    results['Score_Disp'] = 0
-    results['Score_Liq'] = 0
-    results['Score_Context'] = 0
-    results['Risk_Units'] = 0.0
-    results['Entry_Price'] = np.nan
-    results['Stop_Loss'] = np.nan
-    results['Take_Profit'] = np.nan
-    results['HTF_Bias'] = htf_bias
+    # Shallow copy shares the feature columns; score columns are added to it only
+    results = df.copy(deep=False)
     
     # Killzones
-    # Ensure index is datetime
-    if not isinstance(df.index, pd.DatetimeIndex):
-        try:
-            df.index = pd.to_datetime(df.index)
-        except:
-            pass 
-            
-    is_killzone = pd.Series([check_killzone(t) for t in df.index], index=df.index)
-    results['In_Killzone'] = is_killzone
-    results['Near_POI'] = False
+    with span('killzones'):
+        is_killzone = killzone_flags(df.index)
     
-    active_bull_obs = [] 
-    active_bear_obs = []
+    with span('signals'):
+        if engine == 'vectorized':
+            return _generate_signals_vectorized(df, results, htf_bias, is_killzone, account_equity, params)
+        
+        results['Signal'] = None
+        results['Tier_Score'] = 0
+        results['Score_HTF'] = 0
+        results['Score_Disp'] = 0
+        results['Score_Liq'] = 0
+        results['Score_Context'] = 0
+        results['Risk_Units'] = 0.0
+        results['Entry_Price'] = np.nan
+        results['Stop_Loss'] = np.nan
+        results['Take_Profit'] = np.nan
+        results['HTF_Bias'] = htf_bias
+        results['In_Killzone'] = is_killzone
+        results['Near_POI'] = False
+        return _generate_signals_loop(df, results, account_equity, params)
+
+def _generate_signals_loop(df: pd.DataFrame, results: pd.DataFrame, account_equity: float, params: StrategyParams = DEFAULT_PARAMS) -> pd.DataFrame:
+    """
+    Reference per-bar signal engine.
+    """
+    bull_zones = OrderBlockZones(bullish=True)
+    bear_zones = OrderBlockZones(bullish=False)
     
     for i in range(len(df)):
         if i < 100: continue # Warmup
@@ -145,39 +239,21 @@ def run_strategy(df: pd.DataFrame, account_equity: float = 10000.0, htf_bias = '
         
         # 1. Update Active OBs
         if row['OB_Bullish']:
-            active_bull_obs.append({'top': row['High'], 'bottom': row['Low']})
+            bull_zones.add(row['High'], row['Low'])
         if row['OB_Bearish']:
-            active_bear_obs.append({'top': row['High'], 'bottom': row['Low']})
+            bear_zones.add(row['High'], row['Low'])
             
         # 2. Check Near POI & Invalidation
-        near_poi = False
-        
-        # Bullish OBs
-        # Keep valid: Close >= bottom
-        # Near: Low <= top
-        next_active_bull = []
-        for ob in active_bull_obs:
-            if row['Close'] >= ob['bottom']:
-                next_active_bull.append(ob)
-                if row['Low'] <= ob['top']:
-                    near_poi = True
-        active_bull_obs = next_active_bull
-        
-        # Bearish OBs
-        # Keep valid: Close <= top
-        # Near: High >= bottom
-        next_active_bear = []
-        for ob in active_bear_obs:
-            if row['Close'] <= ob['top']:
-                next_active_bear.append(ob)
-                if row['High'] >= ob['bottom']:
-                    near_poi = True
-        active_bear_obs = next_active_bear
+        # Bullish OBs: keep valid while Close >= bottom, near when Low <= top
+        # Bearish OBs: keep valid while Close <= top, near when High >= bottom
+        bull_zones.invalidate(row['Close'])
+        bear_zones.invalidate(row['Close'])
+        near_poi = bull_zones.touched(row['Low']) or bear_zones.touched(row['High'])
         
         results.at[df.index[i], 'Near_POI'] = near_poi
         
         # Regime Filter: If CHOP > 61.8 AND ADX < 20 -> NO TRADING
-        if row['Chop'] > 61.8 and row['ADX'] < 20:
+        if row['Chop'] > params.chop_threshold and row['ADX'] < params.adx_threshold:
             continue
             
         signal_detected = False
@@ -188,14 +264,14 @@ def run_strategy(df: pd.DataFrame, account_equity: float = 10000.0, htf_bias = '
         # Bearish Setup
         if row['Displacement_Bearish']:
             # Check for recent Bearish Sweep
-            start_idx = max(0, i - 5)
+            start_idx = max(0, i - params.sweep_lag)
             if df['Sweep_Bearish'].iloc[start_idx:i+1].any():
                 signal_detected = True
                 direction = 'Short'
                 
         # Bullish Setup
         elif row['Displacement_Bullish']:
-            start_idx = max(0, i - 5)
+            start_idx = max(0, i - params.sweep_lag)
             if df['Sweep_Bullish'].iloc[start_idx:i+1].any():
                  signal_detected = True
                  direction = 'Long'
@@ -224,13 +300,13 @@ def run_strategy(df: pd.DataFrame, account_equity: float = 10000.0, htf_bias = '
                 atr_val = row['ATR']
                 
                 if direction == 'Long':
-                    stop_loss = row['Low'] - (1.5 * atr_val)
+                    stop_loss = row['Low'] - (params.stop_atr * atr_val)
                     risk = entry_price - stop_loss
-                    take_profit = entry_price + (risk * 3.0) 
+                    take_profit = entry_price + (risk * params.reward_risk) 
                 else:
-                    stop_loss = row['High'] + (1.5 * atr_val)
+                    stop_loss = row['High'] + (params.stop_atr * atr_val)
                     risk = stop_loss - entry_price
-                    take_profit = entry_price - (risk * 3.0) 
+                    take_profit = entry_price - (risk * params.reward_risk) 
                 
                 dist = abs(entry_price - stop_loss)
                 units = calculate_position_size(account_equity, risk_pct, dist)
@@ -241,3 +317,113 @@ def run_strategy(df: pd.DataFrame, account_equity: float = 10000.0, htf_bias = '
                 results.at[df.index[i], 'Risk_Units'] = units
 
     return results
+
+def _recent_any(flags: np.ndarray, window: int) -> np.ndarray:
+    """
+    True where any flag is set in [i - window, i].
+    """
+    counts = np.cumsum(flags.astype(np.int64))
+    lagged = np.concatenate([np.zeros(window + 1, dtype=np.int64), counts[:-(window + 1)]])[:len(counts)]
+    return (counts - lagged) > 0
+
+def _near_poi_flags(high, low, close, ob_bull, ob_bear, warmup: int = 100) -> np.ndarray:
+    """
+    Near_POI per bar from the running set of unmitigated order blocks.
+    OBs are tracked from the warmup bar onwards, matching the loop engine.
+    """
+    near = np.zeros(len(close), dtype=bool)
+    bull_zones = OrderBlockZones(bullish=True)
+    bear_zones = OrderBlockZones(bullish=False)
+    
+    for i in range(warmup, len(close)):
+        if ob_bull[i]:
+            bull_zones.add(high[i], low[i])
+        if ob_bear[i]:
+            bear_zones.add(high[i], low[i])
+            
+        bull_zones.invalidate(close[i])
+        bear_zones.invalidate(close[i])
+        near[i] = bull_zones.touched(low[i]) or bear_zones.touched(high[i])
+        
+    return near
+
+def _generate_signals_vectorized(df: pd.DataFrame, results: pd.DataFrame, htf_bias, is_killzone: np.ndarray, account_equity: float, params: StrategyParams = DEFAULT_PARAMS, warmup: int = 100) -> pd.DataFrame:
+    """
+    Columnar signal engine. Produces the same frame as the loop engine
+    using whole-array operations; each output column is written once.
+    """
+    n = len(df)
+    high = df['High'].to_numpy(dtype=float)
+    low = df['Low'].to_numpy(dtype=float)
+    close = df['Close'].to_numpy(dtype=float)
+    atr = df['ATR'].to_numpy(dtype=float)
+    chop = df['Chop'].to_numpy(dtype=float)
+    adx = df['ADX'].to_numpy(dtype=float)
+    
+    near_poi = _near_poi_flags(
+        high, low, close,
+        df['OB_Bullish'].to_numpy(dtype=bool), df['OB_Bearish'].to_numpy(dtype=bool),
+        warmup=warmup
+    )
+    
+    # Regime Filter: If CHOP > 61.8 AND ADX < 20 -> NO TRADING
+    tradable = (np.arange(n) >= warmup) & ~((chop > params.chop_threshold) & (adx < params.adx_threshold))
+    
+    # Valid MSS requires: Prior Liquidity Sweep + Valid Displacement (Allowing 5 bar lag)
+    sweep_bull = df['Sweep_Bullish'].to_numpy(dtype=bool)
+    sweep_bear = df['Sweep_Bearish'].to_numpy(dtype=bool)
+    disp_bull = df['Displacement_Bullish'].to_numpy(dtype=bool)
+    disp_bear = df['Displacement_Bearish'].to_numpy(dtype=bool)
+    
+    # Bearish displacement takes precedence over bullish on the same bar
+    is_short = tradable & disp_bear & _recent_any(sweep_bear, params.sweep_lag)
+    is_long = tradable & ~disp_bear & disp_bull & _recent_any(sweep_bull, params.sweep_lag)
+    
+    # Confluence Score (see calculate_confluence_score)
+    bias_col = htf_bias.reindex(df.index) if isinstance(htf_bias, pd.Series) else pd.Series(htf_bias, index=df.index)
+    bias = bias_col.to_numpy(dtype=object)
+    fvg_bull = df['FVG_Bullish'].to_numpy(dtype=bool)
+    fvg_bear = df['FVG_Bearish'].to_numpy(dtype=bool)
+    # Scoring reads the feature frame, which only carries In_Killzone if the caller supplied it
+    kz = df['In_Killzone'].to_numpy(dtype=bool) if 'In_Killzone' in df.columns else np.zeros(n, dtype=bool)
+    
+    aligned = ((bias == 'Bullish') & is_long) | ((bias == 'Bearish') & is_short)
+    score_htf = np.where(aligned, 25, 0) + np.where(near_poi, 15, 0)
+    score_disp = 10 + np.where((is_long & fvg_bull) | (is_short & fvg_bear), 10, 0)
+    score_liq = np.where(sweep_bull | sweep_bear, 15, 0)
+    score_ctxt = np.where(kz, 10, 0) + np.where(chop < 50, 5, 0)
+    score = score_htf + score_disp + score_liq + score_ctxt
+    
+    risk_pct = np.zeros(n)
+    candidates = np.flatnonzero(is_short | is_long)
+    risk_pct[candidates] = [get_risk_percentage(int(s)) for s in score[candidates]]
+    entered = (is_short | is_long) & (risk_pct > 0)
+    
+    # Execution details
+    stop_loss = np.where(is_long, low - (params.stop_atr * atr), high + (params.stop_atr * atr))
+    risk = np.where(is_long, close - stop_loss, stop_loss - close)
+    take_profit = np.where(is_long, close + (risk * params.reward_risk), close - (risk * params.reward_risk))
+    dist = np.abs(close - stop_loss)
+    units = np.zeros(n)
+    sized = entered & (dist > 0)
+    units[sized] = (account_equity * risk_pct[sized]) / dist[sized]
+    
+    signal = np.full(n, None, dtype=object)
+    signal[entered & is_long] = 'Long'
+    signal[entered & is_short] = 'Short'
+    
+    results['Signal'] = pd.Series(signal, index=results.index, dtype=object)
+    results['Tier_Score'] = np.where(entered, score, 0).astype(np.int64)
+    results['Score_HTF'] = np.where(entered, score_htf, 0).astype(np.int64)
+    results['Score_Disp'] = np.where(entered, score_disp, 0).astype(np.int64)
+    results['Score_Liq'] = np.where(entered, score_liq, 0).astype(np.int64)
+    results['Score_Context'] = np.where(entered, score_ctxt, 0).astype(np.int64)
+    results['Risk_Units'] = units
+    results['Entry_Price'] = np.where(entered, close, np.nan)
+    results['Stop_Loss'] = np.where(entered, stop_loss, np.nan)
+    results['Take_Profit'] = np.where(entered, take_profit, np.nan)
+    results['HTF_Bias'] = bias_col
+    results['In_Killzone'] = is_killzone
+    results['Near_POI'] = near_poi
+    
+    return results
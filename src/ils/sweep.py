@@ -0,0 +1,123 @@
+import pandas as pd
+import itertools
+from dataclasses import asdict, fields, replace
+from concurrent.futures import ProcessPoolExecutor
+from .strategy import StrategyParams, DEFAULT_PARAMS, DISPLACEMENT_FIELDS, SWEEP_FIELDS, FEATURE_FIELDS, prepare_features, score_signals
+from .smc import validate_displacement, detect_liquidity_sweeps, swing_levels
+from .backtest import TradeManager
+from .metrics import calculate_metrics
+from .arrays import BarArrays, shared_frame
+
+# Parameter perturbation (ILS 17.6).
+
+def param_grid(base: StrategyParams = DEFAULT_PARAMS, **values) -> list:
+    """
+    StrategyParams for every combination of the given field values; other
+    fields come from base. param_grid(stop_atr=[1.0, 1.5], reward_risk=[2, 3])
+    gives 4 points.
+    """
+    names = {f.name for f in fields(StrategyParams)}
+    unknown = sorted(set(values) - names)
+    if unknown:
+        raise ValueError(f"Unknown strategy parameters: {unknown}")
+    keys = list(values)
+    return [replace(base, **dict(zip(keys, combo))) for combo in itertools.product(*(values[k] for k in keys))]
+
+def _feature_key(params: StrategyParams):
+    return tuple(getattr(params, f) for f in FEATURE_FIELDS)
+
+class SharedFeatures:
+    """
+    Features for many parameter sets from one pass over the bars.
+    ATR, CHOP, ADX, FVG, swings and order blocks are computed once;
+    displacement and sweep columns are computed once per distinct value of
+    their parameters (sweeps reuse the swing levels) and then cached.
+    """
+    def __init__(self, df: pd.DataFrame, base: StrategyParams = DEFAULT_PARAMS):
+        self.base = base
+        self.features = prepare_features(df, base)
+        self.levels = swing_levels(self.features, 5)
+        self._displacement = {}
+        self._sweeps = {}
+
+    def mapped(self, arrays: BarArrays):
+        """
+        Copy of self whose features are the given (memory-mapped) arrays of
+        the same frame and with empty variant caches, for sending to pool workers.
+        """
+        other = SharedFeatures.__new__(SharedFeatures)
+        other.__dict__.update(base=self.base, features=arrays, levels=self.levels, _displacement={}, _sweeps={})
+        return other
+
+    def _columns(self, cache, key, compute):
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    def for_params(self, params: StrategyParams) -> pd.DataFrame:
+        """
+        Feature frame for params. Shares every unchanged column with the base frame.
+        """
+        disp_key = tuple(getattr(params, f) for f in DISPLACEMENT_FIELDS)
+        sweep_key = tuple(getattr(params, f) for f in SWEEP_FIELDS)
+        base_disp = tuple(getattr(self.base, f) for f in DISPLACEMENT_FIELDS)
+        base_sweep = tuple(getattr(self.base, f) for f in SWEEP_FIELDS)
+        if disp_key == base_disp and sweep_key == base_sweep:
+            return self.features
+
+        df = self.features.copy(deep=False)
+        if disp_key != base_disp:
+            disp = self._columns(self._displacement, disp_key, lambda: validate_displacement(
+                self.features, atr_col='ATR', range_atr=params.displacement_atr, body_ratio=params.body_ratio))
+            df[disp.columns] = disp
+        if sweep_key != base_sweep:
+            sweeps = self._columns(self._sweeps, sweep_key, lambda: detect_liquidity_sweeps(
+                self.features, atr_col='ATR', tolerance_atr=params.sweep_tolerance_atr, levels=self.levels))
+            df[sweeps.columns] = sweeps
+        return df
+
+def evaluate(shared: SharedFeatures, params: StrategyParams, htf_bias='Neutral', initial_balance: float = 25000.0) -> dict:
+    """
+    Backtest metrics (see calculate_metrics) of one parameter set.
+    """
+    results = score_signals(shared.for_params(params), initial_balance, htf_bias, engine='vectorized', params=params)
+    manager = TradeManager(initial_equity=initial_balance)
+    manager.simulate(results)
+    return calculate_metrics(manager.get_results_df(), initial_balance)
+
+# Per-process view of the shared features, set once by the pool initializer
+_WORKER_DATA = {}
+
+def _init_worker(shared, htf_bias, initial_balance):
+    if isinstance(shared.features, BarArrays):
+        shared.features = shared.features.frame()
+    _WORKER_DATA['args'] = (shared, htf_bias, initial_balance)
+
+def _evaluate_worker(params):
+    shared, htf_bias, initial_balance = _WORKER_DATA['args']
+    return evaluate(shared, params, htf_bias, initial_balance)
+
+def run_sweep(shared: SharedFeatures, grid: list, htf_bias='Neutral', initial_balance: float = 25000.0, workers: int = 1) -> pd.DataFrame:
+    """
+    Evaluate every parameter set of grid. With workers > 1 the grid runs in a
+    process pool; the shared features are spilled to memory-mapped arrays
+    once and every worker maps the same copy.
+    Points are dispatched grouped by their feature parameters so each worker
+    computes a displacement/sweep variant once and reuses it.
+    Returns one row per grid point (in grid order): parameters then metrics.
+    """
+    order = sorted(range(len(grid)), key=lambda k: _feature_key(grid[k]))
+    ordered = [grid[k] for k in order]
+    if workers and workers > 1 and len(grid) > 1:
+        chunk = max(1, len(grid) // (4 * workers))
+        with shared_frame(shared.features) as arrays:
+            initargs = (shared.mapped(arrays), htf_bias, initial_balance)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                metrics = list(pool.map(_evaluate_worker, ordered, chunksize=chunk))
+    else:
+        metrics = [evaluate(shared, params, htf_bias, initial_balance) for params in ordered]
+
+    rows = [None] * len(grid)
+    for k, params, m in zip(order, ordered, metrics):
+        rows[k] = {**asdict(params), **m}
+    return pd.DataFrame(rows, index=pd.RangeIndex(len(rows), name='Run'))
@@ -0,0 +1,171 @@
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .strategy import score_signals
+from .backtest import TradeManager
+from .metrics import calculate_metrics
+from .portfolio import SIZE_FIELDS, run_portfolio
+from .arrays import BarArrays, shared_frame
+
+# Walk-forward validation (ILS 17.6).
+# Features are computed once for the whole range; every window slices them,
+# re-scores its own bars and simulates them. Each window's bars are preceded
+# by WARMUP_BARS of history so signals can start right at the window start.
+WARMUP_BARS = 100
+
+# Columns the trade simulator reads beyond the scored window (exits only)
+EXIT_COLUMNS = ['High', 'Low', 'Close', 'Bid_High', 'Bid_Low', 'Ask_High', 'Ask_Low', 'ATR']
+
+def walk_forward_windows(start_date, end_date, train_months: int = 12, test_months: int = 12):
+    """
+    Rolling (train_start, train_end, test_start, test_end) windows, stepped by
+    the test length so out-of-sample periods never overlap. Ends are exclusive;
+    end_date is an inclusive day and the last test window is clipped to it.
+    """
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    train = pd.DateOffset(months=train_months)
+    test = pd.DateOffset(months=test_months)
+
+    windows = []
+    train_start = start
+    while train_start + train < end:
+        test_start = train_start + train
+        windows.append((train_start, test_start, test_start, min(test_start + test, end)))
+        train_start = train_start + test
+    return windows
+
+def _bounds(index: pd.DatetimeIndex, start, end):
+    """
+    Positions [lo, hi) of the bars in [start, end).
+    """
+    tz = index.tz
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if tz is not None:
+        start = start.tz_localize(tz) if start.tzinfo is None else start.tz_convert(tz)
+        end = end.tz_localize(tz) if end.tzinfo is None else end.tz_convert(tz)
+    return index.searchsorted(start), index.searchsorted(end)
+
+def period_trades(features: pd.DataFrame, htf_bias, start, end, initial_balance: float = 25000.0, warmup: int = WARMUP_BARS):
+    """
+    Trades entered in [start, end), scored from precomputed features.
+    Trades still open at `end` run on through the later bars until they exit.
+    """
+    lo, hi = _bounds(features.index, start, end)
+    if hi <= lo:
+        return pd.DataFrame()
+    first = max(0, lo - warmup)
+    bias = htf_bias if isinstance(htf_bias, str) else list(htf_bias[first:hi])
+    results = score_signals(features.iloc[first:hi], account_equity=initial_balance, htf_bias=bias, engine='vectorized')
+
+    # Exits may land after the period: append the later bars without signals
+    if hi < len(features):
+        tail = features.iloc[hi:][[c for c in EXIT_COLUMNS if c in features.columns]]
+        results = pd.concat([results, tail])
+
+    manager = TradeManager(initial_equity=initial_balance)
+    manager.simulate(results)
+    return manager.get_results_df()
+
+def run_window(features: pd.DataFrame, htf_bias, window, initial_balance: float = 25000.0):
+    """
+    (in-sample trades, out-of-sample trades) of one walk-forward window.
+    Each period starts from initial_balance.
+    """
+    train_start, train_end, test_start, test_end = window
+    train = period_trades(features, htf_bias, train_start, train_end, initial_balance)
+    test = period_trades(features, htf_bias, test_start, test_end, initial_balance)
+    return train, test
+
+# Per-process view of the shared features, set once by the pool initializer
+_WORKER_DATA = {}
+
+def _init_worker(features, htf_bias, initial_balance):
+    if isinstance(features, BarArrays):
+        features = features.frame()
+    _WORKER_DATA['args'] = (features, htf_bias)
+    _WORKER_DATA['initial_balance'] = initial_balance
+
+def _run_window_worker(window):
+    features, htf_bias = _WORKER_DATA['args']
+    return run_window(features, htf_bias, window, _WORKER_DATA['initial_balance'])
+
+def _fixed_sized(trades: pd.DataFrame, initial_balance: float) -> pd.DataFrame:
+    """
+    One period's trades re-sized as if every entry saw initial_balance with
+    the circuit breaker off, undoing TradeManager's equity-aware sizing
+    (equity at entry = initial_balance plus the PnL of exits up to then).
+    """
+    exits = trades['exit_time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    entries = trades['entry_time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    order = np.argsort(exits, kind='stable')
+    realized = np.concatenate([[0.0], np.cumsum(trades['pnl'].to_numpy(dtype=float)[order])])
+    equity = initial_balance + realized[np.searchsorted(exits[order], entries, side='right')]
+    breaker = np.where(trades['circuit_breaker'].to_numpy() == 1, 0.5, 1.0)
+    scale = initial_balance / (equity * breaker)
+    
+    fixed = trades.copy()
+    for col in SIZE_FIELDS:
+        fixed[col] = fixed[col].to_numpy(dtype=float) * scale
+    return fixed
+
+def stitch_oos(test_trades: list, initial_balance: float = 25000.0):
+    """
+    Chain the out-of-sample trades of consecutive windows into one account.
+    Trades still open at a window's end overlap the next window, so the
+    windows are merged by time as in run_portfolio: each entry is sized
+    from the equity realized before it (fixed fractional sizing is linear
+    in equity) and the curve follows the exits in time order.
+    Returns (trades in exit order with 'window' and 'equity_at_entry' columns,
+    equity curve by exit time).
+    """
+    frames = {k: _fixed_sized(trades, initial_balance) for k, trades in enumerate(test_trades) if not trades.empty}
+    if not frames:
+        return pd.DataFrame(), pd.DataFrame(columns=['Equity', 'Drawdown', 'Window'])
+
+    trades, _ = run_portfolio(frames, initial_equity=initial_balance)
+    trades = trades.rename(columns={'instrument': 'window'})
+    curve = initial_balance + trades['pnl'].cumsum().to_numpy()
+    peak = np.maximum.accumulate(np.maximum(curve, initial_balance))
+    equity_df = pd.DataFrame({
+        'Equity': curve,
+        'Drawdown': (curve - peak) / peak * 100,
+        'Window': trades['window'].to_numpy()
+    }, index=pd.DatetimeIndex(trades['exit_time'], name='date'))
+    return trades, equity_df
+
+def window_table(windows: list, results: list, initial_balance: float = 25000.0) -> pd.DataFrame:
+    """
+    One row per window: dates plus in-sample (IS) and out-of-sample (OOS) metrics.
+    """
+    keys = ['Total Trades', 'Win Rate (%)', 'Return (%)', 'Max Drawdown (%)', 'Profit Factor', 'Sharpe Ratio']
+    rows = []
+    for (train_start, train_end, test_start, test_end), (train, test) in zip(windows, results):
+        row = {
+            'Train Start': train_start.date(), 'Train End': (train_end - pd.Timedelta(days=1)).date(),
+            'Test Start': test_start.date(), 'Test End': (test_end - pd.Timedelta(days=1)).date()
+        }
+        for label, trades in [('IS', train), ('OOS', test)]:
+            metrics = calculate_metrics(trades, initial_balance)
+            for k in keys:
+                row[f"{label} {k}"] = metrics[k]
+        rows.append(row)
+    return pd.DataFrame(rows, index=pd.RangeIndex(len(rows), name='Window'))
+
+def walk_forward(features: pd.DataFrame, htf_bias, windows: list, initial_balance: float = 25000.0, workers: int = 1):
+    """
+    Run every window on one set of precomputed features (strategy.prepare_features).
+    With workers > 1 the windows run in a process pool; the features are
+    spilled to memory-mapped arrays once and every worker maps the same copy.
+    Returns (per-window table, stitched OOS trades, stitched OOS equity curve).
+    """
+    if workers and workers > 1 and len(windows) > 1:
+        with shared_frame(features) as arrays:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(arrays, htf_bias, initial_balance)) as pool:
+                results = list(pool.map(_run_window_worker, windows))
+    else:
+        results = [run_window(features, htf_bias, w, initial_balance) for w in windows]
+
+    table = window_table(windows, results, initial_balance)
+    oos_trades, oos_equity = stitch_oos([test for train, test in results], initial_balance)
+    return table, oos_trades, oos_equity
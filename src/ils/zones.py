@@ -0,0 +1,87 @@
+import numpy as np
+
+class OrderBlockZones:
+    """
+    Live Order Block zones for one side, kept in sorted arrays.
+
+    Bullish OB: valid while Close >= bottom, touched when Low <= top.
+    Bearish OB: valid while Close <= top, touched when High >= bottom.
+
+    Bearish zones are stored with negated prices so both sides share the
+    same rule: zones are sorted by their invalidation bound (key), a close
+    past that bound drops a suffix of the array, and a prefix max of the
+    opposite bound (reach) answers "is price touching any live zone".
+    """
+    def __init__(self, bullish: bool = True, capacity: int = 64):
+        self.bullish = bullish
+        self._sign = 1.0 if bullish else -1.0
+        self._keys = np.empty(capacity)
+        self._reach = np.empty(capacity)
+        self._reach_max = np.empty(capacity)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        capacity = 2 * len(self._keys)
+        for name in ('_keys', '_reach', '_reach_max'):
+            arr = np.empty(capacity)
+            arr[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, arr)
+
+    def add(self, top: float, bottom: float):
+        """
+        Register a new zone. Zones with undefined bounds can never stay
+        valid and are ignored.
+        """
+        if np.isnan(top) or np.isnan(bottom):
+            return
+        if self._size == len(self._keys):
+            self._grow()
+
+        if self.bullish:
+            key, reach = bottom, top
+        else:
+            key, reach = -top, -bottom
+
+        n = self._size
+        pos = int(np.searchsorted(self._keys[:n], key, side='right'))
+        self._keys[pos + 1:n + 1] = self._keys[pos:n]
+        self._reach[pos + 1:n + 1] = self._reach[pos:n]
+        self._keys[pos] = key
+        self._reach[pos] = reach
+        self._size = n + 1
+
+        # Prefix max only changes from the insertion point onwards
+        start = self._reach_max[pos - 1] if pos > 0 else -np.inf
+        self._reach_max[pos:n + 1] = np.maximum.accumulate(
+            np.maximum(self._reach[pos:n + 1], start)
+        )
+
+    def invalidate(self, close: float):
+        """
+        Drop every zone mitigated by this close.
+        """
+        if np.isnan(close):
+            self._size = 0
+            return
+        self._size = int(np.searchsorted(self._keys[:self._size], self._sign * close, side='right'))
+
+    def touched(self, price: float) -> bool:
+        """
+        True if price reaches any live zone (Low for bullish, High for bearish).
+        """
+        if self._size == 0:
+            return False
+        return bool(self._reach_max[self._size - 1] >= self._sign * price)
+
+    def zones(self):
+        """
+        Live zones as (top, bottom) arrays.
+        """
+        keys = self._keys[:self._size]
+        reach = self._reach[:self._size]
+        if self.bullish:
+            return reach.copy(), keys.copy()
+        return -keys, -reach
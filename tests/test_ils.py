@@ -3,13 +3,33 @@ import pandas as pd
 import numpy as np
 import sys
 import os
+import datetime
+import json
 
 # Ensure we can import src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from ils.indicators import calculate_atr
-from ils.smc import detect_fvg, detect_liquidity_sweeps
+from ils.smc import detect_fvg, detect_liquidity_sweeps, detect_liquidity_sweeps_adaptive, detect_order_blocks
+from ils.indicators import find_swings_fractal, calculate_adaptive_lookback, IndicatorContext, StreamingIndicators
 from ils.risk import calculate_position_size, get_risk_percentage
+from ils.strategy import run_strategy, prepare_features, StrategyParams
+from ils.zones import OrderBlockZones
+from ils.store import BarStore, TickStore
+from ils.backtest import TradeManager, TradeBook, TickExitResolver, TRADE_FIELDS
+from ils.engine import ReplayEngine, StrategyEngine, TickReplayer, BAR_COLUMNS
+from ils.portfolio import run_portfolio
+from ils.metrics import calculate_metrics, monte_carlo
+from ils.walkforward import walk_forward, walk_forward_windows, period_trades, stitch_oos
+from ils.sweep import SharedFeatures, param_grid, run_sweep
+from benchmarks.synthetic import synthetic_bars as synthetic_bars_for_benchmark, write_tick_csv
+from benchmarks.suite import run_case
+from ils.profiling import profiling, span as profiling_span
+from ils.cache import FeatureCache
+from ils.arrays import BarArrays
+from backtest_runner import simulate_instrument, monte_carlo_from_config
+from process_data import BarSink, process_single_file, clean_ticks, aggregate_ticks, aggregate_timeframes, process_data, pending_sources, ProcessingManifest
 
 @pytest.fixture
 def sample_data():
@@ -23,12 +43,63 @@ def sample_data():
     }
     return pd.DataFrame(data, index=idx)
 
+@pytest.fixture
+def synthetic_bars():
+    # Seeded 5min random walk with occasional large candles so that
+    # displacement, sweeps and order blocks all fire.
+    n = 4000
+    rng = np.random.default_rng(7)
+    idx = pd.date_range('2024-01-01', periods=n, freq='5min')
+    shocks = rng.normal(0, 1.0, n) * np.where(rng.random(n) < 0.08, 5.0, 1.0)
+    close = 100 + np.cumsum(shocks)
+    open_ = np.concatenate([[100.0], close[:-1]])
+    wick = rng.exponential(0.4, (2, n))
+    data = {
+        'Open': open_,
+        'High': np.maximum(open_, close) + wick[0],
+        'Low': np.minimum(open_, close) - wick[1],
+        'Close': close
+    }
+    return pd.DataFrame(data, index=idx)
+
+@pytest.fixture
+def tick_file(tmp_path):
+    # Seeded bid/ask ticks spanning a UTC day boundary, with duplicate timestamps
+    n = 20000
+    rng = np.random.default_rng(11)
+    ts = pd.Timestamp('2024-03-04 20:00', tz='UTC').value // 10**6 + np.cumsum(rng.integers(0, 1500, n))
+    mid = 1.1 + np.cumsum(rng.normal(0, 2e-5, n))
+    spread = np.abs(rng.normal(1e-4, 2e-5, n))
+    path = tmp_path / 'EURUSD_ticks.csv'
+    pd.DataFrame({
+        'timestamp': ts,
+        'askPrice': mid + spread / 2,
+        'bidPrice': mid - spread / 2,
+        'askVolume': rng.random(n),
+        'bidVolume': rng.random(n)
+    }).to_csv(path, index=False)
+    return str(path)
+
 def test_atr(sample_data):
     atr = calculate_atr(sample_data, period=3)
     assert not atr.isnull().all()
     # First few should be nan
     assert np.isnan(atr.iloc[0])
 
+def test_indicator_context_shares_true_range(synthetic_bars):
+    ctx = IndicatorContext(synthetic_bars)
+    tr = ctx.true_range
+    
+    ctx.atr(14)
+    ctx.chop(14)
+    ctx.adx(14)
+    ctx.adaptive_lookback()
+    assert ctx.true_range is tr
+    
+    # Shared windows give the same values as the standalone helpers
+    assert ctx.rolling('TR', 14, 'mean') is ctx.atr(14)
+    pd.testing.assert_series_equal(ctx.atr(100), calculate_atr(synthetic_bars, period=100))
+
 def test_fvg_detection():
     # Manufactur a Bullish FVG
     # i-2: High=100
@@ -49,6 +120,44 @@ def test_fvg_detection():
     # Index 2 should identify FVG from 0..2
     assert fvg['FVG_Bullish'].iloc[2] == True
 
+def test_order_block_detection():
+    # Swing High at 2 (105), down candle at 4, Bullish FVG at 7 closing above 105
+    data = {
+        'Open': [100, 100.5, 101.5, 104, 102.5, 101.5, 103.8, 107.5],
+        'High': [101, 102, 105, 104.5, 103, 104, 108, 110],
+        'Low':  [99, 100, 101, 102, 101, 101.4, 103.7, 106],
+        'Close':[100.5, 101.5, 104, 102.5, 101.5, 103.8, 107.5, 109.5]
+    }
+    df = pd.DataFrame(data)
+    df['ATR'] = 1.0
+    fvg = detect_fvg(df)
+    swings = find_swings_fractal(df)
+    
+    ob = detect_order_blocks(df, fvg, swings)
+    assert ob['OB_Bullish'].tolist() == [False, False, False, False, True, False, False, False]
+    assert not ob['OB_Bearish'].any()
+    
+    # Swing and origin outside the search caps
+    assert not detect_order_blocks(df, fvg, swings, max_swing_lookback=4)['OB_Bullish'].any()
+    assert not detect_order_blocks(df, fvg, swings, max_origin_lookback=2)['OB_Bullish'].any()
+
+def test_adaptive_sweeps(synthetic_bars):
+    df = synthetic_bars
+    df['ATR'] = calculate_atr(df, period=14)
+    
+    # Constant lookback reduces to the fixed detector
+    fixed = detect_liquidity_sweeps(df, swing_lookback=5)
+    constant = detect_liquidity_sweeps_adaptive(df, pd.Series(5, index=df.index))
+    pd.testing.assert_frame_equal(fixed, constant)
+    
+    # Per-bar lookback: each bar uses the fixed detector of its own order
+    lookback = calculate_adaptive_lookback(df)
+    adaptive = detect_liquidity_sweeps_adaptive(df, lookback)
+    for l in lookback.unique():
+        mask = (lookback == l).values
+        expected = detect_liquidity_sweeps(df, swing_lookback=int(l))
+        pd.testing.assert_frame_equal(adaptive[mask], expected[mask])
+
 def test_risk_calc():
     # Equity=10000, Risk=1% (0.01) -> $100 risk
     # StopDist=2.0
@@ -63,3 +172,598 @@ def test_risk_scaling():
     assert get_risk_percentage(70) == 0.005
     # Tier 3
     assert get_risk_percentage(50) == 0.0
+
+@pytest.mark.parametrize("with_killzone", [False, True])
+def test_vectorized_engine_matches_loop(synthetic_bars, with_killzone):
+    df = synthetic_bars
+    if with_killzone:
+        df['In_Killzone'] = df.index.hour.isin(range(7, 17))
+    bias = list(np.random.default_rng(1).choice(['Bullish', 'Bearish', 'Neutral'], len(df)))
+    
+    loop = run_strategy(df.copy(), account_equity=25000.0, htf_bias=bias, engine='loop')
+    vec = run_strategy(df.copy(), account_equity=25000.0, htf_bias=bias, engine='vectorized')
+    
+    assert loop['Signal'].notna().sum() > 0
+    pd.testing.assert_frame_equal(loop, vec)
+
+@pytest.mark.parametrize("bullish", [True, False])
+def test_order_block_zones_match_list_scan(bullish):
+    rng = np.random.default_rng(3)
+    zones = OrderBlockZones(bullish=bullish, capacity=2)
+    reference = []
+    
+    for _ in range(500):
+        if rng.random() < 0.3:
+            bottom = 100 + rng.normal(0, 5)
+            top = bottom + rng.exponential(1.0)
+            zones.add(top, bottom)
+            reference.append((top, bottom))
+            
+        close = 100 + rng.normal(0, 5)
+        low, high = close - rng.exponential(1.0), close + rng.exponential(1.0)
+        zones.invalidate(close)
+        if bullish:
+            reference = [z for z in reference if close >= z[1]]
+            expected = any(low <= z[0] for z in reference)
+            assert zones.touched(low) == expected
+        else:
+            reference = [z for z in reference if close <= z[0]]
+            expected = any(high >= z[1] for z in reference)
+            assert zones.touched(high) == expected
+        assert len(zones) == len(reference)
+
+def test_bar_store_roundtrip(tmp_path):
+    idx = pd.date_range('2023-12-31 22:00', periods=6, freq='h', tz='UTC')
+    bars = pd.DataFrame({
+        'Open': np.arange(6, dtype=float),
+        'Close': np.arange(6, dtype=float) + 0.5,
+        'Tick_Count': np.arange(6, dtype=np.int64),
+        'Session': ['NY', '', '', 'Asia', 'Asia', 'Asia']
+    }, index=idx)
+    
+    store = BarStore(str(tmp_path))
+    store.write('EURUSD', '1h', bars.iloc[:4])
+    # Overlapping write replaces existing bars (keep last)
+    update = bars.iloc[3:].copy()
+    update['Close'] += 10
+    store.write('EURUSD', '1h', update)
+    
+    assert store.years('EURUSD', '1h') == [2023, 2024]
+    loaded = store.read('EURUSD', '1h')
+    assert loaded.index.equals(idx)
+    assert loaded['Close'].tolist() == [0.5, 1.5, 2.5, 13.5, 14.5, 15.5]
+    assert loaded['Tick_Count'].dtype == np.int64
+    assert loaded['Session'].tolist() == bars['Session'].tolist()
+    
+    # Missing strings come back missing, not as 'None'
+    gap = bars.iloc[[5]].copy()
+    gap['Session'] = pd.Series([None], index=gap.index, dtype=object)
+    store.write('EURUSD', '1h', gap)
+    assert pd.isna(store.read('EURUSD', '1h')['Session'].iloc[-1])
+    
+    # Date range only returns the requested days
+    jan = store.read('EURUSD', '1h', '2024-01-01', '2024-01-01', columns=['Close'])
+    assert list(jan.columns) == ['Close']
+    assert (jan.index >= pd.Timestamp('2024-01-01', tz='UTC')).all()
+    assert len(jan) == 4
+
+def test_chunked_processing_matches_whole_file(tick_file, tmp_path):
+    timeframes = ['5min', '1h', '1D']
+    process_single_file(tick_file, str(tmp_path / 'whole'), 'EURUSD', timeframes, chunksize=None)
+    process_single_file(tick_file, str(tmp_path / 'chunked'), 'EURUSD', timeframes, chunksize=997)
+    
+    for tf in timeframes:
+        whole = BarStore(str(tmp_path / 'whole')).read('EURUSD', tf)
+        chunked = BarStore(str(tmp_path / 'chunked')).read('EURUSD', tf)
+        assert not whole.empty
+        pd.testing.assert_frame_equal(whole, chunked, check_exact=False, rtol=1e-12)
+
+def test_unsorted_tick_file_falls_back_to_whole_file_sort(tick_file, tmp_path):
+    ticks = pd.read_csv(tick_file)
+    swapped = pd.concat([ticks.iloc[5000:10000], ticks.iloc[:5000], ticks.iloc[10000:]])
+    path = str(tmp_path / 'swapped_ticks.csv')
+    swapped.to_csv(path, index=False)
+    
+    process_single_file(tick_file, str(tmp_path / 'sorted'), 'EURUSD', ['5min'], chunksize=None)
+    assert process_single_file(path, str(tmp_path / 'chunked'), 'EURUSD', ['5min'], chunksize=1000) is not None
+    pd.testing.assert_frame_equal(
+        BarStore(str(tmp_path / 'chunked')).read('EURUSD', '5min'),
+        BarStore(str(tmp_path / 'sorted')).read('EURUSD', '5min'),
+        check_exact=False, rtol=1e-12
+    )
+
+def test_shared_csv_sink_discards_a_file_that_shares_a_day(tick_file, tmp_path):
+    # A ends mid-day; B continues that day into the next and is out of order,
+    # so its streamed bars are discarded and rebuilt after A's were flushed
+    ticks = pd.read_csv(tick_file)
+    cut = int(np.searchsorted(ticks['timestamp'], pd.Timestamp('2024-03-04 22:00', tz='UTC').value // 10**6))
+    a, b = ticks.iloc[:cut], ticks.iloc[cut:]
+    b = pd.concat([b.iloc[:2000], b.iloc[6000:9000], b.iloc[2000:6000], b.iloc[9000:]])
+    a.to_csv(tmp_path / 'a_ticks.csv', index=False)
+    b.to_csv(tmp_path / 'b_ticks.csv', index=False)
+    
+    out_dir, whole = str(tmp_path / 'shared'), str(tmp_path / 'whole')
+    os.makedirs(out_dir)
+    os.makedirs(whole)
+    sink = BarSink(out_dir, 'EURUSD', 'csv', flush_rows=1)
+    for f in ['a_ticks.csv', 'b_ticks.csv']:
+        assert process_single_file(str(tmp_path / f), out_dir, 'EURUSD', ['5min', '1h'], 'csv', chunksize=1000, sink=sink)
+    sink.close()
+    
+    process_single_file(tick_file, whole, 'EURUSD', ['5min', '1h'], 'csv', chunksize=None)
+    files = sorted(os.listdir(whole))
+    assert sorted(os.listdir(out_dir)) == files and len(files) == 4
+    for f in files:
+        pd.testing.assert_frame_equal(pd.read_csv(os.path.join(out_dir, f)), pd.read_csv(os.path.join(whole, f)), check_exact=False, rtol=1e-12)
+
+def test_cascading_aggregation_matches_tick_resample(tick_file):
+    ticks = clean_ticks(pd.read_csv(tick_file))
+    timeframes = ['1D', '4h', '1h', '15min', '5min', '7min']
+    cascade = aggregate_timeframes(ticks, timeframes)
+    
+    for tf in timeframes:
+        direct = aggregate_ticks(ticks, tf)
+        assert not direct.empty
+        pd.testing.assert_frame_equal(cascade[tf], direct, check_exact=False, rtol=1e-12, check_freq=False)
+
+def test_processing_manifest_skips_processed_sources(tick_file, tmp_path):
+    import shutil
+    src_dir = tmp_path / 'sources'
+    src_dir.mkdir()
+    first = src_dir / 'a_ticks.csv'
+    shutil.copy(tick_file, first)
+    out_dir = str(tmp_path / 'processed')
+    timeframes = ['5min', '1D']
+    
+    process_data(str(src_dir), out_dir, 'EURUSD', timeframes)
+    manifest = ProcessingManifest(out_dir)
+    assert manifest.sources[os.path.abspath(first)]['days'] == ['20240304', '20240305']
+    assert pending_sources(str(src_dir), out_dir, timeframes) == []
+    
+    # Touching a file without changing it keeps it current
+    os.utime(first, ns=(0, 0))
+    assert pending_sources(str(src_dir), out_dir, timeframes) == []
+    
+    # New file or a new timeframe makes sources pending
+    second = src_dir / 'b_ticks.csv'
+    shutil.copy(tick_file, second)
+    assert pending_sources(str(src_dir), out_dir, timeframes) == [str(second)]
+    assert len(pending_sources(str(src_dir), out_dir, ['1h'])) == 2
+    
+    process_data(str(src_dir), out_dir, 'EURUSD', timeframes)
+    assert pending_sources(str(src_dir), out_dir, timeframes) == []
+    
+    # A malformed file fails and stays pending
+    bad = src_dir / 'c_ticks.csv'
+    bad.write_text('foo,bar\n1,2\n')
+    assert process_single_file(str(bad), out_dir, 'EURUSD', timeframes) is None
+    process_data(str(src_dir), out_dir, 'EURUSD', timeframes)
+    assert pending_sources(str(src_dir), out_dir, timeframes) == [str(bad)]
+    assert os.path.abspath(bad) not in ProcessingManifest(out_dir).sources
+
+def test_processing_writes_each_partition_once_per_run(tick_file, tmp_path, monkeypatch):
+    # Split the ticks into one source file per day
+    src_dir = tmp_path / 'sources'
+    src_dir.mkdir()
+    ticks = pd.read_csv(tick_file)
+    day = pd.to_datetime(ticks['timestamp'], unit='ms').dt.strftime('%Y%m%d')
+    for d, part in ticks.groupby(day):
+        part.to_csv(src_dir / f'{d}_ticks.csv', index=False)
+    
+    writes = []
+    write = BarStore.write
+    monkeypatch.setattr(BarStore, 'write', lambda self, inst, tf, df: (writes.append(tf), write(self, inst, tf, df))[1])
+    out_dir = str(tmp_path / 'processed')
+    process_data(str(src_dir), out_dir, 'EURUSD', ['5min', '1h'])
+    assert sorted(writes) == ['1h', '5min']
+    
+    whole = str(tmp_path / 'whole')
+    process_single_file(tick_file, whole, 'EURUSD', ['5min', '1h'])
+    for tf in ['5min', '1h']:
+        pd.testing.assert_frame_equal(BarStore(out_dir).read('EURUSD', tf), BarStore(whole).read('EURUSD', tf))
+
+def test_batch_simulation_matches_bar_loop(synthetic_bars):
+    df = synthetic_bars
+    spread = np.random.default_rng(5).uniform(0, 0.3, len(df))
+    for c in ['Open', 'High', 'Low', 'Close']:
+        df[f'Bid_{c}'] = df[c] - spread / 2
+        df[f'Ask_{c}'] = df[c] + spread / 2
+    bias = list(np.random.default_rng(1).choice(['Bullish', 'Bearish', 'Neutral'], len(df)))
+    results = run_strategy(df, account_equity=25000.0, htf_bias=bias, engine='vectorized')
+    
+    loop = TradeManager()
+    for timestamp, row in results.iterrows():
+        loop.update(row)
+        if pd.notnull(row['Signal']):
+            loop.add_trade(row)
+            
+    batch = TradeManager()
+    batch.simulate(results)
+    
+    assert len(loop.closed_trades) > 0
+    pd.testing.assert_frame_equal(loop.get_results_df(), batch.get_results_df())
+    assert [t['id'] for t in loop.active_trades] == [t['id'] for t in batch.active_trades]
+
+def test_trade_book_grows_and_shares_columns():
+    book = TradeBook(capacity=2)
+    for i in range(5):
+        book.append({'id': i, 'entry_time': pd.Timestamp('2024-01-01', tz='UTC') + pd.Timedelta(hours=i),
+                     'signal': 'Long' if i % 2 else 'Short', 'pnl': float(i)})
+    book.remove([1, 3])
+    
+    assert len(book) == 3
+    assert book.record(1)['signal'] == 'Short'
+    assert book.get(2, 'entry_time') == pd.Timestamp('2024-01-01 04:00', tz='UTC')
+    
+    frame = book.to_frame()
+    assert list(frame['id']) == [0, 2, 4]
+    assert np.shares_memory(frame['pnl'].to_numpy(), book.column('pnl'))
+    assert pd.isna(frame['exit_time']).all()
+    # Category codes stay internal
+    assert frame['signal'].dtype == object and frame['result'].dtype == object
+    assert list(frame['signal']) == ['Short'] * 3
+    assert list(frame['result']) == [None] * 3
+    assert list(frame.columns) == [name for name, kind in TRADE_FIELDS]
+
+def test_tick_exit_resolver_orders_levels_within_bar(tick_file, tmp_path):
+    out_dir = str(tmp_path / 'out')
+    process_single_file(tick_file, out_dir, 'EURUSD', ['5min'], chunksize=997, store_ticks=True)
+    ticks = clean_ticks(pd.read_csv(tick_file))
+    store = TickStore(out_dir)
+    stored = store.read_ticks('EURUSD')
+    assert len(store.partitions('EURUSD', 'tick')) == 2
+    np.testing.assert_array_equal(stored['Bid'].values, ticks['bidPrice'].values)
+    
+    # SL and TP at the bar extremes: whichever extreme came first wins
+    bars = BarStore(out_dir).read('EURUSD', '5min')
+    grouped = ticks.groupby(ticks.index.floor('5min'))
+    first_low = grouped['bidPrice'].agg(lambda s: s.values.argmin())
+    first_high = grouped['bidPrice'].agg(lambda s: s.values.argmax())
+    expected = (first_low < first_high).reindex(bars.index).values
+    
+    resolver = TickExitResolver(store, 'EURUSD', '5min')
+    longs = np.ones(len(bars), dtype=bool)
+    sl_first = resolver.sl_first(bars.index, longs, bars['Bid_Low'].values, bars['Bid_High'].values)
+    np.testing.assert_array_equal(sl_first, expected)
+    assert 0 < sl_first.sum() < len(bars)
+    
+    # Bars without stored ticks keep the SL-first assumption
+    missing = bars.index + pd.Timedelta(days=30)
+    assert resolver.sl_first(missing, longs, bars['Bid_Low'].values, bars['Bid_High'].values).all()
+
+def test_replay_engine_signals_use_completed_bars_only(synthetic_bars):
+    # Four ticks per bar trace each synthetic candle: open, both extremes, close
+    bars = synthetic_bars.iloc[:1200]
+    up = (bars['Close'] >= bars['Open']).values
+    path = np.stack([bars['Open'].values, np.where(up, bars['Low'], bars['High']),
+                     np.where(up, bars['High'], bars['Low']), bars['Close'].values], axis=1)
+    offsets = pd.to_timedelta([0, 60, 120, 240], unit='s').values
+    times = (bars.index.values[:, None] + offsets).ravel()
+    mid = path.ravel()
+    
+    # Bias for day T comes from day T-1; without a bias no setup reaches Tier 2
+    bias_map = {datetime.date(2024, 1, 3): 'Bullish', datetime.date(2024, 1, 4): 'Bearish'}
+    engine = ReplayEngine('5min', strategy=StrategyEngine(window=150, bias_map=bias_map))
+    engine.run(TickReplayer.from_arrays(pd.DatetimeIndex(times, tz='UTC'), mid - 0.01, mid + 0.01, batch_size=1000))
+    replayed = engine.bars_df()
+    np.testing.assert_allclose(replayed[['Open', 'High', 'Low', 'Close']].values, bars[['Open', 'High', 'Low', 'Close']].values)
+    assert (replayed['Tick_Count'] == 4).all()
+    
+    # Each signal equals run_strategy on the bars completed by then
+    bias = [bias_map.get(d, 'Neutral') for d in (replayed.index - pd.Timedelta(days=1)).date]
+    full = run_strategy(replayed, htf_bias=bias, engine='vectorized')
+    candidates = (full['Displacement_Bullish'] | full['Displacement_Bearish']) & (full['HTF_Bias'] != 'Neutral')
+    expected = []
+    for i in np.flatnonzero(candidates):
+        upto = run_strategy(replayed.iloc[:i + 1], htf_bias=bias[:i + 1], engine='vectorized')
+        if pd.notnull(upto['Signal'].iloc[-1]):
+            expected.append((replayed.index[i], upto['Signal'].iloc[-1]))
+    
+    trades = engine.get_results_df()
+    open_trades = [(t['entry_time'], t['signal']) for t in engine.execution.manager.active_trades]
+    taken = list(zip(trades['entry_time'], trades['signal'])) if not trades.empty else []
+    assert len(expected) >= 2
+    assert sorted(taken + open_trades) == sorted(expected)
+    assert (trades['exit_time'] > trades['entry_time'] + pd.Timedelta('5min')).all()
+    
+    curve = engine.equity_curve()
+    assert len(curve) == len(replayed)
+    assert curve['Equity'].iloc[-1] == pytest.approx(25000.0 + trades['pnl'].sum())
+
+def test_strategy_engine_matches_batch_bar_by_bar(synthetic_bars):
+    # Zone and indicator state carries across bars, so a short window still replays batch exactly
+    bars = synthetic_bars.iloc[:1200].reindex(columns=BAR_COLUMNS, fill_value=0.0).tz_localize('UTC')
+    bias_map = {datetime.date(2024, 1, 3): 'Bullish', datetime.date(2024, 1, 4): 'Bearish'}
+    bias = [bias_map.get(d, 'Neutral') for d in (bars.index - pd.Timedelta(days=1)).date]
+    batch = run_strategy(bars, account_equity=10000.0, htf_bias=bias, engine='vectorized')
+    
+    strategy = StrategyEngine(window=20, bias_map=bias_map)
+    rows = [strategy.on_bar(t.value, row, 10000.0) for t, row in zip(bars.index, bars.to_numpy(dtype=float))]
+    signals = pd.DataFrame([r for r in rows if r is not None])
+    expected = batch[batch['Signal'].notna()]
+    assert len(expected) >= 2
+    assert list(signals.index) == list(expected.index)
+    columns = ['Signal', 'Tier_Score', 'Score_HTF', 'Score_Disp', 'Score_Liq', 'Score_Context', 'Near_POI', 'HTF_Bias', 'In_Killzone']
+    assert signals[columns].astype(object).values.tolist() == expected[columns].astype(object).values.tolist()
+    np.testing.assert_allclose(signals[['ATR', 'Stop_Loss', 'Take_Profit', 'Risk_Units']].to_numpy(dtype=float),
+                               expected[['ATR', 'Stop_Loss', 'Take_Profit', 'Risk_Units']].to_numpy(dtype=float), rtol=1e-9)
+    
+    with pytest.raises(ValueError):
+        StrategyEngine(window=10)
+
+def test_streaming_indicators_match_batch(synthetic_bars):
+    df = synthetic_bars.copy()
+    df.iloc[500:520] = df.iloc[500].values # flat stretch: zero ranges
+    df.iloc[900] = np.nan # missing bar: windows holding it are NaN, then recover
+    stream = StreamingIndicators(swing_lookback=2)
+    out = pd.DataFrame([stream.update(h, l, c) for h, l, c in zip(df['High'], df['Low'], df['Close'])], index=df.index)
+    
+    ctx = IndicatorContext(df)
+    np.testing.assert_allclose(out['ATR'], ctx.atr(14), rtol=1e-12)
+    np.testing.assert_allclose(out['ATR_Long'], ctx.atr(100), rtol=1e-12)
+    np.testing.assert_allclose(out['Chop'], ctx.chop(14), rtol=1e-12)
+    np.testing.assert_allclose(out['ADX'], ctx.adx(14), rtol=1e-12)
+    assert out['ATR'].iloc[900:914].isna().all() and out['ATR'].iloc[914:].notna().all()
+    
+    # Swings are confirmed `lookback` bars later
+    swings = find_swings_fractal(df, 2)
+    np.testing.assert_array_equal(out['SwingHigh'].values[2:], swings['SwingHigh'].values[:-2])
+    np.testing.assert_array_equal(out['SwingLow'].values[2:], swings['SwingLow'].values[:-2])
+
+def test_portfolio_sizes_from_shared_equity(synthetic_bars):
+    frames = {}
+    for name, seed in [('AAA', 1), ('BBB', 2)]:
+        bias = list(np.random.default_rng(seed).choice(['Bullish', 'Bearish'], len(synthetic_bars)))
+        manager = TradeManager()
+        manager.simulate(run_strategy(synthetic_bars, account_equity=25000.0, htf_bias=bias, engine='vectorized'))
+        frames[name] = manager.get_results_df()
+        
+    trades, equity = run_portfolio(frames, initial_equity=20000.0, sizing_equity=25000.0)
+    assert len(trades) == sum(len(f) for f in frames.values()) > 0
+    assert trades['exit_time'].is_monotonic_increasing
+    assert equity['Equity'].iloc[-1] == pytest.approx(20000.0 + trades['pnl'].sum())
+    assert equity['Open_Trades'].iloc[-1] == 0
+    
+    # Each entry is sized from the equity after every exit up to (and at) its entry time
+    for _, t in trades.iterrows():
+        realized = trades.loc[trades['exit_time'] <= t['entry_time'], 'pnl'].sum()
+        assert t['equity_at_entry'] == pytest.approx(20000.0 + realized)
+        nominal = frames[t['instrument']].set_index('id').loc[t['id'], 'pnl']
+        breaker = 0.5 if t['circuit_breaker'] else 1.0
+        assert t['pnl'] == pytest.approx(nominal * t['equity_at_entry'] / 25000.0 * breaker)
+
+def test_circuit_breaker_halves_risk_until_new_high():
+    # 7 losers then 6 winners at 3R; each trade exits on the bar after its signal
+    outcomes = ['Loss'] * 7 + ['Win'] * 6
+    n = 2 * len(outcomes)
+    results = pd.DataFrame({
+        'Close': 100.0, 'High': 100.5, 'Low': 99.5,
+        'Signal': None, 'Stop_Loss': np.nan, 'Take_Profit': np.nan,
+        'Risk_Units': 0.0, 'Tier_Score': 0
+    }, index=pd.date_range('2024-01-01', periods=n, freq='5min'))
+    results['Signal'] = pd.Series([None] * n, index=results.index, dtype=object)
+    for k, outcome in enumerate(outcomes):
+        results.iloc[2 * k, results.columns.get_indexer(['Signal', 'Stop_Loss', 'Take_Profit', 'Tier_Score'])] = ['Long', 99.0, 103.0, 90]
+        if outcome == 'Loss':
+            results.iloc[2 * k + 1, results.columns.get_loc('Low')] = 98.5
+        else:
+            results.iloc[2 * k + 1, results.columns.get_loc('High')] = 103.5
+            
+    manager = TradeManager(initial_equity=10000.0)
+    manager.simulate(results)
+    trades = manager.get_results_df()
+    
+    # Trips once the drawdown reaches 5R (after the 6th loss), restored by the 5th win
+    assert list(trades['result']) == outcomes
+    assert list(trades['circuit_breaker']) == [0] * 6 + [1] * 6 + [0]
+    equity_before = 10000.0 + trades['pnl'].cumsum().shift(fill_value=0.0)
+    risk = np.where(trades['circuit_breaker'] == 1, 0.005, 0.01)
+    np.testing.assert_allclose(trades['risk_units'], equity_before * risk / 1.0)
+    assert manager.equity == pytest.approx(10000.0 + trades['pnl'].sum())
+
+def test_monte_carlo_is_reproducible_across_workers():
+    pnl = np.random.default_rng(0).normal(20, 250, 300)
+    trades = pd.DataFrame({'pnl': pnl, 'result': np.where(pnl > 0, 'Win', 'Loss')})
+    
+    serial = monte_carlo(trades, 25000.0, n_sims=3000, seed=7)
+    pd.testing.assert_frame_equal(serial, monte_carlo(trades, 25000.0, n_sims=3000, seed=7, workers=2))
+    assert not serial.equals(monte_carlo(trades, 25000.0, n_sims=3000, seed=8))
+    
+    # Reshuffling keeps the total; the realized drawdown is one of the paths
+    realized = calculate_metrics(trades, 25000.0)
+    np.testing.assert_allclose(serial['Return (%)'], pnl.sum() / 25000.0 * 100)
+    assert serial['Max Drawdown (%)'].iloc[0] <= realized['Max Drawdown (%)'] <= serial['Max Drawdown (%)'].iloc[-1]
+    
+    boot = monte_carlo(trades, 25000.0, n_sims=3000, method='bootstrap', seed=7)
+    assert boot['Return (%)'].is_monotonic_increasing and boot['Return (%)'].nunique() > 1
+    
+    # Backtests only run it when configured
+    assert monte_carlo_from_config({}) is None
+    assert monte_carlo_from_config({'backtest': {'monte_carlo': {'n_sims': 500}}}) is None
+    assert monte_carlo_from_config({'backtest': {'monte_carlo': {'enabled': True, 'n_sims': 500, 'method': 'bootstrap'}}}) == {'n_sims': 500, 'method': 'bootstrap', 'seed': 42}
+
+def test_walk_forward_windows_roll_by_test_length():
+    windows = walk_forward_windows('2020-01-01', '2023-12-31', train_months=12, test_months=12)
+    assert [(w[2].year, w[3].year) for w in windows] == [(2021, 2022), (2022, 2023), (2023, 2024)]
+    assert all(w[1] == w[2] for w in windows)
+    assert windows[-1][3] == pd.Timestamp('2024-01-01')
+
+def test_walk_forward_shares_features_across_windows(synthetic_bars):
+    bias = list(np.random.default_rng(3).choice(['Bullish', 'Bearish'], len(synthetic_bars)))
+    features = prepare_features(synthetic_bars.copy())
+    day = pd.Timedelta(days=1)
+    start = synthetic_bars.index[0]
+    windows = [(start + k * 3 * day, start + (k * 3 + 4) * day, start + (k * 3 + 4) * day, start + (k * 3 + 7) * day) for k in range(3)]
+    
+    table, oos, equity = walk_forward(features, bias, windows, initial_balance=25000.0)
+    assert len(table) == 3 and table['OOS Total Trades'].sum() == len(oos) > 0
+    pd.testing.assert_frame_equal(oos, walk_forward(features, bias, windows, initial_balance=25000.0, workers=2)[1])
+    
+    # Every OOS trade was entered inside its own test window
+    for k, (_, _, test_start, test_end) in enumerate(windows):
+        entries = oos.loc[oos['window'] == k, 'entry_time']
+        assert ((entries >= test_start) & (entries < test_end)).all()
+        
+    # A single window stitches back to its own equity-aware sizing
+    raw = period_trades(features, bias, windows[1][2], windows[1][3], 25000.0)
+    alone = stitch_oos([raw], 25000.0)[0]
+    np.testing.assert_allclose(alone['pnl'], raw.sort_values('exit_time', kind='stable')['pnl'], rtol=1e-12)
+    assert equity['Equity'].iloc[-1] == pytest.approx(25000.0 + oos['pnl'].sum())
+
+def test_stitched_oos_follows_exits_across_window_boundaries(synthetic_bars):
+    # One-day windows: trades still open at a window's end exit inside the next one
+    bias = list(np.random.default_rng(2).choice(['Bullish', 'Bearish'], len(synthetic_bars)))
+    features = prepare_features(synthetic_bars.copy())
+    day = pd.Timedelta(days=1)
+    start = synthetic_bars.index[0]
+    windows = [(start + k * day, start + (k + 1) * day, start + (k + 1) * day, start + (k + 2) * day) for k in range(10)]
+    
+    _, oos, equity = walk_forward(features, bias, windows, initial_balance=25000.0)
+    test_end = oos['window'].map(lambda k: windows[k][3])
+    assert (oos['exit_time'] > test_end).any()
+    assert equity.index.is_monotonic_increasing
+    
+    # Each entry is sized from the PnL realized before it, never from later exits
+    exits = oos['exit_time'].to_numpy()
+    realized = np.array([oos['pnl'].to_numpy()[exits <= t].sum() for t in oos['entry_time'].to_numpy()])
+    np.testing.assert_allclose(oos['equity_at_entry'], 25000.0 + realized)
+
+def test_parameter_sweep_matches_full_recompute(synthetic_bars):
+    bias = list(np.random.default_rng(4).choice(['Bullish', 'Bearish'], len(synthetic_bars)))
+    grid = param_grid(displacement_atr=[1.5, 1.2], sweep_tolerance_atr=[0.2, 0.5], reward_risk=[2.0, 3.0])
+    assert len(grid) == 8
+    with pytest.raises(ValueError):
+        param_grid(atr_period=[10])
+        
+    shared = SharedFeatures(synthetic_bars.copy())
+    table = run_sweep(shared, grid, bias, initial_balance=25000.0)
+    assert list(table['displacement_atr']) == [p.displacement_atr for p in grid]
+    assert table['Total Trades'].nunique() > 1
+    pd.testing.assert_frame_equal(table, run_sweep(shared, grid, bias, initial_balance=25000.0, workers=2))
+    
+    # Each row equals a from-scratch run with those parameters
+    for k in [1, 2, 7]:
+        manager = TradeManager(initial_equity=25000.0)
+        manager.simulate(run_strategy(synthetic_bars.copy(), 25000.0, bias, engine='loop', params=grid[k]))
+        expected = calculate_metrics(manager.get_results_df(), 25000.0)
+        assert table.iloc[k][list(expected)].to_dict() == expected
+
+def test_benchmark_generators_are_seeded_and_processable(tmp_path):
+    bars = synthetic_bars_for_benchmark(3000, '5min', seed=5)
+    pd.testing.assert_frame_equal(bars, synthetic_bars_for_benchmark(3000, '5min', seed=5))
+    assert len(bars) == 3000 and (bars.index.dayofweek < 5).all()
+    assert (bars['Ask_Low'] > bars['Bid_Low']).all() and (bars['High'] >= bars[['Open', 'Close']].max(axis=1)).all()
+    
+    # Chunked tick file is a valid processing input and spans chunks seamlessly
+    path = write_tick_csv(str(tmp_path / 'SYN_ticks.csv'), 5000, seed=5, chunksize=1500)
+    ticks = pd.read_csv(path)
+    assert len(ticks) == 5000 and ticks['timestamp'].is_monotonic_increasing
+    assert process_single_file(path, str(tmp_path / 'out'), 'SYN', ['5min']) is not None
+    
+    record = run_case('simulate', 3000, seed=5)
+    assert record['rows'] == 3000 and record['rows_per_sec'] > 0 and record['peak_rss_mb'] is not None
+
+def test_profiling_spans_nest_and_are_off_by_default(synthetic_bars, tmp_path):
+    assert profiling_span('anything') is profiling_span('other') # shared no-op
+    run_strategy(synthetic_bars.copy(), engine='vectorized')
+    
+    with profiling('run') as prof:
+        with profiling_span('strategy'):
+            run_strategy(synthetic_bars.copy(), engine='vectorized')
+    assert profiling_span('after') is profiling_span('other')
+    
+    summary = prof.summary()
+    assert list(summary.index[:3]) == ['strategy', 'strategy/features', 'strategy/features/indicators']
+    assert 'strategy/scoring/signals' in summary.index
+    assert summary.loc['strategy', '% of Run'] == pytest.approx(100.0)
+    assert summary.loc['strategy/features', 'Total (s)'] <= summary.loc['strategy', 'Total (s)']
+    
+    prof.save(str(tmp_path / 'profile.json'))
+    with open(tmp_path / 'profile.json') as f:
+        assert len(json.load(f)['spans']) == len(prof.records)
+
+def test_feature_cache_roundtrip_invalidation_and_lru(synthetic_bars, tmp_path):
+    bars = synthetic_bars.tz_localize('UTC')
+    bars['Session'] = np.where(bars.index.hour < 8, 'Asia', 'London')
+    store = BarStore(str(tmp_path / 'data'))
+    store.write('SYN', '5min', bars)
+    store.write('SYN', '1D', bars.resample('1D').agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}))
+    
+    cache = FeatureCache(str(tmp_path / 'cache'))
+    key = cache.key('SYN', '5min', '2024-01-01', '2024-01-14', bars)
+    assert cache.get(key) is None
+    features = prepare_features(bars.copy())
+    cache.put(key, features)
+    pd.testing.assert_frame_equal(cache.get(key), features, check_freq=False)
+    
+    # Any change to the bars, range or feature parameters is a different key
+    changed = bars.copy()
+    changed.iloc[500, 0] += 1e-9
+    assert cache.key('SYN', '5min', '2024-01-01', '2024-01-14', changed) != key
+    assert cache.key('SYN', '5min', '2024-01-01', '2024-01-15', bars) != key
+    assert cache.key('SYN', '5min', '2024-01-01', '2024-01-14', bars, StrategyParams(body_ratio=0.5)) != key
+    assert cache.key('SYN', '5min', '2024-01-01', '2024-01-14', bars, StrategyParams(reward_risk=2.0)) == key
+    
+    # A hit gives the same trades as recomputing
+    fresh = simulate_instrument('SYN', '2024-01-01', '2024-01-14', str(tmp_path / 'data'), timeframe='5min')
+    cached = FeatureCache(str(tmp_path / 'cache2'))
+    simulate_instrument('SYN', '2024-01-01', '2024-01-14', str(tmp_path / 'data'), timeframe='5min', feature_cache=cached)
+    hit = simulate_instrument('SYN', '2024-01-01', '2024-01-14', str(tmp_path / 'data'), timeframe='5min', feature_cache=cached)
+    assert (cached.misses, cached.hits) == (1, 1) and len(fresh) > 0
+    pd.testing.assert_frame_equal(hit, fresh)
+    
+    # Least recently used entries go first once over the size bound
+    entry = cache.size()
+    small = FeatureCache(str(tmp_path / 'lru'), max_bytes=int(entry * 3.5))
+    for k in range(3):
+        small.put(f"k{k}", features)
+        os.utime(os.path.join(small.root, f"k{k}"), (k, k))
+    assert small.get('k0') is not None
+    small.put('k3', features)
+    assert sorted(name for _, _, name in small.entries()) == ['k0', 'k2', 'k3']
+
+def test_bar_arrays_are_memory_mapped_and_shared_without_copies(synthetic_bars, tmp_path):
+    import pickle
+    bars = synthetic_bars.tz_localize('UTC')
+    store = BarStore(str(tmp_path))
+    store.write('SYN', '5min', bars)
+    
+    arrays = store.read_arrays('SYN', '5min', '2024-01-03', '2024-01-10')
+    expected = store.read('SYN', '5min', '2024-01-03', '2024-01-10')
+    frame = arrays.frame()
+    pd.testing.assert_frame_equal(frame, expected, check_freq=False)
+    assert isinstance(arrays['Close'], np.memmap) and np.shares_memory(frame['Close'].to_numpy(), arrays['Close'])
+    
+    # Pickles as a path and row range, not the data
+    restored = pickle.loads(pickle.dumps(arrays))
+    assert len(pickle.dumps(arrays)) < 1000 and np.array_equal(restored['Close'], arrays['Close'])
+    
+    # Strategy and simulator take the arrays directly, leaving them untouched
+    results = run_strategy(arrays, account_equity=25000.0, htf_bias='Bullish', engine='vectorized')
+    pd.testing.assert_frame_equal(results, run_strategy(expected, account_equity=25000.0, htf_bias='Bullish', engine='vectorized'))
+    assert arrays.columns == store.columns('SYN', '5min')
+    manager = TradeManager(initial_equity=25000.0)
+    manager.simulate(BarArrays.from_frame(results))
+    assert len(manager.get_results_df()) > 0
+    
+    # New bars drop the consolidated copy
+    store.write('SYN', '5min', bars.iloc[-10:] * 1.01)
+    assert not store.has_arrays('SYN', '5min')
+    
+    # Workers racing to consolidate the same series all see the finished arrays
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        closes = list(pool.map(_last_close_from_arrays, [str(tmp_path)] * 8))
+    assert closes == [pytest.approx(bars['Close'].iloc[-1] * 1.01)] * 8
+
+def _last_close_from_arrays(root):
+    return float(BarStore(root).read_arrays('SYN', '5min')['Close'][-1])
+
+def test_run_strategy_leaves_input_untouched_and_shares_its_columns(synthetic_bars):
+    bars = synthetic_bars.copy()
+    before = bars.copy()
+    for engine in ['loop', 'vectorized']:
+        results = run_strategy(bars, account_equity=10000.0, htf_bias='Bullish', engine=engine)
+        pd.testing.assert_frame_equal(bars, before)
+        assert np.shares_memory(results['Close'].to_numpy(), bars['Close'].to_numpy())
+        assert list(results.columns[:len(bars.columns)]) == list(bars.columns)
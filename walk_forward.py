@@ -0,0 +1,81 @@
+import yaml
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+from backtest_runner import load_data, load_daily_bias, map_daily_bias
+from ils.strategy import prepare_features
+from ils.walkforward import walk_forward, walk_forward_windows
+from ils.metrics import calculate_metrics
+
+def run_instrument(symbol, data_dir, start_date, end_date, initial_balance, timeframe, train_months, test_months, workers, out_dir, mmap_arrays=False):
+    """
+    Walk-forward one instrument: load and prepare the full range once, then
+    score and simulate every train/test window from the shared features.
+    """
+    print(f"\n=== Walk-Forward: {symbol} ===")
+    windows = walk_forward_windows(start_date, end_date, train_months, test_months)
+    if not windows:
+        print(f"Range {start_date} -> {end_date} is shorter than one train + test window.")
+        return None
+
+    df = load_data(data_dir, symbol, start_date, end_date, timeframe, arrays=mmap_arrays)
+    if df.empty:
+        print("No data found for specified parameters.")
+        return None
+    print(f"Loaded {len(df)} bars. {len(windows)} windows ({train_months}m train / {test_months}m test).")
+
+    bias_series = map_daily_bias(df.index, load_daily_bias(data_dir, symbol))
+    features = prepare_features(df)
+    table, oos_trades, oos_equity = walk_forward(features, bias_series, windows, initial_balance, workers)
+
+    print("\n--- Windows ---")
+    print(table.to_string())
+    print("\n--- Stitched Out-of-Sample ---")
+    for k, v in calculate_metrics(oos_trades, initial_balance).items():
+        print(f"{k}: {v}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    table.to_csv(os.path.join(out_dir, f"{symbol}_windows.csv"))
+    if not oos_trades.empty:
+        oos_trades.to_csv(os.path.join(out_dir, f"{symbol}_oos_trades.csv"), index=False)
+        oos_equity.to_csv(os.path.join(out_dir, f"{symbol}_oos_equity.csv"))
+    print(f"\nSaved walk-forward results to {out_dir}")
+    return table, oos_trades, oos_equity
+
+def main(config_path="config.yml", instrument=None, workers=None):
+    with open(config_path, "r") as f:
+        config = yaml.safe_load(f)
+
+    backtest_cfg = config.get('backtest', {})
+    wf_cfg = config.get('walk_forward', {})
+    timeframe = config.get('data', {}).get('timeframe', '1h')
+    mmap_arrays = config.get('data', {}).get('mmap_arrays', False)
+    out_dir = os.path.join(backtest_cfg.get('output_base_dir', 'data/backtest_results'), 'walk_forward')
+    if workers is None:
+        workers = backtest_cfg.get('workers', 1)
+
+    results = {}
+    for inst in config.get('instruments', []):
+        if instrument and inst['symbol'] != instrument:
+            continue
+        if not instrument and not inst.get('enabled', True):
+            continue
+        results[inst['symbol']] = run_instrument(
+            inst['symbol'], inst['processed_dir'],
+            backtest_cfg.get('start_date'), backtest_cfg.get('end_date'),
+            backtest_cfg.get('initial_balance', 25000.0), timeframe,
+            wf_cfg.get('train_months', 12), wf_cfg.get('test_months', 12),
+            workers, out_dir, mmap_arrays
+        )
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling train/test walk-forward validation")
+    parser.add_argument("--config", default="config.yml", help="Path to config file")
+    parser.add_argument("--instrument", help="Only this instrument (default: all enabled)")
+    parser.add_argument("--workers", type=int, help="Parallel window workers (overrides config)")
+    args = parser.parse_args()
+
+    main(config_path=args.config, instrument=args.instrument, workers=args.workers)